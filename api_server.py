@@ -1,63 +1,292 @@
 """
 🌐 API Server para WhatsApp Bot
 Conecta o bot Node.js ao Assistente Python
+
+Modos:
+    python api_server.py              # Processo único
+    python api_server.py --shards 4   # Roteador + 4 workers (um por faixa de usuários)
 """
 import os
 import sys
-from flask import Flask, request, jsonify
+import asyncio
+import logging
+import secrets
+import argparse
+from aiohttp import web
 from dotenv import load_dotenv
 
 # Adiciona path do projeto
 sys.path.insert(0, os.path.dirname(__file__))
 
+from config.settings import Settings
 from middleware.orchestrator import Orchestrator
+from middleware.dispatcher import MessageDispatcher
+from middleware.admission import AdmissionController, Overloaded
+from middleware.sharding import ShardRouter, migrar_para_shards
+from interfaces.bridge_channel import BridgeChannel
 
 load_dotenv()
 
-app = Flask(__name__)
-orchestrator = Orchestrator()
+logger = logging.getLogger(__name__)
+settings = Settings()
+routes = web.RouteTableDef()
+
 
-@app.route('/process', methods=['POST'])
-def process_message():
+@routes.post('/process')
+async def process_message(request: web.Request):
     """Processa mensagem do WhatsApp"""
+    dispatcher = request.app['dispatcher']
     try:
-        data = request.json
+        data = await request.json()
         message = data.get('message', '')
         user_id = data.get('user_id', 'whatsapp_user')
         user_name = data.get('user_name', 'Usuário')
-        
-        # Processa com o orquestrador
-        import asyncio
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        response = loop.run_until_complete(
-            orchestrator.process(message, user_id)
-        )
-        loop.close()
-        
-        return jsonify({
+        group_id = data.get('group_id')
+
+        # Processa com o orquestrador (na fila do usuário)
+        response = await dispatcher.process(message, user_id, user_name, group_id=group_id)
+
+        return web.json_response({
             'success': True,
             'response': response
         })
-        
+
+    except Overloaded as e:
+        # Saturado: resposta rápida, o cliente tenta de novo depois
+        return web.json_response({
+            'success': False,
+            'status': 429,
+            'retry_after': round(e.retry_after, 2),
+            'response': f'⏳ Muitas mensagens ({e.motivo}). Tente novamente em instantes.'
+        }, status=429, headers={'Retry-After': str(max(1, round(e.retry_after)))})
+
     except Exception as e:
-        return jsonify({
+        return web.json_response({
             'success': False,
             'response': f'Erro: {str(e)}'
-        }), 500
+        }, status=500)
+
+
+@routes.post('/process/batch')
+async def process_batch(request: web.Request):
+    """
+    Processa um lote de mensagens do WhatsApp (ex: fila após reconexão)
+
+    Mensagens de usuários diferentes rodam em paralelo; as de um mesmo
+    usuário são processadas em sequência, na ordem recebida.
+    """
+    try:
+        data = await request.json()
+    except Exception:
+        data = {}
+    items = data.get('messages', []) if isinstance(data, dict) else data
+
+    if not isinstance(items, list):
+        return web.json_response({
+            'success': False,
+            'response': 'Erro: esperado uma lista de mensagens'
+        }, status=400)
+
+    results = await request.app['dispatcher'].process_batch(items)
+
+    return web.json_response({
+        'success': True,
+        'results': results
+    })
 
-@app.route('/health', methods=['GET'])
-def health():
+
+@routes.get('/health')
+async def health(request: web.Request):
     """Health check"""
-    return jsonify({'status': 'ok'})
+    return web.json_response({'status': 'ok'})
 
-if __name__ == '__main__':
-    print("""
+
+@routes.get('/metrics')
+async def metrics(request: web.Request):
+    """Métricas do controle de admissão (fila, rejeições, concorrência)"""
+    return web.json_response(await request.app['dispatcher'].metrics())
+
+
+def create_dispatcher(data_dir: str = "data") -> MessageDispatcher:
+    """Orquestrador local com controle de admissão"""
+    admission = AdmissionController(
+        max_concurrent=settings.max_concurrent,
+        max_queue=settings.max_queue,
+        user_rate=settings.user_rate,
+        user_burst=settings.user_burst,
+        queue_timeout=settings.queue_timeout
+    )
+    return MessageDispatcher(Orchestrator(data_dir=data_dir), admission)
+
+
+def create_app(dispatcher, with_channel: bool = True) -> web.Application:
+    """Cria a aplicação aiohttp (HTTP + canal persistente no mesmo loop)"""
+    app = web.Application()
+    app['dispatcher'] = dispatcher
+    app.add_routes(routes)
+
+    if with_channel:
+        app['channel'] = BridgeChannel(
+            dispatcher,
+            host=settings.bridge_host,
+            port=settings.bridge_port,
+            socket_path=settings.bridge_socket or None
+        )
+        app.on_startup.append(_start_channel)
+        app.on_cleanup.append(_stop_channel)
+
+    return app
+
+
+async def _start_channel(app: web.Application):
+    """Abre o canal persistente junto com o servidor HTTP"""
+    await app['channel'].start()
+
+
+async def _stop_channel(app: web.Application):
+    await app['channel'].stop()
+
+
+# ========== TELEGRAM (WEBHOOK) ==========
+
+def attach_telegram(app: web.Application, orchestrator):
+    """
+    Serve o Telegram em modo webhook no mesmo servidor/loop do WhatsApp
+
+    Só atua com TELEGRAM_MODE=webhook; em polling o Telegram roda pelo main.py.
+    """
+    token = os.getenv('TELEGRAM_BOT_TOKEN')
+    if settings.telegram_mode != 'webhook' or not token or token == 'seu_token_aqui':
+        return
+
+    if not settings.telegram_webhook_url:
+        logger.error("TELEGRAM_MODE=webhook exige TELEGRAM_WEBHOOK_URL")
+        return
+
+    from interfaces.telegram_bot import TelegramInterface
+    telegram = TelegramInterface(token, orchestrator, settings)
+    if 'voz' in orchestrator.modules:
+        telegram.set_voz_module(orchestrator.modules['voz'])
+
+    app['telegram'] = telegram
+    app.router.add_post(settings.telegram_webhook_path, telegram.handle_webhook)
+    app.on_startup.append(_start_telegram)
+    app.on_cleanup.append(_stop_telegram)
+
+
+async def _start_telegram(app: web.Application):
+    secret = settings.telegram_webhook_secret or secrets.token_urlsafe(32)
+    await app['telegram'].start_webhook(settings.telegram_webhook_url, secret)
+
+
+async def _stop_telegram(app: web.Application):
+    await app['telegram'].stop()
+
+
+# ========== MODO SHARDED ==========
+
+def _pasta_do_worker(indice: int) -> str:
+    return os.path.join('data', 'shards', str(indice))
+
+
+def create_router_app(shards: int) -> web.Application:
+    """
+    Roteador da frente: sobe N workers (cada um com seu diretório de dados)
+    e encaminha cada usuário ao seu worker por hashing consistente
+
+    Na primeira vez, os dados do modo processo único (data/*.json e
+    data/grupos) são repartidos entre as pastas dos workers.
+    """
+    workers = [
+        f'http://127.0.0.1:{settings.shard_base_port + i}'
+        for i in range(shards)
+    ]
+    router = ShardRouter(workers)
+    copiados = migrar_para_shards(
+        'data', router.ring, {w: _pasta_do_worker(i) for i, w in enumerate(workers)}
+    )
+    if copiados:
+        print(f"📦 Dados de data/ repartidos entre {shards} workers: {copiados}")
+    app = create_app(router)
+    app['shards'] = shards
+    # Workers precisam estar de pé antes do canal aceitar mensagens
+    app.on_startup.insert(0, _start_workers)
+    app.on_cleanup.append(_stop_workers)
+    return app
+
+
+async def _start_workers(app: web.Application):
+    """Inicia os processos workers e espera ficarem prontos"""
+    app['workers'] = [
+        await asyncio.create_subprocess_exec(
+            sys.executable, os.path.abspath(__file__),
+            '--worker', str(i), '--shards', str(app['shards'])
+        )
+        for i in range(app['shards'])
+    ]
+
+    router = app['dispatcher']
+    await router.start()
+    await router.wait_ready()
+
+
+async def _stop_workers(app: web.Application):
+    await app['dispatcher'].stop()
+    for proc in app.get('workers', []):
+        if proc.returncode is None:
+            proc.terminate()
+    for proc in app.get('workers', []):
+        await proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='API Server do Assistente Pessoal')
+    parser.add_argument('--shards', type=int, default=settings.shards,
+                        help='Número de workers (1 = processo único)')
+    parser.add_argument('--worker', type=int, default=None,
+                        help=argparse.SUPPRESS)  # Uso interno do roteador
+    args = parser.parse_args()
+
+    # Worker: só HTTP local, dados em data/shards/<n>
+    if args.worker is not None:
+        data_dir = _pasta_do_worker(args.worker)
+        app = create_app(create_dispatcher(data_dir), with_channel=False)
+        web.run_app(app, host='127.0.0.1',
+                    port=settings.shard_base_port + args.worker, print=None)
+        return
+
+    if args.shards > 1:
+        app = create_router_app(args.shards)
+        modo = f'{args.shards} workers'
+        if settings.telegram_mode == 'webhook':
+            print("⚠️ Webhook do Telegram não é servido no modo sharded")
+    else:
+        dispatcher = create_dispatcher()
+        app = create_app(dispatcher)
+        attach_telegram(app, dispatcher.orchestrator)
+        modo = 'processo único'
+        if 'telegram' in app:
+            modo += ' + Telegram webhook'
+
+    canal = settings.bridge_socket or f'{settings.bridge_host}:{settings.bridge_port}'
+    print(f"""
 ╔══════════════════════════════════════════════════╗
 ║     🌐 API SERVER - ASSISTENTE PESSOAL          ║
 ║                                                  ║
-║  Porta: 5001                                    ║
+║  Porta: {settings.api_port:<41}║
 ║  Endpoint: POST /process                        ║
+║            POST /process/batch                  ║
+║            GET  /metrics                        ║
+║  Canal: {canal:<41}║
+║  Modo: {modo:<42}║
 ╚══════════════════════════════════════════════════╝
     """)
-    app.run(host='0.0.0.0', port=5001, debug=False)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    web.run_app(app, host=settings.api_host, port=settings.api_port, print=None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+🧾 Corpus Sintético de Faturas
+Textos de boletos, guias de impostos e extratos, gerados de forma determinística
+"""
+import os
+import sys
+import random
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.codigo_barras import codigo_para_linha, modulo10, modulo11_bancario
+
+NOMES = ["ENERGIA PAULISTA LTDA", "CONDOMINIO EDIFICIO SOL", "JOAO DA SILVA", "MARIA SOUZA",
+         "TELEFONICA BRASIL S.A.", "ESCOLA ABC", "SABESP", "CLARO S.A."]
+
+GUIAS = ["DARF RECEITA FEDERAL", "GPS PREVIDÊNCIA SOCIAL", "IPTU PREFEITURA", "IPVA 2026",
+         "DAS SIMPLES NACIONAL", "ICMS ST", "GUIA DE RECOLHIMENTO"]
+
+# Casos de borda no texto de sempre
+EXTRAS = ["", "nada aqui", "R$ 0,00", "VENCIMENTO 99/99/9999", "Benefíciário: ÉDSON"]
+
+
+class GeradorDeFaturas:
+    """Gera textos como os extraídos de PDFs de boletos (mesma semente, mesmos textos)"""
+
+    def __init__(self, semente: int = 44):
+        self.rnd = random.Random(semente)
+
+    def digitos(self, n: int) -> str:
+        return "".join(str(self.rnd.randint(0, 9)) for _ in range(n))
+
+    def linha(self) -> str:
+        """Linha digitável bancária: 3 em 4 com DVs corretos, as demais com DVs ao acaso"""
+        r = self.rnd.randint
+        if r(0, 3):
+            corpo = f"{r(1, 799):03d}9{r(1000, 2500):04d}{r(100, 999999):010d}{self.digitos(25)}"
+            linha = codigo_para_linha(corpo[:4] + str(modulo11_bancario(corpo)) + corpo[4:])
+        else:
+            linha = self.digitos(47)
+        return (f"{linha[0:5]}.{linha[5:10]} {linha[10:15]}.{linha[15:21]} "
+                f"{linha[21:26]}.{linha[26:32]} {linha[32]} {linha[33:]}")
+
+    def convenio(self) -> str:
+        """Linha de arrecadação (4 blocos de 11 dígitos + DV): 3 em 4 válidas"""
+        r = self.rnd.randint
+        if r(0, 3):
+            corpo = f"8{r(1, 9)}6{r(100, 999999):011d}{self.digitos(29)}"
+            linha = codigo_para_linha(corpo[:3] + str(modulo10(corpo)) + corpo[3:])
+        else:
+            linha = "8" + self.digitos(47)
+        return " ".join(f"{linha[i:i + 11]}-{linha[i + 11]}" for i in range(0, 48, 12))
+
+    def data(self) -> str:
+        r = self.rnd.randint
+        return f"{r(1, 28):02d}/{r(1, 12):02d}/20{r(24, 27)}"
+
+    def valor(self) -> str:
+        r = self.rnd.randint
+        return f"{r(1, 9999):,}".replace(",", ".") + f",{r(0, 99):02d}"
+
+    def extrato(self, linhas: int) -> str:
+        """Lançamentos de extrato (muitas datas e valores, nenhum campo de boleto)"""
+        return "\n".join(
+            f"{self.data()} COMPRA {self.rnd.choice(NOMES)} {self.rnd.randint(100000, 999999)} {self.valor()}"
+            for _ in range(linhas)
+        )
+
+    def boleto(self) -> str:
+        rnd = self.rnd
+        campos = [
+            rnd.choice(["Local de pagamento: qualquer banco", "Pagável em qualquer agência"]),
+            f"Beneficiário: {rnd.choice(NOMES)} CNPJ 12.345.678/0001-90",
+            f"{rnd.choice(['Vencimento', 'Data Venc.', 'Venc'])}: {self.data()}",
+            f"{rnd.choice(['Valor do Documento', 'Valor', 'Total'])}: R$ {self.valor()}",
+            f"Pagador: {rnd.choice(NOMES)} CPF 123.456.789-01",
+            rnd.choice(["Referência: mensalidade março", "Descrição: conta de luz", "Energia elétrica", ""]),
+        ]
+        rnd.shuffle(campos)
+        return "\n".join([f"BANCO {rnd.randint(1, 999):03d}", self.linha()] + campos
+                         + [self.extrato(rnd.choice([0, 5, 40, 200]))])
+
+    def imposto(self) -> str:
+        rnd = self.rnd
+        return "\n".join([
+            rnd.choice(GUIAS),
+            f"Período de Apuração: {rnd.randint(1, 12):02d}/2026",
+            f"Código da Receita: {rnd.randint(1000, 9999)}",
+            f"Número de Referência: {rnd.randint(10**10, 10**12)}",
+            f"Contribuinte: {rnd.choice(NOMES)}",
+            f"CNPJ: 12.345.678/0001-{rnd.randint(10, 99)}",
+            f"Valor Total: R$ {self.valor()}",
+            f"Data de Vencimento: {self.data()}",
+            self.convenio(),
+            self.extrato(rnd.choice([0, 10, 100])),
+        ])
+
+    def sequencia(self) -> str:
+        """Sequências longas de dígitos: código de barras, linhas sem pontuação, quase-códigos"""
+        return self.rnd.choice([
+            self.digitos(44), self.digitos(47), self.digitos(48), self.digitos(50),
+            "X" + self.digitos(44), self.digitos(44) + "_", self.digitos(43),
+            "8" + self.digitos(47), self.digitos(12) + " " + self.digitos(40),
+        ])
+
+    def corpus(self, n: int = 300) -> List[str]:
+        """
+        n documentos (2/3 boletos, 1/3 guias) mais os casos de borda
+
+        Metade recebe uma sequência longa de dígitos numa linha qualquer; em
+        um quarto, a linha digitável (ou de convênio) é removida antes.
+        """
+        textos = []
+        for i in range(n):
+            linhas = (self.boleto() if i % 3 else self.imposto()).split("\n")
+            if i % 4 == 0:
+                linhas.pop(1 if i % 3 else 8)
+            if i % 2 == 0:
+                linhas.insert(self.rnd.randint(0, len(linhas)), self.sequencia())
+            textos.append("\n".join(linhas))
+        return textos + EXTRAS + ["ÁGUA ß " + self.digitos(44)]
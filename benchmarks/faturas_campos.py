@@ -0,0 +1,92 @@
+"""
+⏱️ Benchmark da Extração de Campos de Boletos
+Confere _extrair_dados_boleto contra as saídas de referência e mede a vazão
+
+Uso (na raiz do projeto):
+    python benchmarks/faturas_campos.py            # confere e mede
+    python benchmarks/faturas_campos.py --salvar   # regrava a referência
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus_faturas import GeradorDeFaturas
+import modules.faturas as faturas
+from modules.codigo_barras import TRECHO_PATTERN
+
+REFERENCIA = os.path.join(RAIZ, 'benchmarks', 'fixtures', 'faturas_campos.json')
+
+
+def medir(funcao, textos, rodadas: int) -> float:
+    """Segundos por rodada sobre o corpus inteiro (melhor de `rodadas`)"""
+    melhor = float('inf')
+    for _ in range(rodadas):
+        inicio = time.perf_counter()
+        for texto in textos:
+            funcao(texto)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def passada_unica(textos, rodadas: int):
+    """
+    Compara buscas separadas com uma alternação única dos mesmos padrões
+
+    Usa os padrões essenciais (código, valor, vencimento) no texto em
+    maiúsculas: cada `search` separado pula direto para o seu prefixo,
+    enquanto a alternação testa todos os ramos em cada posição.
+    """
+    separados = [TRECHO_PATTERN] + faturas.VALOR_PATTERNS + faturas.VENCIMENTO_PATTERNS
+    padroes = [p.pattern for p in separados]
+    alternacao = re.compile('|'.join(f'(?:{p})' for p in padroes))
+    maiusculas = [t.upper() for t in textos]
+
+    t_sep = medir(lambda t: [p.search(t) for p in separados], maiusculas, rodadas)
+    t_alt = medir(lambda t: list(alternacao.finditer(t)), maiusculas, rodadas)
+    print(f"{len(padroes)} padrões: buscas separadas {t_sep * 1000:.1f} ms, "
+          f"uma passada (alternação) {t_alt * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument('--salvar', action='store_true', help='regrava a referência')
+    parser.add_argument('--rodadas', type=int, default=5)
+    args = parser.parse_args()
+
+    textos = GeradorDeFaturas().corpus()
+    modulo = faturas.FaturasModule.__new__(faturas.FaturasModule)
+    saidas = [modulo._extrair_dados_boleto(t) for t in textos]
+
+    if args.salvar:
+        os.makedirs(os.path.dirname(REFERENCIA), exist_ok=True)
+        with open(REFERENCIA, 'w', encoding='utf-8') as f:
+            json.dump(saidas, f, ensure_ascii=False, indent=1)
+        print(f"Referência gravada: {len(saidas)} documentos")
+    else:
+        with open(REFERENCIA, 'r', encoding='utf-8') as f:
+            referencia = json.load(f)
+        diferentes = [i for i, (a, b) in enumerate(zip(saidas, referencia)) if a != b]
+        if len(saidas) != len(referencia) or diferentes:
+            print(f"❌ {len(diferentes)} documento(s) diferentes da referência: {diferentes[:10]}")
+            sys.exit(1)
+        print(f"✅ {len(saidas)} documentos idênticos à referência")
+
+    tamanho = sum(len(t) for t in textos)
+    segundos = medir(modulo._extrair_dados_boleto, textos, args.rodadas)
+    print(f"{len(textos)} textos, {tamanho / 1e6:.2f} MB: {segundos * 1000:.1f} ms/rodada, "
+          f"{tamanho / segundos / 1e6:.2f} MB/s")
+    maiusculas = [t.upper() for t in textos]
+    segundos = medir(modulo._detectar_tipo_documento, maiusculas, args.rodadas)
+    print(f"Tipo do documento: {segundos * 1000:.1f} ms/rodada")
+    passada_unica(textos, args.rodadas)
+
+
+if __name__ == '__main__':
+    main()
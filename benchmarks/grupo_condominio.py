@@ -0,0 +1,138 @@
+"""
+⏱️ Benchmark do Filtro de Mensagens de Grupo
+Corpus sintético de grupo de condomínio (conversa comum com horários,
+números de apartamento e datas, mais uma parte de transações) analisado
+com e sem o filtro prévio de CondominioModule
+
+Uso (na raiz do projeto):
+    python benchmarks/grupo_condominio.py                  # 10k mensagens, 10% transações
+    python benchmarks/grupo_condominio.py --mensagens 50000 --transacoes 0.05
+"""
+import os
+import sys
+import time
+import random
+import string
+import argparse
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from modules.condominio import CondominioModule
+
+CONVERSA = [
+    "Bom dia pessoal!", "Alguém viu o gato do {apt}?", "Reunião {data} às {hora}",
+    "O portão da garagem está fazendo barulho de novo", "Obrigado a todos 🙏",
+    "Quem deixou a bicicleta no hall do bloco {bloco}?", "Chego às {hora}",
+    "Festa no salão dia {data}, confirmem até {hora}", "kkkkk", "👍",
+    "A encomenda do {apt} ficou na portaria", "Vou passar aí {hora}",
+    "Alguém tem o telefone do síndico?", "Hoje tem coleta seletiva",
+    "O carro placa ABC{num} está na vaga do {apt}", "Boa noite a todos",
+]
+
+TRANSACOES = [
+    "Pagamos a conta de luz R$ {valor}", "Recebemos a taxa do {apt}: {valor}",
+    "Despesa com limpeza {valor}", "{apt} pagou o condomínio R$ {valor}",
+    "Boleto da água pago, {valor}", "Entrou o rateio da obra R$ {valor}",
+    "Gastamos {valor} com manutenção do elevador", "Cota extra recebida {valor} reais",
+]
+
+
+class GeradorDeMensagens:
+    """Mensagens de grupo reprodutíveis (mesma semente, mesmo corpus)"""
+
+    def __init__(self, semente: int = 34):
+        self.rnd = random.Random(semente)
+
+    def _campos(self) -> dict:
+        rnd = self.rnd
+        return {
+            'apt': f"apt {rnd.randint(1, 24)}{rnd.randint(0, 4):02d}",
+            'bloco': rnd.choice('ABCD'),
+            'data': f"{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}",
+            'hora': f"{rnd.randint(6, 22)}h{rnd.choice(['', '30'])}",
+            'num': rnd.randint(1000, 9999),
+            'valor': f"{rnd.randint(20, 4000)},{rnd.randint(0, 99):02d}",
+        }
+
+    def mensagens(self, total: int, fracao_transacoes: float):
+        transacoes = round(total * fracao_transacoes)
+        modelos = ([self.rnd.choice(TRANSACOES) for _ in range(transacoes)] +
+                   [self.rnd.choice(CONVERSA) for _ in range(total - transacoes)])
+        self.rnd.shuffle(modelos)
+        return [m.format(**self._campos()) for m in modelos]
+
+    def aleatorias(self, total: int):
+        """Textos curtos com dígitos, moeda e pedaços das palavras-chave"""
+        pedacos = (list(string.digits) + [' ', ',', '.', 'R$', 'reais'] +
+                   CondominioModule.PALAVRAS_ENTRADA + CondominioModule.PALAVRAS_SAIDA +
+                   ['Pago', 'LUZ', 'abc', 'ção'])
+        return ["".join(self.rnd.choice(pedacos) for _ in range(self.rnd.randint(0, 8)))
+                for _ in range(total)]
+
+
+class SemFiltro(CondominioModule):
+    """Analisador como era antes do filtro prévio"""
+
+    def pode_ser_transacao(self, mensagem: str) -> bool:
+        return True
+
+
+def _campos(resultado):
+    """Parte determinística da transação (id e datas mudam a cada chamada)"""
+    if resultado is None:
+        return None
+    return resultado['tipo'], resultado['valor'], resultado['categoria']
+
+
+def analisar(modulo: CondominioModule, mensagens):
+    return [_campos(modulo.analisar_mensagem_grupo(m, 'grupo', 'Grupo', 'u', 'U')) for m in mensagens]
+
+
+def medir(modulo: CondominioModule, mensagens, rodadas: int) -> float:
+    """Segundos por mensagem (melhor de `rodadas`)"""
+    melhor = float('inf')
+    for _ in range(rodadas):
+        inicio = time.perf_counter()
+        for m in mensagens:
+            modulo.analisar_mensagem_grupo(m, 'grupo', 'Grupo', 'u', 'U')
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor / len(mensagens)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--mensagens', type=int, default=10000)
+    parser.add_argument('--transacoes', type=float, default=0.1, help='fração de transações no corpus')
+    parser.add_argument('--aleatorias', type=int, default=200000, help='textos aleatórios para conferir o filtro')
+    parser.add_argument('--rodadas', type=int, default=5)
+    args = parser.parse_args()
+
+    gerador = GeradorDeMensagens()
+    mensagens = gerador.mensagens(args.mensagens, args.transacoes)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        com_filtro, sem_filtro = CondominioModule(pasta), SemFiltro(pasta)
+
+        barradas = sum(1 for m in mensagens if not com_filtro.pode_ser_transacao(m))
+        print(f"{len(mensagens)} mensagens: {barradas} barradas pelo filtro")
+
+        iguais = analisar(com_filtro, mensagens) == analisar(sem_filtro, mensagens)
+        print(f"Resultados iguais ao analisador sem filtro: {'sim' if iguais else 'NÃO'}")
+
+        aleatorias = gerador.aleatorias(args.aleatorias)
+        divergentes = sum(1 for a, b in zip(analisar(com_filtro, aleatorias), analisar(sem_filtro, aleatorias))
+                          if a != b)
+        print(f"{len(aleatorias)} textos aleatórios: {divergentes} divergência(s)")
+
+        antes = medir(sem_filtro, mensagens, args.rodadas)
+        depois = medir(com_filtro, mensagens, args.rodadas)
+        print(f"Custo médio por mensagem: sem filtro {antes * 1e6:.1f} µs, com filtro {depois * 1e6:.1f} µs")
+
+    if not iguais or divergentes:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+⏱️ Benchmark do OCR de Fotos de Boletos
+Fotos sintéticas (texto de boleto inclinado, com ruído e em resolução de
+celular) medidas no pré-processamento e, com Tesseract instalado, no OCR
+
+Uso (na raiz do projeto):
+    python benchmarks/ocr_boletos.py                 # 12 fotos
+    python benchmarks/ocr_boletos.py --fotos 30 --salvar /tmp/fotos
+"""
+import io
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from corpus_faturas import GeradorDeFaturas
+from modules import ocr
+from modules.codigo_barras import buscar_codigo
+
+LARGURA, ALTURA = 3000, 4000  # Foto de celular (12 MP)
+
+
+def foto(texto: str, rnd: random.Random):
+    """(JPEG, inclinação em graus) de uma folha com o texto fotografada torta"""
+    folha = Image.new('L', (2480, 3508), 250)
+    desenho = ImageDraw.Draw(folha)
+    fonte = ImageFont.load_default(size=44)
+    for i, linha in enumerate(texto.split("\n")[:40]):
+        desenho.text((160, 200 + i * 78), linha, fill=20, font=fonte)
+
+    inclinacao = rnd.uniform(-4, 4)
+    folha = folha.rotate(inclinacao, resample=Image.BICUBIC, expand=True, fillcolor=120)
+    fundo = Image.linear_gradient('L').resize((LARGURA, ALTURA)).point(lambda p: 90 + p // 4)
+    fundo.paste(folha.resize((LARGURA - 300, round(folha.height * (LARGURA - 300) / folha.width))), (150, 150))
+    ruido = Image.effect_noise((LARGURA, ALTURA), 18)
+    foto = Image.blend(fundo, ruido, 0.12).filter(ImageFilter.GaussianBlur(1.2))
+
+    saida = io.BytesIO()
+    foto.convert('RGB').save(saida, 'JPEG', quality=85)
+    return saida.getvalue(), inclinacao
+
+
+def medir(funcao, *args):
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--fotos', type=int, default=12)
+    parser.add_argument('--salvar', help='pasta para gravar as fotos geradas')
+    args = parser.parse_args()
+
+    rnd = random.Random(48)
+    gerador = GeradorDeFaturas(48)
+    amostras = []
+    for i in range(args.fotos):
+        texto = gerador.boleto()
+        jpeg, inclinacao = foto(texto, rnd)
+        amostras.append((texto, jpeg, inclinacao))
+        if args.salvar:
+            os.makedirs(args.salvar, exist_ok=True)
+            with open(os.path.join(args.salvar, f'boleto_{i:02d}.jpg'), 'wb') as f:
+                f.write(jpeg)
+
+    tempos, erros = [], []
+    for _, jpeg, inclinacao in amostras:
+        angulo, _ = medir(ocr.medir_inclinacao, ocr.reduzir(ocr._abrir(jpeg)))
+        erros.append(abs(angulo + inclinacao))
+        _, segundos = medir(ocr.preparar, jpeg)
+        tempos.append(segundos)
+    print(f"{len(amostras)} fotos {LARGURA}x{ALTURA}")
+    print(f"Pré-processamento: mediana {statistics.median(tempos) * 1000:.0f} ms/foto")
+    print(f"Inclinação: erro médio {statistics.mean(erros):.2f}°, máximo {max(erros):.2f}°")
+
+    if not ocr.OCR_AVAILABLE:
+        print("Tesseract indisponível (pytesseract): OCR não medido")
+        return
+    try:
+        ocr.pytesseract.get_tesseract_version()
+    except Exception as e:
+        print(f"Tesseract indisponível ({e}): OCR não medido")
+        return
+
+    cru, pipeline, acertos_cru, acertos = [], [], 0, 0
+    for texto, jpeg, _ in amostras:
+        esperado = buscar_codigo(texto)
+        lido, segundos = medir(lambda: ocr.pytesseract.image_to_string(Image.open(io.BytesIO(jpeg)), lang='por'))
+        cru.append(segundos)
+        acertos_cru += bool(esperado) and buscar_codigo(lido) == esperado
+        lido, segundos = medir(ocr.ler_boleto, jpeg)
+        pipeline.append(segundos)
+        acertos += bool(esperado) and buscar_codigo(lido) == esperado
+    validos = sum(1 for texto, _, _ in amostras if buscar_codigo(texto))
+    print(f"OCR direto na foto: mediana {statistics.median(cru):.2f} s/foto, "
+          f"código certo em {acertos_cru}/{validos}")
+    print(f"Pipeline (ler_boleto): mediana {statistics.median(pipeline):.2f} s/foto, "
+          f"código certo em {acertos}/{validos}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+⏱️ Benchmark da Leitura de PDFs com Várias Páginas
+PDFs sintéticos (boleto na primeira página seguido de páginas de extrato)
+lidos inteiros e com a parada antecipada de _ler_paginas, em cada extrator
+disponível
+
+Os campos essenciais (linha digitável, valor e vencimento) tirados do texto
+têm de ser os mesmos nos dois modos. Precisa do fpdf2 para gerar os PDFs.
+
+Uso (na raiz do projeto):
+    python benchmarks/pdf_paginas.py
+    python benchmarks/pdf_paginas.py --paginas 1 10 100 --salvar /tmp/pdfs
+"""
+import os
+import sys
+import time
+import argparse
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    from fpdf import FPDF
+except ImportError:
+    sys.exit("fpdf2 não instalado (pip install fpdf2): sem como gerar os PDFs")
+
+from corpus_faturas import GeradorDeFaturas
+import modules.faturas as faturas
+from modules.leitura_pdf import EXTRATORES, _ler_paginas
+
+CAMPOS = ('linha_digitavel', 'valor', 'vencimento')
+
+
+def _linha(pdf: 'FPDF', texto: str, altura: float):
+    # Fonte padrão do PDF só tem latin-1
+    pdf.cell(0, altura, texto.encode('latin-1', 'replace').decode('latin-1'),
+             new_x='LMARGIN', new_y='NEXT')
+
+
+def fixture(boleto: str, paginas: int) -> bytes:
+    """PDF com o boleto na página 1 e paginas-1 páginas de extrato"""
+    pdf = FPDF()
+    pdf.set_font('helvetica', size=9)
+    pdf.add_page()
+    for linha in boleto.split("\n")[:60]:
+        _linha(pdf, linha, 4)
+    for p in range(paginas - 1):
+        pdf.add_page()
+        for i in range(50):
+            _linha(pdf, f"{i % 28 + 1:02d}/{p % 12 + 1:02d} COMPRA ESTABELECIMENTO {i} "
+                        f"........ {i + 10},{(i * 7) % 100:02d}", 5)
+    return bytes(pdf.output())
+
+
+def _nenhum(texto: str) -> set:
+    """Nunca acha os campos: lê o PDF inteiro, como antes da parada antecipada"""
+    return set()
+
+
+def boleto_completo(gerador: GeradorDeFaturas) -> str:
+    """Primeiro boleto do gerador com os três campos (alguns vêm com a linha inválida)"""
+    while True:
+        boleto = gerador.boleto()
+        if len(faturas._campos_essenciais(boleto)) == 3:
+            return boleto
+
+
+def ler(extrator, dados: bytes, campos):
+    """(texto, páginas lidas)"""
+    paginas = extrator(dados)
+    try:
+        texto, _, lidas = _ler_paginas(paginas, campos)
+        return texto, lidas
+    finally:
+        paginas.close()
+
+
+def medir(extrator, dados: bytes, campos, rodadas: int):
+    """(texto, páginas lidas, segundos por leitura: média de `rodadas`)"""
+    inicio = time.perf_counter()
+    for _ in range(rodadas):
+        texto, lidas = ler(extrator, dados, campos)
+    return texto, lidas, (time.perf_counter() - inicio) / rodadas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--paginas', type=int, nargs='+', default=[1, 5, 20, 50])
+    parser.add_argument('--rodadas', type=int, default=3)
+    parser.add_argument('--salvar', help='pasta para gravar os PDFs gerados')
+    args = parser.parse_args()
+
+    boleto = boleto_completo(GeradorDeFaturas(42))
+    modulo = faturas.FaturasModule.__new__(faturas.FaturasModule)
+    fixtures = {n: fixture(boleto, n) for n in args.paginas}
+    if args.salvar:
+        os.makedirs(args.salvar, exist_ok=True)
+        for n, dados in fixtures.items():
+            with open(os.path.join(args.salvar, f'boleto_{n:03d}_paginas.pdf'), 'wb') as f:
+                f.write(dados)
+
+    divergencias = 0
+    for backend, (disponivel, extrator) in EXTRATORES.items():
+        if not disponivel:
+            print(f"{backend}: não instalado")
+            continue
+        print(f"{backend}:")
+        print(f"  {'páginas':>7}  {'inteiro':>10}  {'antecipada':>10}  {'lidas':>5}  campos")
+        for n, dados in fixtures.items():
+            inteiro, _, t_inteiro = medir(extrator, dados, _nenhum, args.rodadas)
+            parcial, lidas, t_parcial = medir(extrator, dados, faturas._campos_essenciais, args.rodadas)
+            a = modulo._extrair_dados_boleto(inteiro)
+            b = modulo._extrair_dados_boleto(parcial)
+            iguais = all(a[c] == b[c] for c in CAMPOS)
+            divergencias += not iguais
+            print(f"  {n:>7}  {t_inteiro * 1000:>7.1f} ms  {t_parcial * 1000:>7.1f} ms  {lidas:>5}  "
+                  f"{'iguais' if iguais else 'DIFERENTES'}")
+
+    if divergencias:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
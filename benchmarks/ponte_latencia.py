@@ -0,0 +1,152 @@
+"""
+⏱️ Benchmark de Latência: Canal Persistente x HTTP
+Mesma mensagem enviada ao dispatcher pelo canal da ponte (frames na mesma
+conexão) e pelo POST /process do api_server, com e sem keep-alive
+
+O orquestrador é um eco, para medir só o transporte (serialização,
+conexão, admissão e fila do usuário). Sem keep-alive é o que o axios faz
+por padrão na ponte Node.js. Precisa do aiohttp.
+
+Uso (na raiz do projeto):
+    python benchmarks/ponte_latencia.py
+    python benchmarks/ponte_latencia.py --mensagens 5000 --simultaneas 32
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+try:
+    import aiohttp
+    from aiohttp import web
+except ImportError:
+    sys.exit("aiohttp não instalado (pip install aiohttp)")
+
+from api_server import routes
+from interfaces.bridge_channel import BridgeChannel, HEADER, encode_frame, read_frame
+from middleware.admission import AdmissionController
+from middleware.dispatcher import MessageDispatcher
+
+HOST = '127.0.0.1'
+MENSAGEM = 'Gastei 45,90 no mercado'
+
+
+class Eco:
+    """Orquestrador que devolve a mensagem (sem custo de processamento)"""
+
+    async def process(self, message: str, user_id: str = None, attachments: list = None) -> str:
+        return message
+
+
+def _dispatcher() -> MessageDispatcher:
+    # Limites altos: nenhuma mensagem é recusada durante a medição
+    admissao = AdmissionController(max_concurrent=256, max_queue=100000,
+                                   user_rate=1e9, user_burst=10 ** 9)
+    return MessageDispatcher(Eco(), admissao)
+
+
+def _resumo(nome: str, latencias, segundos: float):
+    ordenadas = sorted(latencias)
+    p99 = ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.99))]
+    print(f"{nome:24s} p50 {statistics.median(ordenadas) * 1e6:7.0f} µs  "
+          f"p99 {p99 * 1e6:7.0f} µs  {len(latencias) / segundos:8.0f} msg/s")
+
+
+async def canal(porta: int, mensagens: int, simultaneas: int):
+    """Latência por mensagem no canal, com `simultaneas` em andamento na conexão"""
+    reader, writer = await asyncio.open_connection(HOST, porta)
+    esperando = {}
+
+    async def ler_respostas():
+        while True:
+            frame = await read_frame(reader)
+            if frame is None:
+                return
+            esperando.pop(frame['id']).set_result(time.perf_counter())
+
+    leitor = asyncio.create_task(ler_respostas())
+    latencias = []
+    proximo = iter(range(mensagens))
+
+    async def cliente():
+        loop = asyncio.get_running_loop()
+        for i in proximo:
+            futuro = esperando[i] = loop.create_future()
+            inicio = time.perf_counter()
+            writer.write(encode_frame({'id': i, 'message': MENSAGEM, 'user_id': f'u{i % simultaneas}'}))
+            latencias.append(await futuro - inicio)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente() for _ in range(simultaneas)))
+    segundos = time.perf_counter() - inicio
+    leitor.cancel()
+    writer.close()
+    return latencias, segundos
+
+
+async def http(porta: int, mensagens: int, simultaneas: int, keep_alive: bool):
+    """Latência por POST /process, com `simultaneas` requisições em andamento"""
+    conector = aiohttp.TCPConnector(force_close=not keep_alive, limit=simultaneas)
+    latencias = []
+    proximo = iter(range(mensagens))
+
+    async with aiohttp.ClientSession(connector=conector) as sessao:
+        async def cliente():
+            for i in proximo:
+                inicio = time.perf_counter()
+                async with sessao.post(f'http://{HOST}:{porta}/process',
+                                       json={'message': MENSAGEM, 'user_id': f'u{i % simultaneas}'}) as resp:
+                    await resp.json()
+                latencias.append(time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente() for _ in range(simultaneas)))
+        segundos = time.perf_counter() - inicio
+    return latencias, segundos
+
+
+async def rodar(args):
+    dispatcher = _dispatcher()
+    app = web.Application()
+    app['dispatcher'] = dispatcher
+    app.add_routes(routes)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, HOST, args.porta_http)
+    await site.start()
+    ponte = BridgeChannel(dispatcher, host=HOST, port=args.porta_canal)
+    await ponte.start()
+
+    try:
+        print(f"{args.mensagens} mensagens por modo, frame de {HEADER.size} + "
+              f"{len(encode_frame({'message': MENSAGEM})) - HEADER.size} bytes no canal")
+        for simultaneas in (1, args.simultaneas):
+            print(f"-- {simultaneas} em andamento")
+            # Aquecimento (conexões, caches do JSON) fora da medição
+            await canal(args.porta_canal, 200, simultaneas)
+            await http(args.porta_http, 200, simultaneas, keep_alive=True)
+            _resumo('canal persistente', *await canal(args.porta_canal, args.mensagens, simultaneas))
+            _resumo('HTTP keep-alive', *await http(args.porta_http, args.mensagens, simultaneas, True))
+            _resumo('HTTP conexão nova', *await http(args.porta_http, args.mensagens, simultaneas, False))
+    finally:
+        await ponte.stop()
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--mensagens', type=int, default=2000)
+    parser.add_argument('--simultaneas', type=int, default=16, help='mensagens em andamento no modo concorrente')
+    parser.add_argument('--porta-http', type=int, default=5901)
+    parser.add_argument('--porta-canal', type=int, default=5902)
+    args = parser.parse_args()
+    asyncio.run(rodar(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+⏱️ Benchmark do Perfil de Ruído na Detecção de Voz
+Áudios sintéticos (sílabas moduladas sobre ruído de fundo de cada usuário)
+segmentados com o piso estimado por áudio e com o perfil calibrado
+
+Cada usuário grava 3 notas com pausas (viram o perfil, como em
+PerfisDeRuido); depois vêm notas de teste densas (quase sem pausas) e
+normais. Mede o acerto do VAD por quadro (voz/silêncio contra o gabarito
+do gerador), se os cortes caem em silêncio de verdade e o tempo de
+segmentação.
+
+Não mede a qualidade da transcrição: o áudio é sintético (não há fala de
+verdade para reconhecer). A taxa de erro de palavras (WER) precisaria do
+modelo Vosk e de gravações reais com transcrição de referência.
+
+Uso (na raiz do projeto):
+    python benchmarks/ruido_voz.py
+    python benchmarks/ruido_voz.py --notas 6 --salvar /tmp/notas
+"""
+import os
+import sys
+import math
+import time
+import wave
+import random
+import argparse
+import statistics
+from array import array
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from modules.vad import QUADRO_MS, dividir, energias, limiar_de_voz, piso_confiavel
+
+# Como em modules/voz.py (importá-lo exigiria o speech_recognition)
+TAXA_AMOSTRAGEM = 16000
+CALIBRACAO_PERFIL = 3  # PerfisDeRuido.CALIBRACAO
+
+USUARIOS = {'silencioso': 60, 'escritorio': 250, 'rua': 600}  # Amplitude do ruído
+
+# (segundos, fala?) de cada tipo de nota
+CALIBRACAO = [(0.8, False), (4, True), (0.7, False), (5, True), (0.8, False)]
+DENSA = [(0.2, False)] + [(9, True), (0.4, False)] * 5
+NORMAL = [(0.5, False)] + [(5, True), (0.8, False)] * 6
+
+AMOSTRAS_POR_QUADRO = TAXA_AMOSTRAGEM * QUADRO_MS // 1000
+
+
+def nota(padrao, ruido: float, rnd: random.Random):
+    """(PCM 16 bits, fala? por quadro) de uma nota com o padrão dado"""
+    pcm, verdade = array('h'), []
+    for segundos, fala in padrao:
+        total = int(segundos * TAXA_AMOSTRAGEM)
+        for i in range(total):
+            amostra = 0.0
+            if fala:
+                envelope = 0.3 + 0.7 * abs(math.sin(math.pi * i / (TAXA_AMOSTRAGEM * 0.22)))  # ~4,5 sílabas/s
+                amostra = 2500 * envelope * math.sin(i * 0.25 + 0.002 * i * math.sin(i / 900))
+            pcm.append(max(-32768, min(32767, int(amostra + rnd.uniform(-ruido, ruido)))))
+        verdade += [fala] * total
+    quadros = [sum(verdade[i:i + AMOSTRAS_POR_QUADRO]) > AMOSTRAS_POR_QUADRO / 2
+               for i in range(0, len(verdade), AMOSTRAS_POR_QUADRO)]
+    return pcm.tobytes(), quadros
+
+
+def avaliar(pcm: bytes, verdade, piso):
+    """(segundos, acerto do VAD por quadro, cortes em silêncio, cortes)"""
+    inicio = time.perf_counter()
+    energia = energias(pcm, TAXA_AMOSTRAGEM)
+    trechos = dividir(energia, len(pcm), TAXA_AMOSTRAGEM, 20.0, piso=piso)
+    segundos = time.perf_counter() - inicio
+
+    limiar = limiar_de_voz(energia, piso)
+    acerto_vad = sum((e > limiar) == fala for e, fala in zip(energia, verdade)) / len(verdade)
+    cortes = [fim // (AMOSTRAS_POR_QUADRO * 2) for _, fim in trechos[:-1]]
+    em_silencio = sum(1 for c in cortes if not verdade[min(c, len(verdade) - 1)])
+    return segundos, acerto_vad, em_silencio, len(cortes)
+
+
+def salvar(caminho: str, pcm: bytes):
+    with wave.open(caminho, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(TAXA_AMOSTRAGEM)
+        f.writeframes(pcm)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--notas', type=int, default=4, help='notas de teste por usuário (metade densas)')
+    parser.add_argument('--salvar', help='pasta para gravar as notas geradas (WAV)')
+    args = parser.parse_args()
+
+    rnd = random.Random(40)
+    if args.salvar:
+        os.makedirs(args.salvar, exist_ok=True)
+
+    resultados = {'por áudio': [], 'perfil': []}
+    for usuario, ruido in USUARIOS.items():
+        # Mesma regra de PerfisDeRuido: média dos pisos confiáveis
+        medidos = []
+        for i in range(CALIBRACAO_PERFIL):
+            pcm, _ = nota(CALIBRACAO, ruido, rnd)
+            medidos.append(piso_confiavel(energias(pcm, TAXA_AMOSTRAGEM)))
+            if args.salvar:
+                salvar(os.path.join(args.salvar, f'{usuario}_calibracao_{i}.wav'), pcm)
+        medidos = [m for m in medidos if m is not None]
+        perfil = sum(medidos) / len(medidos) if medidos else None
+
+        for i in range(args.notas):
+            densa = i % 2 == 0
+            pcm, verdade = nota(DENSA if densa else NORMAL, ruido, rnd)
+            if args.salvar:
+                salvar(os.path.join(args.salvar, f"{usuario}_{'densa' if densa else 'normal'}_{i}.wav"), pcm)
+            for modo, piso in (('por áudio', None), ('perfil', perfil)):
+                resultados[modo].append((densa, *avaliar(pcm, verdade, piso)))
+
+    print(f"{len(USUARIOS)} usuários, {CALIBRACAO_PERFIL} notas de calibração "
+          f"e {args.notas} de teste cada")
+    for modo, linhas in resultados.items():
+        for densa in (True, False):
+            r = [l for l in linhas if l[0] == densa]
+            if not r:
+                continue
+            print(f"{modo:9s} {'densas' if densa else 'normais':7s} "
+                  f"acerto VAD/quadro {statistics.mean(l[2] for l in r):.3f}, "
+                  f"cortes em silêncio {sum(l[3] for l in r)}/{sum(l[4] for l in r)}, "
+                  f"{statistics.mean(l[1] for l in r) * 1000:.1f} ms/nota")
+
+
+if __name__ == '__main__':
+    main()
@@ -22,6 +22,50 @@ class Settings:
     # Limites
     max_message_length: int = 4096
     max_file_size_mb: int = 50
+    spill_to_disk_mb: int = 8      # Anexos maiores que isso saem da memória para o disco
+    
+    # Ponte WhatsApp (api_server)
+    api_host: str = "0.0.0.0"
+    api_port: int = 5001
+    bridge_host: str = "127.0.0.1"
+    bridge_port: int = 5002
+    bridge_socket: str = ""  # Caminho de socket Unix (opcional, substitui TCP)
+    
+    # Controle de admissão (api_server)
+    max_concurrent: int = 8        # Mensagens em execução ao mesmo tempo
+    max_queue: int = 100           # Mensagens aguardando vaga
+    queue_timeout: float = 10.0    # Espera máxima por uma vaga (segundos)
+    user_rate: float = 1.0         # Mensagens por segundo por usuário
+    user_burst: int = 10           # Rajada máxima por usuário
+    
+    # Modo sharded (api_server --shards N)
+    shards: int = 1                # Workers; cada um dono de uma faixa de usuários
+    shard_base_port: int = 5100    # Worker i escuta em shard_base_port + i
+    
+    # Telegram
+    telegram_mode: str = "polling"          # polling (desenvolvimento) ou webhook
+    telegram_webhook_url: str = ""          # URL pública, ex: https://meu.dominio/telegram/webhook
+    telegram_webhook_path: str = "/telegram/webhook"
+    telegram_webhook_secret: str = ""       # Vazio = gerado ao iniciar
+    telegram_text_concurrency: int = 32     # Updates de texto em paralelo
+    telegram_media_concurrency: int = 4     # Áudios/arquivos (jobs) processados em paralelo
+    telegram_merge_window: float = 0.1      # Junta respostas ao mesmo chat nesse intervalo (s)
+    
+    # Voz (transcrição offline com Vosk)
+    vosk_model_path: str = "models/vosk-model-small-pt-0.3"
+    voz_workers: int = 0           # Processos de transcrição (0 = um por núcleo)
+    voz_cache_mb: int = 20         # Cache de transcrições em disco (áudios repetidos)
+    
+    # Faturas (extração de texto dos PDFs em processos separados)
+    pdf_workers: int = 0           # Processos de extração (0 = um por núcleo)
+    pdf_timeout: float = 30.0      # Segundos por PDF antes de desistir
+    pdf_max_pages: int = 20        # Páginas lidas no máximo (a leitura para antes, se achar o boleto)
+    pdf_max_memory_mb: int = 1024  # Memória virtual máxima de cada processo
+    pdf_cache_mb: int = 20         # Cache em disco do texto extraído (PDFs reenviados)
+    ocr_timeout: float = 60.0      # Segundos por foto (OCR no mesmo pool dos PDFs)
+    pdf_ocr_max_pages: int = 3     # Páginas de um PDF escaneado lidas com OCR
+    lote_max_arquivos: int = 50    # Arquivos por envio em lote (vários anexos ou ZIP/TAR)
+    aviso_boletos_dias: int = 3    # Aviso diário no Telegram dos boletos que vencem em até N dias (0 = desligado)
     
     def __post_init__(self):
         """Carrega valores do ambiente"""
@@ -30,6 +74,39 @@ class Settings:
         self.timezone = os.getenv('TIMEZONE', 'America/Sao_Paulo')
         self.language = os.getenv('LANGUAGE', 'pt-BR')
         self.database_url = os.getenv('DATABASE_URL', self.database_url)
+        self.max_file_size_mb = int(os.getenv('MAX_FILE_SIZE_MB', self.max_file_size_mb))
+        self.spill_to_disk_mb = int(os.getenv('SPILL_TO_DISK_MB', self.spill_to_disk_mb))
+        self.api_host = os.getenv('API_HOST', self.api_host)
+        self.api_port = int(os.getenv('API_PORT', self.api_port))
+        self.bridge_host = os.getenv('BRIDGE_HOST', self.bridge_host)
+        self.bridge_port = int(os.getenv('BRIDGE_PORT', self.bridge_port))
+        self.bridge_socket = os.getenv('BRIDGE_SOCKET', self.bridge_socket)
+        self.max_concurrent = int(os.getenv('MAX_CONCURRENT', self.max_concurrent))
+        self.max_queue = int(os.getenv('MAX_QUEUE', self.max_queue))
+        self.queue_timeout = float(os.getenv('QUEUE_TIMEOUT', self.queue_timeout))
+        self.user_rate = float(os.getenv('USER_RATE', self.user_rate))
+        self.user_burst = int(os.getenv('USER_BURST', self.user_burst))
+        self.shards = int(os.getenv('API_SHARDS', self.shards))
+        self.shard_base_port = int(os.getenv('SHARD_BASE_PORT', self.shard_base_port))
+        self.telegram_mode = os.getenv('TELEGRAM_MODE', self.telegram_mode).lower()
+        self.telegram_webhook_url = os.getenv('TELEGRAM_WEBHOOK_URL', self.telegram_webhook_url)
+        self.telegram_webhook_path = os.getenv('TELEGRAM_WEBHOOK_PATH', self.telegram_webhook_path)
+        self.telegram_webhook_secret = os.getenv('TELEGRAM_WEBHOOK_SECRET', self.telegram_webhook_secret)
+        self.telegram_text_concurrency = int(os.getenv('TELEGRAM_TEXT_CONCURRENCY', self.telegram_text_concurrency))
+        self.telegram_media_concurrency = int(os.getenv('TELEGRAM_MEDIA_CONCURRENCY', self.telegram_media_concurrency))
+        self.telegram_merge_window = float(os.getenv('TELEGRAM_MERGE_WINDOW', self.telegram_merge_window))
+        self.vosk_model_path = os.getenv('VOSK_MODEL_PATH', self.vosk_model_path)
+        self.voz_workers = int(os.getenv('VOZ_WORKERS', self.voz_workers))
+        self.voz_cache_mb = int(os.getenv('VOZ_CACHE_MB', self.voz_cache_mb))
+        self.pdf_workers = int(os.getenv('PDF_WORKERS', self.pdf_workers))
+        self.pdf_timeout = float(os.getenv('PDF_TIMEOUT', self.pdf_timeout))
+        self.pdf_max_pages = int(os.getenv('PDF_MAX_PAGES', self.pdf_max_pages))
+        self.pdf_max_memory_mb = int(os.getenv('PDF_MAX_MEMORY_MB', self.pdf_max_memory_mb))
+        self.pdf_cache_mb = int(os.getenv('PDF_CACHE_MB', self.pdf_cache_mb))
+        self.ocr_timeout = float(os.getenv('OCR_TIMEOUT', self.ocr_timeout))
+        self.pdf_ocr_max_pages = int(os.getenv('PDF_OCR_MAX_PAGES', self.pdf_ocr_max_pages))
+        self.lote_max_arquivos = int(os.getenv('LOTE_MAX_ARQUIVOS', self.lote_max_arquivos))
+        self.aviso_boletos_dias = int(os.getenv('AVISO_BOLETOS_DIAS', self.aviso_boletos_dias))
 
 
 # Mapeamento de comandos para módulos
@@ -128,6 +205,8 @@ Digite /ajuda para ver todos os comandos.
 
 *Sistema:*
 /status - Status do sistema
+/jobs - Arquivos e áudios em processamento
+/cancelar [id] - Cancelar um processamento
 /config - Configurações
 """,
     
@@ -0,0 +1,132 @@
+"""
+🔌 Canal persistente com a ponte WhatsApp (Node.js)
+Uma única conexão TCP/Unix multiplexada com frames JSON prefixados por tamanho
+"""
+import os
+import json
+import struct
+import asyncio
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Cabeçalho: tamanho do corpo em 4 bytes (big-endian)
+HEADER = struct.Struct('>I')
+MAX_FRAME_SIZE = 1024 * 1024
+
+
+class FrameInvalido(ValueError):
+    """Frame lido por inteiro mas sem um objeto JSON: a conexão segue"""
+
+
+def encode_frame(payload: dict) -> bytes:
+    """Serializa um payload como frame (tamanho + JSON)"""
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    return HEADER.pack(len(body)) + body
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Optional[dict]:
+    """Lê um frame; retorna None quando a conexão é encerrada"""
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError:
+        return None
+
+    (size,) = HEADER.unpack(header)
+    if size > MAX_FRAME_SIZE:
+        raise ValueError(f'frame muito grande: {size} bytes')
+
+    try:
+        body = await reader.readexactly(size)
+    except asyncio.IncompleteReadError:
+        # Conexão caiu no meio do corpo: o frame incompleto é descartado
+        return None
+    try:
+        frame = json.loads(body.decode('utf-8'))
+    except ValueError:
+        raise FrameInvalido('frame não é JSON válido') from None
+    if not isinstance(frame, dict):
+        raise FrameInvalido('frame não é um objeto JSON')
+    return frame
+
+
+class BridgeChannel:
+    """
+    Servidor do canal persistente
+
+    Protocolo (um frame por mensagem, em ambos os sentidos):
+        → {"id": 1, "message": "...", "user_id": "...", "user_name": "..."}
+        ← {"id": 1, "success": true, "response": "..."}
+
+    O "id" é o identificador de correlação: várias mensagens podem estar
+    em andamento na mesma conexão e as respostas voltam fora de ordem.
+    """
+
+    def __init__(self, dispatcher, host: str = '127.0.0.1', port: int = 5002,
+                 socket_path: str = None):
+        self.dispatcher = dispatcher
+        self.host = host
+        self.port = port
+        self.socket_path = socket_path
+        self.server = None
+
+    async def start(self):
+        """Abre o servidor (socket Unix se configurado, senão TCP local)"""
+        if self.socket_path:
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            self.server = await asyncio.start_unix_server(
+                self._handle_connection, path=self.socket_path
+            )
+            logger.info(f"🔌 Canal da ponte em {self.socket_path}")
+        else:
+            self.server = await asyncio.start_server(
+                self._handle_connection, host=self.host, port=self.port
+            )
+            logger.info(f"🔌 Canal da ponte em {self.host}:{self.port}")
+
+    async def stop(self):
+        """Fecha o servidor"""
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def _handle_connection(self, reader: asyncio.StreamReader,
+                                 writer: asyncio.StreamWriter):
+        """Atende uma conexão: lê frames e responde conforme terminam"""
+        write_lock = asyncio.Lock()
+        tasks = set()
+
+        async def enviar(result: dict):
+            async with write_lock:
+                writer.write(encode_frame(result))
+                await writer.drain()
+
+        async def responder(frame: dict):
+            result = await self.dispatcher.process_item(frame)
+            result['id'] = frame.get('id')
+            await enviar(result)
+
+        try:
+            while True:
+                try:
+                    frame = await read_frame(reader)
+                except FrameInvalido as e:
+                    # Sem id para correlacionar: o erro vai com id nulo
+                    logger.warning(f"Frame inválido da ponte: {e}")
+                    await enviar({'id': None, 'success': False, 'response': f'Erro: {e}'})
+                    continue
+                if frame is None:
+                    break
+
+                task = asyncio.create_task(responder(frame))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ConnectionError, ValueError) as e:
+            logger.warning(f"Conexão da ponte encerrada: {e}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
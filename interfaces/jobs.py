@@ -0,0 +1,242 @@
+"""
+⏱️ Jobs em Segundo Plano
+Processa mídia pesada (PDF, OCR, transcrição) fora do handler do Telegram,
+editando uma mensagem de progresso no lugar
+"""
+import time
+import asyncio
+import logging
+import itertools
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from interfaces.outbox import Outbox, dividir_markdown
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Job:
+    """Um processamento em segundo plano"""
+    id: str
+    user_id: str
+    chat_id: int
+    descricao: str
+    status: str = 'na fila'    # na fila, processando, concluído, cancelado, erro
+    etapa: str = ''            # Texto de progresso atual
+    criado_em: float = field(default_factory=time.monotonic)
+    concluido_em: Optional[float] = None
+    mensagem: Any = None       # Message de progresso (editada no lugar)
+    task: Optional[asyncio.Task] = None
+    gerenciador: Any = field(default=None, repr=False)
+    ultima_edicao: float = 0.0
+
+    @property
+    def ativo(self) -> bool:
+        return self.status in ('na fila', 'processando')
+
+    @property
+    def duracao(self) -> float:
+        return (self.concluido_em or time.monotonic()) - self.criado_em
+
+    async def progresso(self, etapa: str):
+        """Informa o andamento (a mensagem é editada no máximo a cada intervalo)"""
+        self.etapa = etapa
+        await self.gerenciador._atualizar(self)
+
+
+# Recebe o Job (para informar progresso) e retorna o texto final
+Trabalho = Callable[[Job], Awaitable[str]]
+
+
+class JobManager:
+    """
+    Fila de jobs com limite de concorrência
+
+    - submit() responde na hora com uma mensagem "processando" e retorna
+    - jobs do mesmo chat rodam um de cada vez, na ordem de envio (os
+      resultados chegam na ordem dos arquivos); chats diferentes, em paralelo
+    - o trabalho roda numa task; job.progresso() edita essa mensagem
+    - o resultado substitui a mensagem (ou vai em mensagens novas, se for longo)
+    - jobs podem ser cancelados pelo dono (/cancelar ou botão)
+    """
+
+    EMOJI = {
+        'na fila': '🕓',
+        'processando': '⏳',
+        'concluído': '✅',
+        'cancelado': '🚫',
+        'erro': '❌',
+    }
+
+    def __init__(self, outbox: Outbox, max_concurrent: int = 4,
+                 max_por_usuario: int = 5, historico: int = 10,
+                 intervalo_edicao: float = 1.5):
+        self.outbox = outbox
+        self.max_por_usuario = max_por_usuario
+        self.historico = historico
+        self.intervalo_edicao = intervalo_edicao
+
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._ids = itertools.count(1)
+        self._jobs: Dict[str, Job] = {}
+        self._por_usuario: Dict[str, List[str]] = {}
+        self._chats: Dict[int, asyncio.Lock] = {}
+        self._na_fila_do_chat: Dict[int, int] = {}
+        self._parando = False
+
+    def submit(self, user_id: str, chat_id: int, descricao: str,
+               trabalho: Trabalho, origem: Any = None) -> Optional[Job]:
+        """
+        Enfileira um trabalho e retorna imediatamente
+
+        Returns:
+            O Job, ou None se o usuário já tem max_por_usuario jobs ativos
+        """
+        if len(self.ativos(user_id)) >= self.max_por_usuario:
+            return None
+
+        job = Job(id=str(next(self._ids)), user_id=user_id,
+                  chat_id=chat_id, descricao=descricao, gerenciador=self)
+        self._registrar(job)
+
+        aviso = self.outbox.send(
+            chat_id, self._texto(job), parse_mode=None, origem=origem,
+            reply_markup=self._botao(job), merge=False
+        )
+        job.task = asyncio.create_task(self._executar(job, trabalho, aviso))
+        return job
+
+    def ativos(self, user_id: str) -> List[Job]:
+        return [j for j in self.listar(user_id) if j.ativo]
+
+    def listar(self, user_id: str) -> List[Job]:
+        """Jobs do usuário (ativos e recentes), do mais antigo ao mais novo"""
+        return [self._jobs[i] for i in self._por_usuario.get(user_id, [])]
+
+    def cancelar(self, job_id: str, user_id: str) -> bool:
+        """Cancela um job ativo do usuário"""
+        job = self._jobs.get(job_id)
+        if not job or job.user_id != user_id or not job.ativo:
+            return False
+        job.task.cancel()
+        return True
+
+    async def stop(self):
+        """Cancela todos os jobs ativos (sem editar as mensagens)"""
+        self._parando = True
+        tasks = [j.task for j in self._jobs.values() if j.ativo and j.task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def formatar_lista(self, user_id: str) -> str:
+        """Texto do comando /jobs"""
+        jobs = self.listar(user_id)
+        if not jobs:
+            return "📭 Nenhum arquivo ou áudio em processamento."
+
+        linhas = ["⏱️ *Seus jobs:*\n"]
+        for job in reversed(jobs):
+            linha = f"{self.EMOJI[job.status]} `{job.id}` {job.descricao} - {job.status} ({job.duracao:.0f}s)"
+            if job.ativo and job.etapa:
+                linha += f"\n      _{job.etapa}_"
+            linhas.append(linha)
+
+        if any(j.ativo for j in jobs):
+            linhas.append("\nPara cancelar: /cancelar [id]")
+        return '\n'.join(linhas)
+
+    # ---------- Execução ----------
+
+    async def _executar(self, job: Job, trabalho: Trabalho, aviso: asyncio.Future):
+        resultado = None
+        try:
+            job.mensagem = await aviso
+            async with self._vez_do_chat(job.chat_id), self._slots:
+                job.status = 'processando'
+                await self._atualizar(job, forcar=True)
+                resultado = await trabalho(job)
+            job.status = 'concluído'
+        except asyncio.CancelledError:
+            job.status = 'cancelado'
+        except Exception as e:
+            logger.error(f"Erro no job {job.id} ({job.descricao}): {e}")
+            job.status = 'erro'
+            resultado = f"❌ Erro ao processar: {e}"
+
+        job.concluido_em = time.monotonic()
+        if not self._parando:
+            await self._finalizar(job, resultado)
+
+    @asynccontextmanager
+    async def _vez_do_chat(self, chat_id: int):
+        """Espera os jobs anteriores do chat terminarem (Lock do asyncio é FIFO)"""
+        lock = self._chats.setdefault(chat_id, asyncio.Lock())
+        self._na_fila_do_chat[chat_id] = self._na_fila_do_chat.get(chat_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            # Remove o lock quando o chat não tem mais jobs esperando
+            self._na_fila_do_chat[chat_id] -= 1
+            if not self._na_fila_do_chat[chat_id]:
+                del self._na_fila_do_chat[chat_id]
+                self._chats.pop(chat_id, None)
+
+    async def _atualizar(self, job: Job, forcar: bool = False):
+        """Edita a mensagem de progresso (limitado a uma edição por intervalo)"""
+        agora = time.monotonic()
+        if not job.mensagem or (not forcar and agora - job.ultima_edicao < self.intervalo_edicao):
+            return
+        job.ultima_edicao = agora
+        await self.outbox.editar(job.mensagem, self._texto(job), parse_mode=None,
+                                 reply_markup=self._botao(job))
+
+    async def _finalizar(self, job: Job, resultado: Optional[str]):
+        """Troca a mensagem de progresso pelo resultado"""
+        if not resultado:
+            job.etapa = ''
+            if job.mensagem:
+                await self.outbox.editar(job.mensagem, self._texto(job), parse_mode=None)
+            return
+
+        # Resultado curto: substitui a mensagem de progresso
+        if job.mensagem and len(dividir_markdown(resultado, self.outbox.max_length)) == 1:
+            if await self.outbox.editar(job.mensagem, resultado):
+                return
+
+        # Longo (ou sem mensagem de progresso): marca como concluído e envia em partes
+        job.etapa = ''
+        if job.mensagem:
+            await self.outbox.editar(job.mensagem, self._texto(job), parse_mode=None)
+        self.outbox.send(job.chat_id, resultado, merge=False)
+
+    # ---------- Auxiliares ----------
+
+    def _registrar(self, job: Job):
+        """Guarda o job e descarta os concluídos mais antigos do usuário"""
+        self._jobs[job.id] = job
+        ids = self._por_usuario.setdefault(job.user_id, [])
+        ids.append(job.id)
+
+        concluidos = [i for i in ids if not self._jobs[i].ativo]
+        for job_id in concluidos[:max(0, len(concluidos) - self.historico)]:
+            ids.remove(job_id)
+            del self._jobs[job_id]
+
+    def _texto(self, job: Job) -> str:
+        texto = f"{self.EMOJI[job.status]} {job.descricao} - {job.status}"
+        if job.etapa:
+            texto += f"\n{job.etapa}"
+        return texto
+
+    @staticmethod
+    def _botao(job: Job) -> Optional[InlineKeyboardMarkup]:
+        if not job.ativo:
+            return None
+        return InlineKeyboardMarkup([[
+            InlineKeyboardButton("Cancelar", callback_data=f"job:cancelar:{job.id}")
+        ]])
@@ -0,0 +1,286 @@
+"""
+📮 Fila de Envio do Telegram
+Respeita os limites de envio, divide respostas longas e agrupa respostas próximas
+"""
+import re
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+from telegram.error import BadRequest, NetworkError, RetryAfter
+
+from middleware.admission import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+def _tamanho(texto: str) -> int:
+    """Tamanho como o Telegram conta (unidades UTF-16)"""
+    return len(texto.encode('utf-16-le')) // 2
+
+
+# _ colado em letras dos dois lados (nome_de_arquivo) não abre nem fecha itálico
+MARCA_ITALICO = re.compile(r'(?<!\w)_|_(?!\w)')
+
+
+def _equilibrado(trecho: str) -> bool:
+    """Verifica se a marcação Markdown (*, _, `, ```) fecha dentro do trecho"""
+    blocos = trecho.split('```')
+    if len(blocos) % 2 == 0:
+        return False  # Bloco ``` aberto
+    # Dentro de blocos ``` e de `código` os símbolos não são marcação
+    trechos_inline = ''.join(blocos[::2]).split('`')
+    if len(trechos_inline) % 2 == 0:
+        return False  # `código` aberto
+    texto = ''.join(trechos_inline[::2])
+    return texto.count('*') % 2 == 0 and len(MARCA_ITALICO.findall(texto)) % 2 == 0
+
+
+def _ponto_de_corte(texto: str, limite: int) -> int:
+    """Escolhe onde cortar: parágrafo, linha ou espaço, sem quebrar a marcação"""
+    fim = min(len(texto), limite)
+    if _tamanho(texto[:fim]) > limite:
+        # Emojis e afins contam 2 unidades: maior prefixo que cabe, por busca binária
+        cabe, nao_cabe = 0, fim
+        while nao_cabe - cabe > 1:
+            meio = (cabe + nao_cabe) // 2
+            if _tamanho(texto[:meio]) <= limite:
+                cabe = meio
+            else:
+                nao_cabe = meio
+        fim = max(cabe, 1)  # Cada corte avança pelo menos um caractere
+
+    janela = texto[:fim]
+    minimo = fim // 2  # Evita partes muito pequenas
+    reserva = None
+
+    for separador in ('\n\n', '\n', ' '):
+        pos = janela.rfind(separador)
+        while pos > minimo:
+            if _equilibrado(janela[:pos]):
+                return pos
+            if reserva is None:
+                reserva = pos
+            pos = janela.rfind(separador, 0, pos)
+
+    return reserva or fim
+
+
+def dividir_markdown(texto: str, limite: int = 4096) -> List[str]:
+    """
+    Divide um texto em partes de até `limite` caracteres
+
+    Prefere cortar entre parágrafos/linhas sem deixar *negrito*, _itálico_
+    ou `código` abertos; blocos ``` cortados são fechados e reabertos.
+    """
+    partes = []
+    restante = texto
+
+    while _tamanho(restante) > limite:
+        # Margem para fechar um bloco de código aberto
+        corte = _ponto_de_corte(restante, limite - 4)
+        parte, restante = restante[:corte].rstrip(), restante[corte:].lstrip()
+
+        if parte.count('```') % 2:
+            parte += '\n```'
+            restante = '```\n' + restante
+
+        partes.append(parte)
+
+    if restante.strip():
+        partes.append(restante)
+
+    return partes
+
+
+@dataclass
+class _Envio:
+    """Mensagem aguardando envio"""
+    texto: str
+    parse_mode: Optional[str]
+    origem: Any            # Message a responder (ou None)
+    reply_markup: Any
+    merge: bool
+    future: asyncio.Future
+
+
+class Outbox:
+    """
+    Fila de saída por chat
+
+    - Limite por chat (1/s em privado, 20/min em grupos) e global (30/s)
+    - Respostas maiores que max_length são divididas em partes
+    - Respostas ao mesmo chat dentro de merge_window viram uma só mensagem
+    - RetryAfter pausa apenas a fila daquele chat
+    """
+
+    def __init__(self, bot=None, max_length: int = 4096,
+                 chat_rate: float = 1.0, group_rate: float = 20 / 60,
+                 burst: int = 3, global_rate: float = 30.0,
+                 merge_window: float = 0.1, max_retries: int = 3):
+        self.bot = bot
+        self.max_length = max_length
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.burst = burst
+        self.merge_window = merge_window
+        self.max_retries = max_retries
+
+        self._global = TokenBucket(global_rate, global_rate)
+        self._buckets: Dict[int, TokenBucket] = {}
+        self._filas: Dict[int, Deque[_Envio]] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+
+    def send(self, chat_id: int, texto: str, parse_mode: Optional[str] = 'Markdown',
+             origem: Any = None, reply_markup: Any = None,
+             merge: bool = True) -> asyncio.Future:
+        """
+        Enfileira uma mensagem e retorna imediatamente
+
+        Returns:
+            Future com a Message enviada (a primeira parte), ou None se falhar.
+            Use merge=False para mensagens que serão editadas depois.
+        """
+        future = asyncio.get_running_loop().create_future()
+        envio = _Envio(texto, parse_mode, origem, reply_markup,
+                       merge and reply_markup is None, future)
+
+        self._filas.setdefault(chat_id, deque()).append(envio)
+        if chat_id not in self._workers:
+            self._workers[chat_id] = asyncio.create_task(self._worker(chat_id))
+
+        return future
+
+    async def stop(self):
+        """Cancela os envios pendentes"""
+        for task in list(self._workers.values()):
+            task.cancel()
+        for fila in self._filas.values():
+            for envio in fila:
+                if not envio.future.done():
+                    envio.future.set_result(None)
+        self._filas.clear()
+
+    def _bucket(self, chat_id: int) -> TokenBucket:
+        if chat_id not in self._buckets:
+            # IDs negativos são grupos/canais
+            rate = self.group_rate if chat_id < 0 else self.chat_rate
+            self._buckets[chat_id] = TokenBucket(rate, self.burst)
+        return self._buckets[chat_id]
+
+    async def _worker(self, chat_id: int):
+        """Esvazia a fila de um chat, em ordem"""
+        fila = self._filas[chat_id]
+        bucket = self._bucket(chat_id)
+        try:
+            while fila:
+                lote = [fila.popleft()]
+
+                if lote[0].merge and self.merge_window:
+                    await asyncio.sleep(self.merge_window)
+                await bucket.wait()
+
+                # Agrupa o que chegou enquanto esperava
+                while lote[0].merge and fila and self._pode_juntar(lote[0], fila[0]):
+                    lote.append(fila.popleft())
+
+                await self._entregar(chat_id, lote, bucket)
+        finally:
+            self._workers.pop(chat_id, None)
+            if not fila:
+                self._filas.pop(chat_id, None)
+                if self._buckets.get(chat_id) is bucket and bucket.full:
+                    del self._buckets[chat_id]
+
+    @staticmethod
+    def _pode_juntar(primeiro: _Envio, proximo: _Envio) -> bool:
+        return proximo.merge and proximo.parse_mode == primeiro.parse_mode
+
+    async def _entregar(self, chat_id: int, lote: List[_Envio], bucket: TokenBucket):
+        """Envia um lote (já agrupado) dividido em partes"""
+        texto = '\n\n'.join(envio.texto.strip() for envio in lote)
+        partes = dividir_markdown(texto, self.max_length)
+        primeira = None
+
+        try:
+            for i, parte in enumerate(partes):
+                if i:
+                    await bucket.wait()
+                await self._global.wait()
+
+                mensagem = await self._enviar(
+                    chat_id, parte, lote[0],
+                    responder=(i == 0),
+                    reply_markup=lote[-1].reply_markup if i == len(partes) - 1 else None
+                )
+                primeira = primeira or mensagem
+        except Exception as e:
+            logger.error(f"Erro ao enviar mensagem para {chat_id}: {e}")
+
+        for envio in lote:
+            if not envio.future.done():
+                envio.future.set_result(primeira)
+
+    async def editar(self, mensagem: Any, texto: str, parse_mode: Optional[str] = 'Markdown',
+                     reply_markup: Any = None):
+        """
+        Edita uma mensagem já enviada (ex: progresso), respeitando os limites do chat
+
+        Returns:
+            A Message editada, ou None se falhar
+        """
+        chat_id = mensagem.chat_id
+        await self._bucket(chat_id).wait()
+        await self._global.wait()
+
+        try:
+            return await self._tentar(
+                chat_id, parse_mode,
+                lambda pm: mensagem.edit_text(texto, parse_mode=pm, reply_markup=reply_markup)
+            )
+        except BadRequest as e:
+            if 'not modified' in str(e).lower():
+                return mensagem
+            logger.error(f"Erro ao editar mensagem em {chat_id}: {e}")
+        except Exception as e:
+            logger.error(f"Erro ao editar mensagem em {chat_id}: {e}")
+        return None
+
+    async def _enviar(self, chat_id: int, texto: str, envio: _Envio,
+                      responder: bool, reply_markup: Any):
+        """Envia uma parte (como resposta à origem, se houver)"""
+        if responder and envio.origem is not None:
+            chamada = lambda pm: envio.origem.reply_text(
+                texto, parse_mode=pm, reply_markup=reply_markup
+            )
+        else:
+            chamada = lambda pm: self.bot.send_message(
+                chat_id=chat_id, text=texto, parse_mode=pm, reply_markup=reply_markup
+            )
+        return await self._tentar(chat_id, envio.parse_mode, chamada)
+
+    async def _tentar(self, chat_id: int, parse_mode: Optional[str],
+                      chamada: Callable[[Optional[str]], Awaitable[Any]]):
+        """Executa a chamada à API, repetindo em RetryAfter/erro de rede"""
+        for tentativa in range(self.max_retries + 1):
+            try:
+                return await chamada(parse_mode)
+            except RetryAfter as e:
+                espera = e.retry_after
+                if hasattr(espera, 'total_seconds'):
+                    espera = espera.total_seconds()
+                logger.warning(f"RetryAfter em {chat_id}: aguardando {espera}s")
+                await asyncio.sleep(espera)
+            except BadRequest as e:
+                # Markdown inválido: reenvia como texto puro
+                if parse_mode and 'parse' in str(e).lower():
+                    parse_mode = None
+                    continue
+                raise
+            except NetworkError:
+                if tentativa == self.max_retries:
+                    raise
+                await asyncio.sleep(2 ** tentativa)
+
+        raise RuntimeError('número máximo de tentativas atingido')
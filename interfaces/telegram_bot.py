@@ -2,10 +2,11 @@
  Interface Telegram
 Bot para Telegram usando python-telegram-bot
 """
-import os
+import hmac
 import logging
 import asyncio
 from typing import Optional
+from aiohttp import web
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     Application,
@@ -16,6 +17,12 @@ from telegram.ext import (
     filters
 )
 
+from config.settings import Settings
+from interfaces.update_processor import ChatOrderedUpdateProcessor
+from interfaces.outbox import Outbox
+from interfaces.jobs import Job, JobManager
+from modules.anexos import Anexo, ArquivoGrandeDemais
+
 logger = logging.getLogger(__name__)
 
 
@@ -25,20 +32,34 @@ class TelegramInterface:
     # Nomes que ativam o bot em grupos
     BOT_NAMES = ['bot', 'assistente', 'jarvis', 'alexa', 'siri']
 
-    def __init__(self, token: str, orchestrator):
+    def __init__(self, token: str, orchestrator, settings: Settings = None):
         self.token = token
         self.orchestrator = orchestrator
+        self.settings = settings or Settings()
         self.app = None
         self.voz_module = None
         self.condominio_module = None  # Módulo de condomínio/grupos
         self.bot_username = None  # Será preenchido ao iniciar
+        self.webhook_secret = None  # Definido em start_webhook
+        self._avisos: Optional[asyncio.Task] = None  # Varredura de boletos a vencer
+        self.outbox = Outbox(
+            max_length=self.settings.max_message_length,
+            merge_window=self.settings.telegram_merge_window
+        )
+        self.jobs = JobManager(
+            self.outbox,
+            max_concurrent=self.settings.telegram_media_concurrency
+        )
         self._setup_condominio_module()
 
     def _setup_condominio_module(self):
         """Configura módulo de condomínio"""
         try:
             from modules.condominio import CondominioModule
-            self.condominio_module = CondominioModule()
+            # Mesma pasta de dados do orquestrador (data/shards/<n> num worker)
+            self.condominio_module = CondominioModule(
+                data_dir=getattr(self.orchestrator, 'data_dir', 'data')
+            )
             logger.info("🏢 Módulo de Condomínio configurado")
         except Exception as e:
             logger.warning(f"Módulo de Condomínio não disponível: {e}")
@@ -47,6 +68,37 @@ class TelegramInterface:
         """Define o módulo de voz para transcrição"""
         self.voz_module = voz_module
 
+    def _responder(self, update: Update, texto: str, parse_mode: Optional[str] = 'Markdown',
+                   reply_markup=None, merge: bool = True) -> asyncio.Future:
+        """Enfileira uma resposta no outbox (não bloqueia o handler)"""
+        message = update.effective_message
+        return self.outbox.send(
+            message.chat_id, texto,
+            parse_mode=parse_mode,
+            origem=message,
+            reply_markup=reply_markup,
+            merge=merge
+        )
+
+    async def _baixar(self, file, nome: str) -> Anexo:
+        """Baixa um arquivo do Telegram para a memória (até max_file_size_mb)"""
+        limite = self.settings.max_file_size_mb * 1024 * 1024
+        if file.file_size and file.file_size > limite:
+            raise ArquivoGrandeDemais(file.file_size, limite)
+
+        anexo = Anexo(nome, spill_bytes=self.settings.spill_to_disk_mb * 1024 * 1024)
+        try:
+            await file.download_to_memory(anexo.escrita)
+            if anexo.tamanho > limite:
+                raise ArquivoGrandeDemais(anexo.tamanho, limite)
+        except BaseException:
+            anexo.fechar()
+            raise
+        return anexo
+
+    def _msg_arquivo_grande(self) -> str:
+        return f"❌ Arquivo muito grande. O limite é {self.settings.max_file_size_mb} MB."
+
     def _is_group_chat(self, update: Update) -> bool:
         """Verifica se é chat de grupo"""
         chat_type = update.effective_chat.type
@@ -92,9 +144,20 @@ class TelegramInterface:
         
         return text.strip()
 
-    async def start(self):
-        """Inicia o bot"""
-        self.app = Application.builder().token(self.token).build()
+    def _build_app(self):
+        """Cria a Application com todos os handlers"""
+        # Updates em paralelo, em ordem dentro de cada chat; mídia em faixa própria
+        update_processor = ChatOrderedUpdateProcessor(
+            text_concurrency=self.settings.telegram_text_concurrency,
+            media_concurrency=self.settings.telegram_media_concurrency
+        )
+        self.app = (
+            Application.builder()
+            .token(self.token)
+            .concurrent_updates(update_processor)
+            .build()
+        )
+        self.outbox.bot = self.app.bot
 
         # Handlers
         self.app.add_handler(CommandHandler("start", self.cmd_start))
@@ -102,6 +165,8 @@ class TelegramInterface:
         self.app.add_handler(CommandHandler("help", self.cmd_help))
         self.app.add_handler(CommandHandler("status", self.cmd_status))
         self.app.add_handler(CommandHandler("voz", self.cmd_generic))
+        self.app.add_handler(CommandHandler("jobs", self.cmd_jobs))
+        self.app.add_handler(CommandHandler("cancelar", self.cmd_cancelar))
 
         # Comandos de módulos
         self.app.add_handler(CommandHandler("agenda", self.cmd_generic))
@@ -135,9 +200,12 @@ class TelegramInterface:
         ))
 
         # Callbacks de botões inline
+        self.app.add_handler(CallbackQueryHandler(self.handle_job_callback, pattern=r'^job:'))
         self.app.add_handler(CallbackQueryHandler(self.handle_callback))
 
-        # Inicia polling
+    async def _initialize(self):
+        """Monta e inicia a Application (sem buscar updates ainda)"""
+        self._build_app()
         logger.info(" Telegram Bot iniciado!")
         await self.app.initialize()
         await self.app.start()
@@ -146,13 +214,87 @@ class TelegramInterface:
         bot_info = await self.app.bot.get_me()
         self.bot_username = bot_info.username
         logger.info(f"🤖 Bot username: @{self.bot_username}")
-        
+
+        if self.settings.aviso_boletos_dias > 0 and 'faturas' in self.orchestrator.modules:
+            self._avisos = asyncio.create_task(self._avisar_vencimentos())
+
+    async def _avisar_vencimentos(self, intervalo: float = 3600):
+        """
+        Avisa, no chat privado, dos boletos pendentes que vencem em breve
+
+        Roda de hora em hora; o módulo de faturas só devolve cada boleto
+        uma vez por dia, então o aviso sai no primeiro ciclo do dia.
+        """
+        faturas = self.orchestrator.modules['faturas']
+        while True:
+            try:
+                avisos = faturas.avisos_de_vencimento(self.settings.aviso_boletos_dias)
+                for user_id, texto in avisos.items():
+                    # No Telegram, o chat privado tem o id do usuário
+                    if user_id.isdigit():
+                        self.outbox.send(int(user_id), texto, merge=False)
+            except Exception as e:
+                logger.error(f"Erro ao avisar boletos a vencer: {e}")
+            await asyncio.sleep(intervalo)
+
+    async def start(self):
+        """Inicia o bot em modo polling (padrão para desenvolvimento)"""
+        await self._initialize()
         await self.app.updater.start_polling(drop_pending_updates=True)
 
         # Mantém rodando
         while True:
             await asyncio.sleep(1)
 
+    async def start_webhook(self, url: str, secret_token: str):
+        """
+        Inicia o bot em modo webhook
+
+        Os updates chegam por HTTP em handle_webhook, servido pelo mesmo
+        servidor aiohttp do api_server (mesmo loop de eventos).
+        """
+        self.webhook_secret = secret_token
+        await self._initialize()
+        await self.app.bot.set_webhook(
+            url=url,
+            secret_token=secret_token,
+            drop_pending_updates=True
+        )
+        logger.info(f"🌐 Webhook do Telegram registrado em {url}")
+
+    async def stop(self):
+        """Para o bot"""
+        if not self.app:
+            return
+        if self._avisos:
+            self._avisos.cancel()
+        await self.jobs.stop()
+        await self.outbox.stop()
+        if self.voz_module:
+            self.voz_module.fechar()
+        faturas = self.orchestrator.modules.get('faturas')
+        if faturas:
+            faturas.fechar()
+        if self.app.updater and self.app.updater.running:
+            await self.app.updater.stop()
+        await self.app.stop()
+        await self.app.shutdown()
+
+    async def handle_webhook(self, request: web.Request) -> web.Response:
+        """Recebe um update do Telegram e entrega aos mesmos handlers"""
+        secret = request.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+        if not self.webhook_secret or not hmac.compare_digest(secret, self.webhook_secret):
+            return web.Response(status=403)
+
+        try:
+            data = await request.json()
+        except Exception:
+            return web.Response(status=400)
+
+        update = Update.de_json(data, self.app.bot)
+        await self.app.update_queue.put(update)
+        return web.Response()
+
     async def cmd_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Comando /start"""
         user = update.effective_user
@@ -190,21 +332,21 @@ Digite /ajuda para ver todos os comandos.
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
 
-        await update.message.reply_text(
+        self._responder(
+            update,
             welcome,
-            parse_mode='Markdown',
             reply_markup=reply_markup
         )
 
     async def cmd_help(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Comando /ajuda"""
         response = await self.orchestrator.process("/ajuda", str(update.effective_user.id))
-        await update.message.reply_text(response, parse_mode='Markdown')
+        self._responder(update, response)
 
     async def cmd_status(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Comando /status"""
         response = await self.orchestrator.process("/status", str(update.effective_user.id))
-        await update.message.reply_text(response, parse_mode='Markdown')
+        self._responder(update, response)
 
     async def cmd_generic(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler genérico para comandos"""
@@ -213,7 +355,7 @@ Digite /ajuda para ver todos os comandos.
 
         await update.message.chat.send_action('typing')
         response = await self.orchestrator.process(message, user_id)
-        await update.message.reply_text(response, parse_mode='Markdown')
+        self._responder(update, response)
 
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Processa mensagens de texto livre"""
@@ -236,7 +378,7 @@ Digite /ajuda para ver todos os comandos.
                 )
                 if resultado:
                     logger.info(f"💰 [GRUPO] Transação detectada de {user_name}: {message[:50]}")
-                    await update.message.reply_text(resultado, parse_mode='Markdown')
+                    self._responder(update, resultado)
                     return
             
             # Segundo: se mencionou o bot, responde como assistente
@@ -248,13 +390,13 @@ Digite /ajuda para ver todos os comandos.
                 if any(cmd in message.lower() for cmd in ['resumo', 'relatório', 'relatorio', 'caixa', 'saldo']):
                     if self.condominio_module:
                         response = self.condominio_module.get_resumo_grupo(grupo_id)
-                        await update.message.reply_text(response, parse_mode='Markdown')
+                        self._responder(update, response)
                         return
                 
                 if any(cmd in message.lower() for cmd in ['transações', 'transacoes', 'histórico', 'historico']):
                     if self.condominio_module:
                         response = self.condominio_module.get_ultimas_transacoes(grupo_id)
-                        await update.message.reply_text(response, parse_mode='Markdown')
+                        self._responder(update, response)
                         return
             else:
                 return  # Ignora mensagem no grupo se não foi mencionado e não é transação
@@ -266,78 +408,66 @@ Digite /ajuda para ver todos os comandos.
         await update.message.chat.send_action('typing')
         response = await self.orchestrator.process(message, user_id)
         logger.info(f"📤 Resposta: {response[:100]}...")
-        await update.message.reply_text(response, parse_mode='Markdown')
+        self._responder(update, response)
 
     async def handle_voice(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """ Processa mensagens de áudio/voz"""
+        """ Processa mensagens de áudio/voz (em segundo plano)"""
         user_id = str(update.effective_user.id)
 
-        # Envia "gravando áudio..."
-        await update.message.chat.send_action('record_voice')
-
         # Verifica se módulo de voz está disponível
         if not self.voz_module:
-            await update.message.reply_text(
-                " Módulo de voz não está configurado.",
-                parse_mode='Markdown'
+            self._responder(
+                update,
+                " Módulo de voz não está configurado."
             )
             return
 
-        try:
-            # Pega o arquivo de áudio
-            if update.message.voice:
-                file = await update.message.voice.get_file()
-                formato = "ogg"
-            elif update.message.audio:
-                file = await update.message.audio.get_file()
-                formato = update.message.audio.mime_type.split('/')[-1] if update.message.audio.mime_type else "mp3"
-            else:
-                await update.message.reply_text(" Formato de áudio não suportado.")
-                return
+        # Pega o arquivo de áudio
+        if update.message.voice:
+            midia = update.message.voice
+            formato = "ogg"
+        elif update.message.audio:
+            midia = update.message.audio
+            formato = midia.mime_type.split('/')[-1] if midia.mime_type else "mp3"
+        else:
+            self._responder(update, " Formato de áudio não suportado.", parse_mode=None)
+            return
 
-            # Baixa o arquivo
-            audio_path = f"data/audio_temp/{user_id}_{file.file_id}.{formato}"
-            os.makedirs("data/audio_temp", exist_ok=True)
-            await file.download_to_drive(audio_path)
+        # Áudio encaminhado mantém o file_unique_id: se já foi transcrito, nem baixa
+        chave = f"tg:{midia.file_unique_id}"
 
-            # Transcreve
-            await update.message.chat.send_action('typing')
-            resultado = await self.voz_module.transcrever_audio(audio_path, formato)
+        async def transcrever(job: Job) -> str:
+            resultado = self.voz_module.transcricao_em_cache(chave)
+            if not resultado:
+                await job.progresso("Baixando áudio...")
+                try:
+                    file = await midia.get_file()
+                    audio = await self._baixar(file, f"{file.file_id}.{formato}")
+                except ArquivoGrandeDemais:
+                    return self._msg_arquivo_grande()
 
-            if resultado['success']:
-                texto_transcrito = resultado['text']
-                
-                # Mostra a transcrição
-                await update.message.reply_text(
-                    f" *Transcrição:*\n\n\"{texto_transcrito}\"",
-                    parse_mode='Markdown'
-                )
+                async def parcial(texto: str, prontos: int, total: int):
+                    await job.progresso(f"Transcrevendo ({prontos}/{total})...\n\n\"{texto}\"")
 
-                # Processa o texto transcrito como comando
-                await update.message.chat.send_action('typing')
-                response = await self.orchestrator.process(texto_transcrito, user_id)
-                await update.message.reply_text(response, parse_mode='Markdown')
-            else:
-                await update.message.reply_text(
-                    self.voz_module.formatar_resposta_transcricao(resultado),
-                    parse_mode='Markdown'
-                )
+                with audio:
+                    await job.progresso("Transcrevendo...")
+                    resultado = await self.voz_module.transcrever_audio(
+                        audio, formato, ao_parcial=parcial, chave=chave, user_id=user_id
+                    )
 
-            # Remove arquivo temporário
-            try:
-                os.remove(audio_path)
-            except:
-                pass
+            if not resultado['success']:
+                return self.voz_module.formatar_resposta_transcricao(resultado)
 
-        except Exception as e:
-            logger.error(f"Erro ao processar áudio: {e}")
-            await update.message.reply_text(
-                f" Erro ao processar áudio: {str(e)}",
-                parse_mode='Markdown'
-            )
+            # Processa o texto transcrito como comando
+            texto_transcrito = resultado['text']
+            await job.progresso(f"\"{texto_transcrito}\"\n\nProcessando comando...")
+            response = await self.orchestrator.process(texto_transcrito, user_id)
+            return f" *Transcrição:*\n\n\"{texto_transcrito}\"\n\n{response}"
+
+        self._enfileirar_job(update, "Transcrição de áudio", transcrever)
 
     async def handle_file(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Processa arquivos enviados"""
+        """Processa arquivos enviados (em segundo plano)"""
         user_id = str(update.effective_user.id)
         
         # Em grupos, só processa se tiver caption mencionando o bot
@@ -350,39 +480,86 @@ Digite /ajuda para ver todos os comandos.
             logger.info(f"📎 [PRIVADO] Arquivo recebido de {user_id}")
 
         if update.message.document:
-            file = await update.message.document.get_file()
-            filename = update.message.document.file_name
+            midia = update.message.document
+            filename = midia.file_name
             logger.info(f"   Documento: {filename}")
         elif update.message.photo:
-            file = await update.message.photo[-1].get_file()
+            midia = update.message.photo[-1]
             filename = "photo.jpg"
             logger.info(f"   Foto recebida")
         else:
-            await update.message.reply_text(" Tipo de arquivo não suportado.")
+            self._responder(update, " Tipo de arquivo não suportado.", parse_mode=None)
             return
 
-        file_path = f"temp/{user_id}_{filename}"
-        os.makedirs("temp", exist_ok=True)
-        await file.download_to_drive(file_path)
-        logger.info(f"   Salvo em: {file_path}")
-
         caption = update.message.caption or "Processar arquivo"
         caption = self._clean_bot_mention(caption)  # Remove menção do bot
         logger.info(f"   Caption: {caption}")
-        
-        response = await self.orchestrator.process(
-            caption,
-            user_id,
-            attachments=[file_path]
+
+        async def processar(job: Job) -> str:
+            await job.progresso("Baixando arquivo...")
+            try:
+                file = await midia.get_file()
+                anexo = await self._baixar(file, filename)
+            except ArquivoGrandeDemais:
+                return self._msg_arquivo_grande()
+            logger.info(f"   Recebido: {anexo.tamanho} bytes{' (em disco)' if anexo.em_disco else ''}")
+
+            with anexo:
+                await job.progresso("Lendo arquivo...")
+                response = await self.orchestrator.process(
+                    caption,
+                    user_id,
+                    attachments=[anexo]
+                )
+            logger.info(f"📤 Resposta: {response[:100]}...")
+            return response
+
+        self._enfileirar_job(update, f"Arquivo {filename}", processar)
+
+    def _enfileirar_job(self, update: Update, descricao: str, trabalho):
+        """Coloca a mídia na fila de jobs e responde na hora"""
+        job = self.jobs.submit(
+            str(update.effective_user.id),
+            update.effective_chat.id,
+            descricao,
+            trabalho,
+            origem=update.effective_message
         )
-        logger.info(f"📤 Resposta: {response[:100]}...")
+        if not job:
+            self._responder(
+                update,
+                f"⏳ Você já tem {self.jobs.max_por_usuario} arquivos/áudios em processamento. "
+                "Aguarde ou use /jobs para acompanhar.",
+                parse_mode=None
+            )
 
-        await update.message.reply_text(response, parse_mode='Markdown')
+    async def cmd_jobs(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Comando /jobs - arquivos e áudios em processamento"""
+        self._responder(update, self.jobs.formatar_lista(str(update.effective_user.id)))
 
-        try:
-            os.remove(file_path)
-        except:
-            pass
+    async def cmd_cancelar(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Comando /cancelar [id] - cancela um job (sem id: o mais recente)"""
+        user_id = str(update.effective_user.id)
+        if context.args:
+            job_id = context.args[0]
+        else:
+            ativos = self.jobs.ativos(user_id)
+            job_id = ativos[-1].id if ativos else None
+
+        if job_id and self.jobs.cancelar(job_id, user_id):
+            self._responder(update, f"🚫 Job {job_id} cancelado.", parse_mode=None)
+        else:
+            self._responder(update, "❌ Nenhum job ativo com esse id. Veja /jobs.", parse_mode=None)
+
+    async def handle_job_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Botão "Cancelar" da mensagem de progresso"""
+        query = update.callback_query
+        job_id = query.data.rsplit(':', 1)[-1]
+
+        if self.jobs.cancelar(job_id, str(update.effective_user.id)):
+            await query.answer("Cancelando...")
+        else:
+            await query.answer("Esse job já terminou.")
 
     async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Processa cliques em botões inline"""
@@ -395,4 +572,4 @@ Digite /ajuda para ver todos os comandos.
         command = f"/{data}"
         response = await self.orchestrator.process(command, user_id)
 
-        await query.message.reply_text(response, parse_mode='Markdown')
+        self.outbox.send(query.message.chat_id, response, origem=query.message)
@@ -0,0 +1,83 @@
+"""
+🚥 Processador de Updates do Telegram
+Processa updates em paralelo, mantendo a ordem dentro de cada chat
+"""
+import asyncio
+from typing import Dict, Optional, Awaitable, Any
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Updates de chats diferentes rodam em paralelo; os de um mesmo chat
+    rodam um de cada vez, na ordem de chegada.
+
+    Mídia pesada (voz, áudio, documentos, fotos) usa uma faixa separada com
+    limite próprio, para que uma rajada de áudios não ocupe as vagas dos
+    comandos de texto.
+    """
+
+    # Teto de updates em andamento; os limites reais são as faixas abaixo.
+    # (O semáforo da classe base é adquirido antes da ordenação por chat,
+    # então se ele fosse o limite, updates esperando o próprio chat
+    # ocupariam vagas dos outros.)
+    MAX_IN_FLIGHT = 4096
+
+    def __init__(self, text_concurrency: int = 32, media_concurrency: int = 4):
+        super().__init__(self.MAX_IN_FLIGHT)
+        self.text_concurrency = text_concurrency
+        self.media_concurrency = media_concurrency
+        self._text_lane = asyncio.Semaphore(text_concurrency)
+        self._media_lane = asyncio.Semaphore(media_concurrency)
+        self._chat_locks: Dict[int, asyncio.Lock] = {}
+        self._pendentes: Dict[int, int] = {}
+
+    @staticmethod
+    def _chat_key(update: Any) -> Optional[int]:
+        """Chave de ordenação: chat (ou usuário, se não houver chat)"""
+        if not isinstance(update, Update):
+            return None
+        if update.effective_chat:
+            return update.effective_chat.id
+        if update.effective_user:
+            return update.effective_user.id
+        return None
+
+    @staticmethod
+    def _is_media(update: Any) -> bool:
+        """Verifica se o update carrega mídia pesada"""
+        message = update.message if isinstance(update, Update) else None
+        if not message:
+            return False
+        return bool(message.voice or message.audio or message.document
+                    or message.photo or message.video)
+
+    async def do_process_update(self, update: object,
+                                coroutine: Awaitable[Any]) -> None:
+        lane = self._media_lane if self._is_media(update) else self._text_lane
+        chave = self._chat_key(update)
+
+        if chave is None:
+            async with lane:
+                await coroutine
+            return
+
+        lock = self._chat_locks.setdefault(chave, asyncio.Lock())
+        self._pendentes[chave] = self._pendentes.get(chave, 0) + 1
+        try:
+            async with lock:
+                async with lane:
+                    await coroutine
+        finally:
+            # Remove o lock quando o chat não tem mais nada na fila
+            self._pendentes[chave] -= 1
+            if not self._pendentes[chave]:
+                del self._pendentes[chave]
+                self._chat_locks.pop(chave, None)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
@@ -48,18 +48,20 @@ class AssistentePessoal:
     def setup_voz_module(self):
         try:
             from modules.voz import VozModule
-            self.voz_module = VozModule(data_dir="data")
+            self.voz_module = VozModule(data_dir=self.orchestrator.data_dir)
             console.print("[green][/green] Módulo de Voz configurado")
             return True
         except ImportError as e:
             console.print(f"[yellow]![/yellow] Módulo de Voz: {e}")
-            console.print("[dim]   Instale: pip install SpeechRecognition pydub[/dim]")
+            console.print("[dim]   Instale: pip install SpeechRecognition vosk (e o ffmpeg)[/dim]")
             return False
 
     def setup_interfaces(self):
         telegram_token = os.getenv('TELEGRAM_BOT_TOKEN')
-        if telegram_token and telegram_token != 'seu_token_aqui':
-            telegram = TelegramInterface(telegram_token, self.orchestrator)
+        if self.settings.telegram_mode == 'webhook':
+            console.print("[yellow]![/yellow] Telegram em modo webhook: servido pelo api_server.py")
+        elif telegram_token and telegram_token != 'seu_token_aqui':
+            telegram = TelegramInterface(telegram_token, self.orchestrator, self.settings)
             if self.voz_module:
                 telegram.set_voz_module(self.voz_module)
             self.interfaces.append(('Telegram', telegram))
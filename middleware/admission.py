@@ -0,0 +1,189 @@
+"""
+🚦 Controle de Admissão
+Limita a carga aceita: taxa por usuário, fila limitada e concorrência global
+"""
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, Tuple
+
+
+class Overloaded(Exception):
+    """Sistema saturado ou usuário acima do limite - tente mais tarde"""
+
+    def __init__(self, motivo: str, retry_after: float = 1.0):
+        super().__init__(motivo)
+        self.motivo = motivo
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Balde de fichas: `rate` fichas por segundo, até `capacity` acumuladas"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def espera(self, tokens: float = 1.0) -> float:
+        """Segundos que faltam para haver `tokens` fichas (0 se já há)"""
+        self._refill()
+        if self.tokens >= tokens:
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+    def consume(self, tokens: float = 1.0) -> float:
+        """
+        Tenta consumir fichas
+
+        Returns:
+            0 se consumiu, senão quantos segundos faltam para haver fichas
+        """
+        wait = self.espera(tokens)
+        if not wait:
+            self.tokens -= tokens
+        return wait
+
+    def consume_up_to(self, tokens: int) -> int:
+        """Consome uma ficha inteira para cada item, até `tokens`; devolve quantas consumiu"""
+        self._refill()
+        consumidas = min(tokens, int(self.tokens))
+        self.tokens -= consumidas
+        return consumidas
+
+    async def wait(self, tokens: float = 1.0):
+        """Espera até conseguir consumir as fichas"""
+        while True:
+            delay = self.consume(tokens)
+            if not delay:
+                return
+            await asyncio.sleep(delay)
+
+    @property
+    def full(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+class AdmissionController:
+    """
+    Porta de entrada do orquestrador
+
+    - admit(): rejeita na hora se o usuário estourou a taxa ou a fila está cheia
+    - admit_many(): o mesmo para várias mensagens, uma ficha por mensagem
+    - slot(): espera uma vaga de execução (limite global de concorrência)
+    - finish(): libera o lugar na fila quando a mensagem termina
+    """
+
+    MAX_BUCKETS = 10000
+
+    def __init__(self, max_concurrent: int = 8, max_queue: int = 100,
+                 user_rate: float = 1.0, user_burst: int = 10,
+                 queue_timeout: float = 10.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.queue_timeout = queue_timeout
+
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._buckets: Dict[str, TokenBucket] = {}
+
+        self.pending = 0   # Admitidas e ainda não concluídas
+        self.running = 0   # Em execução no orquestrador
+        self.metrics = {
+            'accepted': 0,
+            'completed': 0,
+            'rejected_rate_limit': 0,
+            'rejected_queue_full': 0,
+            'rejected_timeout': 0,
+            'max_queue_depth': 0,
+        }
+
+    @property
+    def queue_depth(self) -> int:
+        return self.pending - self.running
+
+    def admit(self, user_id: str):
+        """Admite uma mensagem ou levanta Overloaded (sem esperar)"""
+        _, recusa = self.admit_many(user_id, 1)
+        if recusa:
+            raise recusa
+
+    def admit_many(self, user_id: str, quantas: int) -> Tuple[int, Optional[Overloaded]]:
+        """
+        Admite as primeiras mensagens de uma rajada do usuário (sem esperar)
+
+        Cada mensagem gasta uma ficha do balde do usuário e um lugar na fila;
+        entram as primeiras que couberem, as demais são recusadas.
+
+        Returns:
+            (quantas foram admitidas, Overloaded das recusadas ou None)
+        """
+        vagas = min(quantas, self.max_queue - self.queue_depth)
+        if vagas <= 0:
+            self.metrics['rejected_queue_full'] += quantas
+            return 0, Overloaded('fila cheia', retry_after=1.0)
+
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            if len(self._buckets) >= self.MAX_BUCKETS:
+                self._prune_buckets()
+            bucket = self._buckets[user_id] = TokenBucket(self.user_rate, self.user_burst)
+
+        admitidas = bucket.consume_up_to(vagas)
+        recusa = None
+        if admitidas < vagas:
+            self.metrics['rejected_rate_limit'] += quantas - admitidas
+            recusa = Overloaded('limite de mensagens do usuário', retry_after=bucket.espera())
+        elif admitidas < quantas:
+            self.metrics['rejected_queue_full'] += quantas - admitidas
+            recusa = Overloaded('fila cheia', retry_after=1.0)
+
+        self.pending += admitidas
+        self.metrics['accepted'] += admitidas
+        self.metrics['max_queue_depth'] = max(self.metrics['max_queue_depth'], self.queue_depth)
+        return admitidas, recusa
+
+    def finish(self, quantas: int = 1):
+        """Marca mensagens admitidas como concluídas (com ou sem sucesso)"""
+        self.pending -= quantas
+        self.metrics['completed'] += quantas
+
+    @asynccontextmanager
+    async def slot(self):
+        """Ocupa uma vaga de execução, esperando no máximo queue_timeout"""
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.metrics['rejected_timeout'] += 1
+            raise Overloaded('tempo de espera na fila esgotado', retry_after=self.queue_timeout)
+
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self._slots.release()
+
+    def _prune_buckets(self):
+        """Descarta baldes cheios (usuários inativos)"""
+        for user_id in [u for u, b in self._buckets.items() if b.full]:
+            del self._buckets[user_id]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Métricas atuais"""
+        return {
+            **self.metrics,
+            'queue_depth': self.queue_depth,
+            'running': self.running,
+            'max_concurrent': self.max_concurrent,
+            'max_queue': self.max_queue,
+            'tracked_users': len(self._buckets),
+        }
@@ -0,0 +1,134 @@
+"""
+📬 Dispatcher de Mensagens
+Encaminha mensagens ao orquestrador preservando a ordem por usuário
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, List, Any
+
+from middleware.admission import AdmissionController, Overloaded
+
+
+class MessageDispatcher:
+    """
+    Ponto único de entrada para mensagens vindas das pontes (HTTP, canal)
+
+    Mensagens de usuários diferentes rodam em paralelo; as de um mesmo
+    usuário são processadas uma de cada vez, na ordem de chegada.
+    Toda mensagem passa antes pelo controle de admissão.
+    """
+
+    def __init__(self, orchestrator, admission: AdmissionController = None):
+        self.orchestrator = orchestrator
+        self.admission = admission or AdmissionController()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._pendentes: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def _fila_do_usuario(self, user_id: str, admitidas: int = 1):
+        """Vez do usuário (uma coisa de cada vez, em ordem); libera as `admitidas` no fim"""
+        lock = self._locks.setdefault(user_id, asyncio.Lock())
+        self._pendentes[user_id] = self._pendentes.get(user_id, 0) + 1
+
+        try:
+            async with lock:
+                yield
+        finally:
+            self.admission.finish(admitidas)
+
+            # Remove o lock quando o usuário não tem mais nada na fila
+            self._pendentes[user_id] -= 1
+            if not self._pendentes[user_id]:
+                del self._pendentes[user_id]
+                self._locks.pop(user_id, None)
+
+    async def _executar(self, message: str, user_id: str) -> str:
+        async with self.admission.slot():
+            return await self.orchestrator.process(message, user_id)
+
+    async def process(self, message: str, user_id: str,
+                      user_name: str = None, group_id: str = None) -> str:
+        """
+        Processa uma mensagem respeitando a fila do usuário
+
+        O group_id só importa para o roteador dos shards (ShardRouter), que
+        manda o grupo inteiro ao mesmo worker; aqui a fila é a do usuário.
+
+        Raises:
+            Overloaded: se o usuário ou o sistema estiver acima do limite
+        """
+        self.admission.admit(user_id)
+        async with self._fila_do_usuario(user_id):
+            return await self._executar(message, user_id)
+
+    @staticmethod
+    def _sobrecarga(e: Overloaded) -> Dict[str, Any]:
+        return {
+            'success': False,
+            'status': 429,
+            'retry_after': round(e.retry_after, 2),
+            'response': f'⏳ Muitas mensagens ({e.motivo}). Tente novamente em instantes.'
+        }
+
+    async def _resultado(self, coro) -> Dict[str, Any]:
+        """{success, response} de uma mensagem, sem propagar erros"""
+        try:
+            return {'success': True, 'response': await coro}
+        except Overloaded as e:
+            return self._sobrecarga(e)
+        except Exception as e:
+            return {'success': False, 'response': f'Erro: {str(e)}'}
+
+    async def process_item(self, item: Any) -> Dict[str, Any]:
+        """Processa um item {message, user_id, user_name} sem propagar erros"""
+        if not isinstance(item, dict):
+            return {'success': False, 'response': 'Erro: item inválido'}
+        return await self._resultado(self.process(
+            item.get('message', ''),
+            item.get('user_id', 'whatsapp_user'),
+            item.get('user_name', 'Usuário')
+        ))
+
+    async def _process_group(self, user_id: str, items: List[Dict]) -> List[Dict[str, Any]]:
+        """Mensagens de um usuário no lote: uma ficha por mensagem, depois uma a uma, em ordem"""
+        admitidas, recusa = self.admission.admit_many(user_id, len(items))
+        recusadas = [self._sobrecarga(recusa) for _ in items[admitidas:]]
+        if not admitidas:
+            return recusadas
+
+        async with self._fila_do_usuario(user_id, admitidas):
+            return [await self._resultado(self._executar(item.get('message', ''), user_id))
+                    for item in items[:admitidas]] + recusadas
+
+    async def process_batch(self, items: List[Any]) -> List[Dict[str, Any]]:
+        """
+        Processa um lote de mensagens
+
+        Cada mensagem gasta uma ficha e um lugar na fila, como se viesse
+        sozinha: de uma rajada acumulada, como a que chega depois de uma
+        reconexão, entram as primeiras que o balde do usuário permite e as
+        demais voltam com 429, sem furar a ordem. Usuários diferentes rodam
+        em paralelo.
+
+        Returns:
+            Um resultado por item, na mesma ordem do lote
+        """
+        results: List[Dict[str, Any]] = [None] * len(items)
+        por_usuario: Dict[str, List[int]] = {}
+        for indice, item in enumerate(items):
+            if not isinstance(item, dict):
+                results[indice] = {'success': False, 'response': 'Erro: item inválido'}
+                continue
+            por_usuario.setdefault(item.get('user_id', 'whatsapp_user'), []).append(indice)
+
+        async def processar(user_id: str, indices: List[int]):
+            grupo = await self._process_group(user_id, [items[i] for i in indices])
+            for indice, result in zip(indices, grupo):
+                results[indice] = result
+
+        await asyncio.gather(*(processar(u, idx) for u, idx in por_usuario.items()))
+        return results
+
+    async def metrics(self) -> Dict[str, Any]:
+        """Métricas do controle de admissão"""
+        return self.admission.snapshot()
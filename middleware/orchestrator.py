@@ -8,6 +8,7 @@ import re
 from config.settings import COMMAND_MAPPING, RESPONSES
 from middleware.command_parser import CommandParser
 from middleware.nlp_engine import NLPEngine
+from modules.anexos import eh_compactado, eh_imagem, nome_do_anexo
 
 
 @dataclass
@@ -30,7 +31,8 @@ class ProcessedMessage:
 class Orchestrator:
     """Orquestra o fluxo de mensagens para os módulos corretos"""
     
-    def __init__(self):
+    def __init__(self, data_dir: str = "data"):
+        self.data_dir = data_dir
         self.parser = CommandParser()
         self.nlp = NLPEngine()
         self.modules = {}
@@ -40,7 +42,7 @@ class Orchestrator:
         """Carrega os módulos disponíveis"""
         try:
             from modules.agenda import AgendaModule
-            self.modules['agenda'] = AgendaModule()
+            self.modules['agenda'] = AgendaModule(data_dir=self.data_dir)
         except ImportError:
             pass
         
@@ -52,19 +54,19 @@ class Orchestrator:
         
         try:
             from modules.financas import FinancasModule
-            self.modules['financas'] = FinancasModule()
+            self.modules['financas'] = FinancasModule(data_dir=self.data_dir)
         except ImportError:
             pass
         
         try:
             from modules.tarefas import TarefasModule
-            self.modules['tarefas'] = TarefasModule()
+            self.modules['tarefas'] = TarefasModule(data_dir=self.data_dir)
         except ImportError:
             pass
         
         try:
             from modules.faturas import FaturasModule
-            self.modules['faturas'] = FaturasModule()
+            self.modules['faturas'] = FaturasModule(data_dir=self.data_dir)
             # Conecta com módulo de agenda para agendar boletos
             if 'agenda' in self.modules:
                 self.modules['faturas'].set_agenda_module(self.modules['agenda'])
@@ -73,7 +75,7 @@ class Orchestrator:
         
         try:
             from modules.voz import VozModule
-            self.modules['voz'] = VozModule()
+            self.modules['voz'] = VozModule(data_dir=self.data_dir)
         except ImportError:
             pass
     
@@ -260,10 +262,11 @@ class Orchestrator:
                 return await self.modules['tarefas'].handle_natural(message, None, user_id, attachments)
         
         # ========== FATURAS/BOLETOS ==========
-        # Processar PDF se tiver anexo
+        # Processar PDF, foto ou arquivo compactado se tiver anexo
         if attachments:
             for anexo in attachments:
-                if anexo.lower().endswith('.pdf'):
+                if (nome_do_anexo(anexo).lower().endswith('.pdf') or eh_imagem(anexo)
+                        or eh_compactado(anexo)):
                     if 'faturas' in self.modules:
                         return await self.modules['faturas'].handle('fatura', [], user_id, attachments)
         
@@ -0,0 +1,242 @@
+"""
+🧩 Sharding por Usuário
+Distribui usuários entre processos workers por hashing consistente
+"""
+import os
+import json
+import bisect
+import hashlib
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, List, Any, Optional
+
+import aiohttp
+
+from middleware.admission import Overloaded
+
+logger = logging.getLogger(__name__)
+
+
+class ShardRing:
+    """
+    Anel de hashing consistente
+
+    Cada shard ocupa vários pontos virtuais no anel; uma chave pertence ao
+    primeiro ponto no sentido horário. Ao mudar o número de shards, só
+    ~1/N das chaves trocam de dono.
+    """
+
+    def __init__(self, shards: List[str], vnodes: int = 64):
+        self.shards = list(shards)
+        self._ring = sorted(
+            (self._hash(f'{shard}#{v}'), shard)
+            for shard in self.shards
+            for v in range(vnodes)
+        )
+        self._keys = [h for h, _ in self._ring]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.md5(value.encode('utf-8')).digest()[:8], 'big')
+
+    def get(self, key: str) -> str:
+        """Retorna o shard dono da chave (user_id)"""
+        indice = bisect.bisect(self._keys, self._hash(key)) % len(self._keys)
+        return self._ring[indice][1]
+
+
+class ShardRouter:
+    """
+    Roteador da frente: mesma interface do MessageDispatcher, mas encaminha
+    cada mensagem por HTTP ao worker dono do usuário
+
+    A chave é o group_id, quando o item traz um, senão o user_id: as
+    mensagens de um grupo ficam todas no worker do grupo, onde estão os
+    dados dele. No WhatsApp o user_id de um grupo já é o JID do grupo.
+    """
+
+    def __init__(self, workers: List[str], timeout: float = 60.0):
+        self.ring = ShardRing(workers)
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.session = None
+
+    async def start(self):
+        """Abre o pool de conexões (keep-alive) com os workers"""
+        self.session = aiohttp.ClientSession(timeout=self.timeout)
+
+    async def stop(self):
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    async def wait_ready(self, timeout: float = 60.0):
+        """Espera todos os workers responderem ao /health"""
+        loop = asyncio.get_running_loop()
+        limite = loop.time() + timeout
+        for worker in self.ring.shards:
+            while True:
+                try:
+                    async with self.session.get(f'{worker}/health') as resp:
+                        if resp.status == 200:
+                            break
+                except aiohttp.ClientError:
+                    pass
+                if loop.time() > limite:
+                    raise TimeoutError(f'worker {worker} não respondeu')
+                await asyncio.sleep(0.5)
+
+    @staticmethod
+    def chave(item: Dict[str, Any]) -> str:
+        """Chave de roteamento de um item: o grupo, se houver, senão o usuário"""
+        return item.get('group_id') or item.get('user_id', 'whatsapp_user')
+
+    async def process(self, message: str, user_id: str,
+                      user_name: str = None, group_id: str = None) -> str:
+        """Encaminha a mensagem ao worker do usuário (ou do grupo)"""
+        payload = {'message': message, 'user_id': user_id, 'user_name': user_name}
+        if group_id:
+            payload['group_id'] = group_id
+        worker = self.ring.get(self.chave(payload))
+
+        async with self.session.post(f'{worker}/process', json=payload) as resp:
+            data = await resp.json()
+
+        if resp.status == 429:
+            raise Overloaded(data.get('response', 'worker saturado'),
+                             retry_after=data.get('retry_after', 1.0))
+        if not data.get('success'):
+            raise RuntimeError(data.get('response', 'erro no worker'))
+        return data['response']
+
+    async def process_item(self, item: Any) -> Dict[str, Any]:
+        """Processa um item {message, user_id, user_name} sem propagar erros"""
+        results = await self.process_batch([item])
+        return results[0]
+
+    async def process_batch(self, items: List[Any]) -> List[Dict[str, Any]]:
+        """Divide o lote por worker, envia em paralelo e remonta na ordem"""
+        results: List[Dict[str, Any]] = [None] * len(items)
+        por_worker = defaultdict(list)
+
+        for indice, item in enumerate(items):
+            if not isinstance(item, dict):
+                results[indice] = {'success': False, 'response': 'Erro: item inválido'}
+                continue
+            worker = self.ring.get(self.chave(item))
+            por_worker[worker].append(indice)
+
+        async def enviar(worker: str, indices: List[int]):
+            try:
+                async with self.session.post(
+                    f'{worker}/process/batch',
+                    json={'messages': [items[i] for i in indices]}
+                ) as resp:
+                    data = await resp.json()
+                for indice, result in zip(indices, data.get('results', [])):
+                    results[indice] = result
+            except Exception as e:
+                for indice in indices:
+                    results[indice] = {'success': False, 'response': f'Erro: {str(e)}'}
+
+        await asyncio.gather(*(enviar(w, idx) for w, idx in por_worker.items()))
+        return results
+
+    async def metrics(self) -> Dict[str, Any]:
+        """Métricas de cada worker"""
+        resultado = {}
+        for worker in self.ring.shards:
+            try:
+                async with self.session.get(f'{worker}/metrics') as resp:
+                    resultado[worker] = await resp.json()
+            except Exception as e:
+                resultado[worker] = {'error': str(e)}
+        return resultado
+
+
+# === Migração dos dados do processo único para os shards ===
+
+# Listas de registros com o dono em 'user_id'
+ARQUIVOS_POR_REGISTRO = ('eventos.json', 'lembretes.json', 'tarefas.json', 'transacoes.json',
+                         'sugestoes_categoria.json', 'boletos.json')
+# Dicionários indexados pelo user_id
+ARQUIVOS_POR_USUARIO = ('pendencias_categoria.json', 'voz_perfis.json')
+# Marca gravada em <origem>/shards depois da migração
+MARCA_MIGRACAO = 'migracao.json'
+
+
+def _ler_json(caminho: str):
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _gravar_json(caminho: str, dados):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, ensure_ascii=False, indent=2)
+
+
+def migrar_para_shards(origem: str, ring: ShardRing, pastas: Dict[str, str]) -> Optional[Dict[str, int]]:
+    """
+    Reparte os JSON de `origem` (modo processo único) entre as pastas dos shards
+
+    Roda uma vez só: cada registro vai para a pasta do shard dono do seu
+    user_id e cada arquivo de grupo (grupos/<id>.json) para a do dono do
+    grupo, pela mesma regra do ShardRouter. O que os workers já gravaram é
+    mantido (vem depois dos registros antigos). Os originais ficam intactos em
+    `origem` (servem de backup); caches e estatísticas não são copiados e se
+    refazem sozinhos. Uma marca em <origem>/shards impede repetir a
+    migração, que sobrescreveria o que os workers gravaram depois.
+
+    Args:
+        origem: pasta de dados do modo processo único (ex: data)
+        ring: o anel do roteador (mesmos shards, mesma ordem)
+        pastas: pasta de dados de cada shard do anel
+
+    Returns:
+        Registros copiados por arquivo, ou None se já migrou antes
+    """
+    marca = os.path.join(origem, 'shards', MARCA_MIGRACAO)
+    if os.path.exists(marca):
+        anterior = _ler_json(marca)
+        if anterior.get('shards') != len(pastas):
+            logger.warning(f"Dados migrados para {anterior.get('shards')} shards, agora são "
+                           f"{len(pastas)}: usuários que mudaram de shard não acham os dados antigos")
+        return None
+
+    copiados: Dict[str, int] = {}
+    for nome in ARQUIVOS_POR_REGISTRO + ARQUIVOS_POR_USUARIO:
+        caminho = os.path.join(origem, nome)
+        if not os.path.exists(caminho):
+            continue
+        dados = _ler_json(caminho)
+        por_shard = {shard: ({} if nome in ARQUIVOS_POR_USUARIO else []) for shard in pastas}
+        if nome in ARQUIVOS_POR_USUARIO:
+            for user_id, valor in dados.items():
+                por_shard[ring.get(user_id)][user_id] = valor
+        else:
+            for registro in dados:
+                por_shard[ring.get(str(registro.get('user_id', '')))].append(registro)
+        for shard, parte in por_shard.items():
+            destino = os.path.join(pastas[shard], nome)
+            if os.path.exists(destino):
+                # O worker já gravou: os registros antigos vêm antes dos dele
+                atuais = _ler_json(destino)
+                parte = {**parte, **atuais} if isinstance(parte, dict) else parte + atuais
+            _gravar_json(destino, parte)
+        copiados[nome] = len(dados)
+
+    grupos = os.path.join(origem, 'grupos')
+    if os.path.isdir(grupos):
+        for nome in sorted(os.listdir(grupos)):
+            if not nome.endswith('.json'):
+                continue
+            dados = _ler_json(os.path.join(grupos, nome))
+            grupo_id = str(dados.get('grupo_id') or nome[:-len('.json')])
+            destino = os.path.join(pastas[ring.get(grupo_id)], 'grupos', nome)
+            if not os.path.exists(destino):  # O do worker é mais novo
+                _gravar_json(destino, dados)
+                copiados['grupos'] = copiados.get('grupos', 0) + 1
+
+    _gravar_json(marca, {'shards': len(pastas), 'copiados': copiados})
+    return copiados
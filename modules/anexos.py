@@ -0,0 +1,177 @@
+"""
+📎 Anexos em Memória
+Arquivos recebidos ficam em buffer na memória e só vão para o disco se forem grandes
+"""
+import io
+import os
+import tarfile
+import zipfile
+import tempfile
+from typing import Any, BinaryIO, Iterator, Optional, Tuple, Union
+
+# Arquivos compactados aceitos no envio em lote
+EXTENSOES_COMPACTADAS = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+
+# Fotos de boletos (lidas com OCR)
+EXTENSOES_IMAGEM = ('.jpg', '.jpeg', '.png')
+
+
+class ArquivoGrandeDemais(Exception):
+    """Anexo acima do limite de tamanho"""
+
+    def __init__(self, tamanho: int, limite: int):
+        super().__init__(f'arquivo de {tamanho} bytes excede o limite de {limite} bytes')
+        self.tamanho = tamanho
+        self.limite = limite
+
+
+class Anexo:
+    """
+    Arquivo recebido (documento, foto ou áudio)
+
+    Os bytes ficam num BytesIO até `spill_bytes`; passando disso, vão para
+    um arquivo temporário (apagado ao fechar) e `caminho` aponta para ele.
+    pdfplumber e PIL leem direto de abrir(); o áudio sai de ler() para a
+    entrada do ffmpeg; um processo do pool recebe o caminho em vez dos bytes.
+    """
+
+    def __init__(self, nome: str, spill_bytes: int = 8 * 1024 * 1024):
+        self.nome = nome
+        self.spill_bytes = spill_bytes
+        self._buffer: BinaryIO = io.BytesIO()
+        self._caminho: Optional[str] = None
+        self._tamanho = 0
+
+    @property
+    def extensao(self) -> str:
+        return os.path.splitext(self.nome)[1].lower()
+
+    @property
+    def tamanho(self) -> int:
+        return self._tamanho
+
+    @property
+    def em_disco(self) -> bool:
+        return self._caminho is not None
+
+    @property
+    def caminho(self) -> Optional[str]:
+        """Arquivo temporário com o conteúdo (None enquanto está na memória)"""
+        if self._caminho is not None:
+            self._buffer.flush()
+        return self._caminho
+
+    @property
+    def escrita(self) -> BinaryIO:
+        """Destino do download (tem write, que vai para o disco ao passar de spill_bytes)"""
+        return self
+
+    def write(self, dados: bytes) -> int:
+        if self._caminho is None and self._tamanho + len(dados) > self.spill_bytes:
+            self._para_o_disco()
+        self._buffer.seek(0, os.SEEK_END)
+        escritos = self._buffer.write(dados)
+        self._tamanho += escritos
+        return escritos
+
+    def _para_o_disco(self):
+        arquivo = tempfile.NamedTemporaryFile(prefix='anexo_', suffix=self.extensao, delete=False)
+        try:
+            arquivo.write(self._buffer.getvalue())
+        except BaseException:
+            arquivo.close()
+            os.remove(arquivo.name)
+            raise
+        self._buffer.close()
+        self._buffer = arquivo
+        self._caminho = arquivo.name
+
+    def abrir(self) -> BinaryIO:
+        """Buffer posicionado no início, pronto para leitura"""
+        self._buffer.seek(0)
+        return self._buffer
+
+    def ler(self) -> bytes:
+        return self.abrir().read()
+
+    def fechar(self):
+        self._buffer.close()
+        if self._caminho is not None:
+            try:
+                os.remove(self._caminho)
+            except FileNotFoundError:
+                pass
+            self._caminho = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    def __repr__(self):
+        return f'Anexo({self.nome!r}, {self.tamanho} bytes)'
+
+
+def nome_do_anexo(anexo: Union[str, Anexo, Any]) -> str:
+    """Nome do anexo, seja um caminho ou um Anexo em memória"""
+    return anexo.nome if isinstance(anexo, Anexo) else str(anexo)
+
+
+def eh_compactado(anexo: Union[str, Anexo, Any]) -> bool:
+    """O anexo é um ZIP ou TAR (pelo nome)"""
+    return nome_do_anexo(anexo).lower().endswith(EXTENSOES_COMPACTADAS)
+
+
+def eh_imagem(anexo: Union[str, Anexo, Any]) -> bool:
+    """O anexo é uma foto JPEG ou PNG (pelo nome)"""
+    return nome_do_anexo(anexo).lower().endswith(EXTENSOES_IMAGEM)
+
+
+def _membro_ignorado(nome: str) -> bool:
+    """Pastas de metadados (__MACOSX) e arquivos ocultos"""
+    partes = nome.replace('\\', '/').split('/')
+    return '__MACOSX' in partes or os.path.basename(nome).startswith('.')
+
+
+def membros_compactados(anexo: Union[str, Anexo], limite_bytes: int,
+                        max_membros: int) -> Iterator[Tuple[str, Union[bytes, Exception]]]:
+    """
+    (nome, conteúdo) de cada arquivo de um ZIP ou TAR, um de cada vez
+
+    Nada é extraído para o disco e só um membro fica na memória por vez: o
+    ZIP é lido pelo diretório central, o TAR em modo stream. Um membro maior
+    que `limite_bytes` vem com ArquivoGrandeDemais no lugar do conteúdo (a
+    leitura para no limite, o que também barra bombas de compressão). Para
+    depois de `max_membros` arquivos.
+    """
+    fonte = anexo.abrir() if isinstance(anexo, Anexo) else open(anexo, 'rb')
+    try:
+        if nome_do_anexo(anexo).lower().endswith('.zip'):
+            with zipfile.ZipFile(fonte) as zf:
+                membros = (i for i in zf.infolist() if not i.is_dir() and not _membro_ignorado(i.filename))
+                for n, info in enumerate(membros):
+                    if n >= max_membros:
+                        break
+                    with zf.open(info) as membro:
+                        yield info.filename, _ler_limitado(membro, limite_bytes)
+        else:
+            with tarfile.open(fileobj=fonte, mode='r|*') as tar:
+                n = 0
+                for info in tar:
+                    if not info.isfile() or _membro_ignorado(info.name):
+                        continue
+                    if n >= max_membros:
+                        break
+                    n += 1
+                    yield info.name, _ler_limitado(tar.extractfile(info), limite_bytes)
+    finally:
+        if not isinstance(anexo, Anexo):
+            fonte.close()
+
+
+def _ler_limitado(arquivo: BinaryIO, limite_bytes: int) -> Union[bytes, Exception]:
+    dados = arquivo.read(limite_bytes + 1)
+    if len(dados) > limite_bytes:
+        return ArquivoGrandeDemais(len(dados), limite_bytes)
+    return dados
@@ -0,0 +1,126 @@
+"""
+🗃️ Cache em Disco
+Cache chave -> JSON com limite de tamanho, descartando o menos usado (LRU)
+"""
+import os
+import json
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def hash_conteudo(dados: bytes) -> str:
+    """Chave de cache pelo conteúdo (sha256)"""
+    return hashlib.sha256(dados).hexdigest()
+
+
+def hash_do_arquivo(caminho: str, bloco: int = 1024 * 1024) -> str:
+    """Mesma chave de hash_conteudo, lendo o arquivo em blocos"""
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for parte in iter(lambda: f.read(bloco), b''):
+            h.update(parte)
+    return h.hexdigest()
+
+
+class DiskLRUCache:
+    """
+    Um arquivo JSON por entrada, limitado a max_bytes no total
+
+    A ordem de uso fica no mtime dos arquivos (atualizado a cada acerto),
+    então sobrevive a reinícios.
+    """
+
+    def __init__(self, diretorio: str, max_bytes: int = 20 * 1024 * 1024):
+        self.diretorio = diretorio
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(diretorio, exist_ok=True)
+        self._entradas: 'OrderedDict[str, int]' = OrderedDict()  # Menos -> mais recente
+        self._total = 0
+        self._carregar()
+
+    def _carregar(self):
+        """Indexa as entradas existentes, da mais antiga para a mais nova"""
+        arquivos = []
+        for nome in os.listdir(self.diretorio):
+            if not nome.endswith('.json'):
+                continue
+            caminho = os.path.join(self.diretorio, nome)
+            try:
+                info = os.stat(caminho)
+            except OSError:
+                continue
+            arquivos.append((info.st_mtime, nome[:-5], info.st_size))
+
+        for _, ident, tamanho in sorted(arquivos):
+            self._entradas[ident] = tamanho
+            self._total += tamanho
+        self._descartar()
+
+    @staticmethod
+    def _ident(chave: str) -> str:
+        return hashlib.sha256(chave.encode('utf-8')).hexdigest()
+
+    def _caminho(self, ident: str) -> str:
+        return os.path.join(self.diretorio, f'{ident}.json')
+
+    def get(self, chave: str) -> Optional[Any]:
+        """Valor em cache, ou None"""
+        ident = self._ident(chave)
+        if ident not in self._entradas:
+            self.misses += 1
+            return None
+
+        caminho = self._caminho(ident)
+        try:
+            with open(caminho, 'r', encoding='utf-8') as f:
+                valor = json.load(f)
+            os.utime(caminho)
+        except (OSError, ValueError):
+            self._remover(ident)
+            self.misses += 1
+            return None
+
+        self._entradas.move_to_end(ident)
+        self.hits += 1
+        return valor
+
+    def set(self, chave: str, valor: Any):
+        """Grava (ou substitui) uma entrada e descarta as menos usadas"""
+        ident = self._ident(chave)
+        caminho = self._caminho(ident)
+        dados = json.dumps(valor, ensure_ascii=False).encode('utf-8')
+
+        try:
+            temporario = f'{caminho}.tmp'
+            with open(temporario, 'wb') as f:
+                f.write(dados)
+            os.replace(temporario, caminho)
+        except OSError as e:
+            logger.warning(f"Não foi possível gravar no cache: {e}")
+            return
+
+        self._total += len(dados) - self._entradas.get(ident, 0)
+        self._entradas[ident] = len(dados)
+        self._entradas.move_to_end(ident)
+        self._descartar()
+
+    def _descartar(self):
+        while self._total > self.max_bytes and self._entradas:
+            self._remover(next(iter(self._entradas)))
+
+    def _remover(self, ident: str):
+        self._total -= self._entradas.pop(ident, 0)
+        try:
+            os.remove(self._caminho(ident))
+        except OSError:
+            pass
+
+    def __len__(self):
+        return len(self._entradas)
@@ -0,0 +1,224 @@
+"""
+🔢 Código de Barras de Boletos e Guias
+Valida e decodifica boletos bancários (FEBRABAN) e guias de arrecadação
+
+O código de barras tem 44 dígitos; a linha digitável é o mesmo código
+reordenado em campos, com dígitos verificadores por campo (47 dígitos no
+bancário, 48 na arrecadação). Valor e vencimento saem do próprio código.
+"""
+import re
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import List, Optional
+
+# Fator de vencimento: dias desde 07/10/1997. Chegou a 9999 em 21/02/2025 e
+# recomeçou em 1000, então o mesmo fator se repete a cada 9000 dias.
+DATA_BASE_FATOR = date(1997, 10, 7)
+CICLO_FATOR = 9000
+
+# Sequências de dígitos que podem ser um código (com pontos, espaços ou hífens
+# entre os blocos, como a linha digitável costuma ser impressa). O trecho
+# grosso (uma classe de caracteres só) descarta rápido o resto do texto.
+TRECHO_PATTERN = re.compile(r'\d[\d .\-]{42,}\d')
+CANDIDATO_PATTERN = re.compile(r'\d(?:[ .\-]?\d){43,}')
+
+# Onde a impressão pode quebrar cada formato (posições, em dígitos, dos
+# separadores permitidos). A linha bancária sai como
+# AAAAA.AAAAA BBBBB.BBBBBB CCCCC.CCCCCC D FFFFVVVVVVVVVV e a de arrecadação
+# em 4 blocos de 11 dígitos + DV; o código de barras (44) só corrido, sem
+# separador nenhum. Os formatos com DV por campo vêm antes do de 44.
+LAYOUTS = (
+    (47, frozenset({5, 10, 15, 21, 26, 32, 33})),
+    (48, frozenset({11, 12, 23, 24, 35, 36, 47})),
+    (44, frozenset()),
+)
+
+MOEDA_REAL = '9'
+
+
+def modulo10(numero: str) -> int:
+    """DV módulo 10 (pesos 2 e 1 da direita para a esquerda)"""
+    soma = 0
+    for i, digito in enumerate(reversed(numero)):
+        produto = int(digito) * (2 if i % 2 == 0 else 1)
+        soma += produto // 10 + produto % 10
+    return (10 - soma % 10) % 10
+
+
+def _soma_modulo11(numero: str) -> int:
+    return sum(int(d) * (2 + i % 8) for i, d in enumerate(reversed(numero))) % 11
+
+
+def modulo11_bancario(numero: str) -> int:
+    """DV geral do boleto bancário (pesos 2 a 9; 0, 10 e 11 viram 1)"""
+    dv = 11 - _soma_modulo11(numero)
+    return 1 if dv in (0, 10, 11) else dv
+
+
+def modulo11_arrecadacao(numero: str) -> int:
+    """DV módulo 11 da arrecadação (restos 0 e 1 dão 0; resto 10 dá 1)"""
+    resto = _soma_modulo11(numero)
+    if resto in (0, 1):
+        return 0
+    return 11 - resto
+
+
+def _dv_arrecadacao(codigo: str):
+    """Função de DV indicada pelo 3º dígito (6/7: módulo 10; 8/9: módulo 11)"""
+    if codigo[2] in '67':
+        return modulo10
+    if codigo[2] in '89':
+        return modulo11_arrecadacao
+    return None
+
+
+def fator_plausivel(fator: int) -> bool:
+    """0 (sem vencimento) ou de 1000 a 9999: fatores abaixo de 1000 não são emitidos"""
+    return fator == 0 or 1000 <= fator <= 9999
+
+
+def codigo_valido(codigo: str) -> bool:
+    """
+    Código de barras de 44 dígitos com DV geral correto
+
+    No bancário, também a moeda (9, real) e um fator de vencimento
+    plausível: só o DV deixaria passar 1 em cada 10 números ao acaso.
+    """
+    if len(codigo) != 44 or not codigo.isdigit():
+        return False
+    if codigo[0] == '8':
+        dv = _dv_arrecadacao(codigo)
+        return dv is not None and int(codigo[3]) == dv(codigo[:3] + codigo[4:])
+    if codigo[3] != MOEDA_REAL or not fator_plausivel(int(codigo[5:9])):
+        return False
+    return int(codigo[4]) == modulo11_bancario(codigo[:4] + codigo[5:])
+
+
+def linha_para_codigo(linha: str) -> Optional[str]:
+    """Código de barras de uma linha digitável, se todos os DVs conferem"""
+    linha = re.sub(r'\D', '', linha)
+
+    if len(linha) == 47 and linha[0] != '8':
+        campos = (linha[0:9], linha[10:20], linha[21:31])
+        dvs = (linha[9], linha[20], linha[31])
+        if any(modulo10(c) != int(dv) for c, dv in zip(campos, dvs)):
+            return None
+        codigo = linha[0:4] + linha[32:47] + linha[4:9] + linha[10:20] + linha[21:31]
+
+    elif len(linha) == 48 and linha[0] == '8':
+        dv = _dv_arrecadacao(linha)
+        if dv is None:
+            return None
+        blocos = [linha[i:i + 11] for i in range(0, 48, 12)]
+        if any(dv(b) != int(linha[i + 11]) for b, i in zip(blocos, range(0, 48, 12))):
+            return None
+        codigo = "".join(blocos)
+
+    else:
+        return None
+
+    return codigo if codigo_valido(codigo) else None
+
+
+def codigo_para_linha(codigo: str) -> Optional[str]:
+    """Linha digitável (só dígitos) de um código de barras válido"""
+    if not codigo_valido(codigo):
+        return None
+
+    if codigo[0] == '8':
+        dv = _dv_arrecadacao(codigo)
+        return "".join(codigo[i:i + 11] + str(dv(codigo[i:i + 11])) for i in range(0, 44, 11))
+
+    campo1 = codigo[0:4] + codigo[19:24]
+    campo2 = codigo[24:34]
+    campo3 = codigo[34:44]
+    return (campo1 + str(modulo10(campo1)) + campo2 + str(modulo10(campo2))
+            + campo3 + str(modulo10(campo3)) + codigo[4] + codigo[5:19])
+
+
+def data_do_fator(fator: int, hoje: Optional[date] = None) -> Optional[date]:
+    """
+    Vencimento de um fator (0 = sem vencimento)
+
+    Entre os ciclos possíveis do fator, fica a data mais próxima de `hoje`.
+    """
+    if not fator:
+        return None
+    hoje = hoje or date.today()
+    dias = fator + CICLO_FATOR * max(0, round(((hoje - DATA_BASE_FATOR).days - fator) / CICLO_FATOR))
+    return DATA_BASE_FATOR + timedelta(days=dias)
+
+
+@dataclass
+class CodigoDecodificado:
+    """Campos tirados de um código de barras válido"""
+    tipo: str                       # 'bancario' ou 'arrecadacao'
+    codigo_barras: str
+    linha_digitavel: str
+    valor: Optional[float] = None
+    vencimento: Optional[str] = None  # ISO (AAAA-MM-DD)
+
+
+def decodificar(numero: str, hoje: Optional[date] = None) -> Optional[CodigoDecodificado]:
+    """Decodifica um código de barras ou uma linha digitável (None se inválido)"""
+    numero = re.sub(r'\D', '', numero)
+    if len(numero) == 44:
+        codigo = numero if codigo_valido(numero) else None
+    else:
+        codigo = linha_para_codigo(numero)
+    if not codigo:
+        return None
+
+    linha = codigo_para_linha(codigo)
+
+    if codigo[0] == '8':
+        # Valor efetivo (em centavos) só com identificador 6 ou 8
+        centavos = int(codigo[4:15]) if codigo[2] in '68' else 0
+        return CodigoDecodificado(
+            tipo='arrecadacao', codigo_barras=codigo, linha_digitavel=linha,
+            valor=centavos / 100 if centavos else None,
+        )
+
+    centavos = int(codigo[9:19])
+    vencimento = data_do_fator(int(codigo[5:9]), hoje)
+    return CodigoDecodificado(
+        tipo='bancario', codigo_barras=codigo, linha_digitavel=linha,
+        valor=centavos / 100 if centavos else None,
+        vencimento=vencimento.isoformat() if vencimento else None,
+    )
+
+
+def _combinacoes(blocos: List[str]):
+    """
+    Blocos consecutivos que formam uma linha (47 ou 48) ou um código (44)
+
+    Cada quebra entre blocos tem de cair numa posição que o formato admite
+    (LAYOUTS): números quaisquer separados por espaço não viram código.
+    """
+    for total, quebras in LAYOUTS:
+        for inicio in range(len(blocos)):
+            posicao = 0
+            for fim in range(inicio, len(blocos)):
+                posicao += len(blocos[fim])
+                if posicao == total:
+                    yield "".join(blocos[inicio:fim + 1])
+                    break
+                if posicao > total or posicao not in quebras:
+                    break
+
+
+def buscar_codigo(texto: str, hoje: Optional[date] = None) -> Optional[CodigoDecodificado]:
+    """
+    Primeiro código de barras ou linha digitável válido do texto
+
+    Os blocos de dígitos separados por ponto, espaço ou hífen são juntados
+    nas combinações consecutivas que batem com um dos formatos impressos
+    (LAYOUTS); só passa a que tiver todos os DVs corretos.
+    """
+    for trecho in TRECHO_PATTERN.finditer(texto):
+        for candidato in CANDIDATO_PATTERN.findall(trecho.group()):
+            for numero in _combinacoes(re.findall(r'\d+', candidato)):
+                decodificado = decodificar(numero, hoje)
+                if decodificado:
+                    return decodificado
+    return None
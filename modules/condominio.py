@@ -66,6 +66,16 @@ class CondominioModule:
         'outros': []
     }
     
+    # Filtro prévio: só mensagens com algum dígito E alguma palavra de
+    # entrada/saída podem virar transação (sem dígito não há valor, sem
+    # palavra-chave _detectar_tipo retorna None). Aplicado ao texto em minúsculas.
+    _FILTRO = re.compile(
+        r'^(?=.*?\d)(?=.*?(?:' +
+        '|'.join(re.escape(p) for p in sorted(set(PALAVRAS_ENTRADA + PALAVRAS_SAIDA), key=len, reverse=True)) +
+        r'))',
+        re.DOTALL
+    )
+    
     def __init__(self, data_dir: str = "data"):
         self.data_dir = data_dir
         self.grupos_dir = os.path.join(data_dir, "grupos")
@@ -152,6 +162,10 @@ class CondominioModule:
         
         return 'outros'
     
+    def pode_ser_transacao(self, mensagem: str) -> bool:
+        """Filtro rápido: descarta numa só passada mensagens que nunca seriam transação"""
+        return self._FILTRO.match(mensagem.lower()) is not None
+    
     def analisar_mensagem_grupo(self, mensagem: str, grupo_id: str, grupo_nome: str,
                                  user_id: str, user_name: str) -> Optional[Dict]:
         """
@@ -160,6 +174,10 @@ class CondominioModule:
         Returns:
             Dict com transação ou None se não for relevante
         """
+        # Conversa comum (maioria das mensagens) não passa do filtro
+        if not self.pode_ser_transacao(mensagem):
+            return None
+        
         # Extrai valor
         valor = self._extrair_valor(mensagem)
         if not valor or valor <= 0:
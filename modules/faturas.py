@@ -5,30 +5,274 @@ Processa PDFs de boletos e extrai informações automaticamente
 import os
 import re
 import json
-from datetime import datetime
-from typing import Dict, List, Optional, Any
+import time
+import asyncio
+import logging
+import tarfile
+import zipfile
+from concurrent.futures.process import BrokenProcessPool
+from bisect import bisect_left, insort
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 from dataclasses import dataclass, asdict
 
-# Para processar PDFs
-try:
-    import pdfplumber
-    PDF_AVAILABLE = True
-except ImportError:
-    PDF_AVAILABLE = False
+from config.settings import Settings
+from modules.anexos import (EXTENSOES_IMAGEM, Anexo, ArquivoGrandeDemais, eh_compactado,
+                            membros_compactados, nome_do_anexo)
+from modules.cache import DiskLRUCache, hash_conteudo, hash_do_arquivo
+from modules.codigo_barras import buscar_codigo
+from modules.workers import WorkerPool
 
-try:
-    from PyPDF2 import PdfReader
-    PYPDF2_AVAILABLE = True
-except ImportError:
-    PYPDF2_AVAILABLE = False
+# Leitura de PDFs (sonda e escolha do extrator) e OCR de fotos de boletos
+from modules.leitura_pdf import EstatisticasPdf, ler_pdf, ocr_pdf
+from modules.ocr import OCR_AVAILABLE, ler_boleto
 
-# Para OCR em PDFs com imagem
-try:
-    import pytesseract
-    from PIL import Image
-    OCR_AVAILABLE = True
-except ImportError:
-    OCR_AVAILABLE = False
+logger = logging.getLogger(__name__)
+
+# Índice de vencimentos: pendentes sem data válida ficam no fim
+DATA_ISO_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}')
+SEM_VENCIMENTO = '9999-99-99'
+
+
+# === Campos essenciais do boleto (também usados para parar a leitura do PDF) ===
+
+# Padrões comuns de valor em boletos
+VALOR_PATTERNS = [
+    re.compile(r'VALOR\s*(?:DO\s*)?(?:DOCUMENTO|COBRAN[ÇC]A|BOLETO)?\s*:?\s*R?\$?\s*([\d.,]+)'),
+    re.compile(r'R\$\s*([\d.,]+)'),
+    re.compile(r'TOTAL\s*:?\s*R?\$?\s*([\d.,]+)'),
+    re.compile(r'VALOR\s*:?\s*R?\$?\s*([\d.,]+)'),
+    re.compile(r'(\d{1,3}(?:\.\d{3})*,\d{2})'),  # 1.234,56
+]
+
+VENCIMENTO_PATTERNS = [
+    re.compile(r'VENCIMENTO\s*:?\s*(\d{2}[/.-]\d{2}[/.-]\d{2,4})'),
+    re.compile(r'VENC\.?\s*:?\s*(\d{2}[/.-]\d{2}[/.-]\d{2,4})'),
+    re.compile(r'DATA\s*VENC\w*\s*:?\s*(\d{2}[/.-]\d{2}[/.-]\d{2,4})'),
+    re.compile(r'(\d{2}/\d{2}/\d{4})'),  # Qualquer data
+]
+
+
+def _buscar_valor(texto_upper: str) -> Optional[float]:
+    for pattern in VALOR_PATTERNS:
+        match = pattern.search(texto_upper)
+        if match:
+            valor_str = match.group(1)
+            # Limpa e converte
+            valor_str = valor_str.replace('.', '').replace(',', '.')
+            try:
+                valor = float(valor_str)
+                if valor > 0 and valor < 1000000:  # Valor razoável
+                    return valor
+            except:
+                pass
+    return None
+
+
+def _buscar_vencimento(texto_upper: str) -> Optional[str]:
+    for pattern in VENCIMENTO_PATTERNS:
+        match = pattern.search(texto_upper)
+        if match:
+            vencimento = FaturasModule._parse_data(match.group(1))
+            if vencimento:
+                return vencimento
+    return None
+
+
+def _campos_essenciais(texto: str) -> set:
+    """
+    Quais dos campos essenciais (linha, valor, vencimento) aparecem no texto
+
+    Um código de barras válido costuma trazer os três de uma vez; o texto só
+    é vasculhado atrás do que o código não tem.
+    """
+    campos = set()
+    codigo = buscar_codigo(texto)
+    if codigo:
+        campos.add('linha')
+        if codigo.valor is not None:
+            campos.add('valor')
+        if codigo.vencimento:
+            campos.add('vencimento')
+    texto_upper = texto.upper()
+    if 'valor' not in campos and _buscar_valor(texto_upper) is not None:
+        campos.add('valor')
+    if 'vencimento' not in campos and _buscar_vencimento(texto_upper):
+        campos.add('vencimento')
+    return campos
+
+
+
+# === Demais campos (padrões compilados uma vez, no carregamento do módulo) ===
+
+# Boleto comum
+BENEFICIARIO_PATTERNS = [
+    re.compile(r'BENEFICI[ÁA]RIO\s*[:/]?\s*([A-ZÀ-Ú][A-ZÀ-Ú\s.,&-]+?)(?:\n|CNPJ|CPF|AGÊNCIA|AGENCIA|$)'),
+    re.compile(r'CEDENTE\s*[:/]?\s*([A-ZÀ-Ú][A-ZÀ-Ú\s.,&-]+?)(?:\n|CNPJ|CPF|$)'),
+    re.compile(r'FAVORECIDO\s*[:/]?\s*([A-ZÀ-Ú][A-ZÀ-Ú\s.,&-]+?)(?:\n|CNPJ|CPF|$)'),
+    re.compile(r'CREDOR\s*[:/]?\s*([A-ZÀ-Ú][A-ZÀ-Ú\s.,&-]+?)(?:\n|CNPJ|CPF|$)'),
+    re.compile(r'RECEBEDOR\s*[:/]?\s*([A-ZÀ-Ú][A-ZÀ-Ú\s.,&-]+?)(?:\n|CNPJ|CPF|$)'),
+]
+PAGADOR_PATTERNS = [
+    re.compile(r'PAGADOR\s*[:/]?\s*([A-ZÀ-Ú][A-ZÀ-Ú\s.,&-]+?)(?:\n|CNPJ|CPF|END|RUA|AV|$)'),
+    re.compile(r'SACADO\s*[:/]?\s*([A-ZÀ-Ú][A-ZÀ-Ú\s.,&-]+?)(?:\n|CNPJ|CPF|END|RUA|AV|$)'),
+    re.compile(r'DEVEDOR\s*[:/]?\s*([A-ZÀ-Ú][A-ZÀ-Ú\s.,&-]+?)(?:\n|CNPJ|CPF|$)'),
+    re.compile(r'CLIENTE\s*[:/]?\s*([A-ZÀ-Ú][A-ZÀ-Ú\s.,&-]+?)(?:\n|CNPJ|CPF|$)'),
+    re.compile(r'NOME\s*[:/]?\s*([A-ZÀ-Ú][A-ZÀ-Ú\s.,&-]+?)(?:\n|CNPJ|CPF|END|$)'),
+]
+DESCRICAO_PATTERNS = [
+    re.compile(r'(?:DESCRI[ÇC][ÃA]O|REFER[ÊE]NCIA|HIST[ÓO]RICO)\s*:?\s*(.+?)(?:\n|$)'),
+    re.compile(r'MENSALIDADE\s+(.+?)(?:\n|$)'),
+]
+
+# Guias de impostos
+PERIODO_PATTERNS = [
+    re.compile(r'PER[ÍI]ODO\s*(?:DE\s*)?APURA[ÇC][ÃA]O\s*[:/]?\s*(\d{2}[/.-]\d{4})'),
+    re.compile(r'COMPET[ÊE]NCIA\s*[:/]?\s*(\d{2}[/.-]\d{4})'),
+    re.compile(r'M[ÊE]S[/\s]*ANO\s*[:/]?\s*(\d{2}[/.-]\d{4})'),
+    re.compile(r'REF(?:ER[ÊE]NCIA)?\s*[:/]?\s*(\d{2}[/.-]\d{4})'),
+]
+CODIGO_RECEITA_PATTERNS = [
+    re.compile(r'C[ÓO]D(?:IGO)?\s*(?:DA\s*)?RECEITA\s*[:/]?\s*(\d{4,6})'),
+    re.compile(r'RECEITA\s*[:/]?\s*(\d{4,6})'),
+    re.compile(r'C[ÓO]DIGO\s*[:/]?\s*(\d{4,6})'),
+]
+REFERENCIA_PATTERNS = [
+    re.compile(r'N[ÚU]MERO\s*(?:DE\s*)?REFER[ÊE]NCIA\s*[:/]?\s*(\d+)'),
+    re.compile(r'REFER[ÊE]NCIA\s*[:/]?\s*(\d{10,20})'),
+]
+
+CPF_PATTERN = re.compile(r'CPF\s*[:/]?\s*(\d{3}\.?\d{3}\.?\d{3}-?\d{2})')
+CNPJ_PATTERN = re.compile(r'CNPJ\s*[:/]?\s*(\d{2}\.?\d{3}\.?\d{3}/?\d{4}-?\d{2})')
+
+VALOR_IMPOSTO_PATTERNS = [
+    re.compile(r'VALOR\s*(?:TOTAL|PRINCIPAL|DO\s*DOCUMENTO)?\s*[:/]?\s*R?\$?\s*([\d.,]+)'),
+    re.compile(r'TOTAL\s*A\s*RECOLHER\s*[:/]?\s*R?\$?\s*([\d.,]+)'),
+    re.compile(r'R\$\s*([\d.,]+)'),
+    re.compile(r'(\d{1,3}(?:\.\d{3})*,\d{2})'),
+]
+VENCIMENTO_IMPOSTO_PATTERNS = [
+    re.compile(r'VENCIMENTO\s*[:/]?\s*(\d{2}[/.-]\d{2}[/.-]\d{2,4})'),
+    re.compile(r'DATA\s*(?:DE\s*)?VENC\w*\s*[:/]?\s*(\d{2}[/.-]\d{2}[/.-]\d{2,4})'),
+    re.compile(r'PAGAR\s*AT[ÉE]\s*[:/]?\s*(\d{2}[/.-]\d{2}[/.-]\d{2,4})'),
+]
+CONTRIBUINTE_PATTERNS = [
+    re.compile(r'CONTRIBUINTE\s*[:/]?\s*([A-ZÀ-Ú][A-ZÀ-Ú\s.,&-]+?)(?:\n|CPF|CNPJ|$)'),
+    re.compile(r'NOME\s*[:/]?\s*([A-ZÀ-Ú][A-ZÀ-Ú\s.,&-]+?)(?:\n|CPF|CNPJ|END|$)'),
+    re.compile(r'RAZ[ÃA]O\s*SOCIAL\s*[:/]?\s*([A-ZÀ-Ú][A-ZÀ-Ú\s.,&-]+?)(?:\n|CNPJ|$)'),
+]
+
+# Limpeza de nomes, códigos e datas
+FIM_DE_NOME_PATTERN = re.compile(r'[\s,.-]+$')
+NAO_DIGITO_PATTERN = re.compile(r'\D')
+FORA_DE_DATA_PATTERN = re.compile(r'[^\d/.-]')
+
+
+# === Tipo do documento: tabela de decisão ===
+
+# Regras em ordem de precedência: a primeira cujas condições são todas
+# satisfeitas define o tipo. Cada condição é uma tupla de marcadores dos
+# quais basta um aparecer no texto (em maiúsculas). Um grupo de regras com
+# a mesma condição inicial termina sempre na regra só com essa condição,
+# que faz o papel do "senão" do if-chain original.
+REGRAS_TIPO_DOCUMENTO = (
+    # FGTS
+    ('fgts_digital', (('FGTS',), ('DIGITAL', 'GUIA FGTS'))),
+    ('fgts', (('FGTS',),)),
+    # DARF - Documento de Arrecadação de Receitas Federais
+    ('das', (('DARF',), ('SIMPLES',))),
+    ('darf', (('DARF',),)),
+    # Receita Federal (vários tipos)
+    ('das', (('RECEITA FEDERAL',), ('SIMPLES',))),
+    ('irpf', (('RECEITA FEDERAL',), ('IRPF', 'PESSOA FÍSICA', 'PESSOA FISICA'))),
+    ('irpj', (('RECEITA FEDERAL',), ('IRPJ', 'PESSOA JURÍDICA', 'PESSOA JURIDICA'))),
+    ('darf', (('RECEITA FEDERAL',),)),
+    # GPS - Guia da Previdência Social (INSS)
+    ('gps', (('GPS', 'PREVIDÊNCIA SOCIAL', 'PREVIDENCIA SOCIAL', 'INSS'),)),
+    # DAS - Documento de Arrecadação do Simples Nacional
+    ('das', (('DAS',), ('SIMPLES', 'MEI'))),
+    ('das', (('SIMPLES NACIONAL',),)),
+    ('das_mei', (('MEI',), ('MICROEMPREENDEDOR',))),
+    # IPTU, IPVA
+    ('iptu', (('IPTU', 'IMPOSTO PREDIAL', 'TERRITORIAL URBANO'),)),
+    ('ipva', (('IPVA', 'IMPOSTO SOBRE VEÍCULO', 'IMPOSTO SOBRE VEICULO'),)),
+    # ICMS
+    ('icms_difal', (('ICMS',), ('DIFAL',))),
+    ('icms_st', (('ICMS',), ('ST', 'SUBSTITUIÇÃO'))),
+    ('icms', (('ICMS',),)),
+    # ISS, ITR, ITBI, ITCMD
+    ('iss', (('ISS', 'IMPOSTO SOBRE SERVIÇO'),)),
+    ('itr', (('ITR', 'TERRITORIAL RURAL'),)),
+    ('itbi', (('ITBI', 'TRANSMISSÃO DE BENS'),)),
+    ('itcmd', (('ITCMD', 'CAUSA MORTIS', 'DOAÇÃO'),)),
+    # Taxas específicas
+    ('licenciamento', (('TAXA DE LICENCIAMENTO', 'LICENCIAMENTO'),)),
+    ('multa_transito', (('MULTA',), ('TRÂNSITO', 'TRANSITO', 'DETRAN'))),
+    # Guias estaduais/municipais genéricas
+    ('guia', (('GUIA DE RECOLHIMENTO', 'DARE', 'GARE'),)),
+    # Outros impostos federais
+    ('pis', (('CONTRIBUIÇÃO', 'CONTRIBUICAO'), ('PIS',))),
+    ('cofins', (('CONTRIBUIÇÃO', 'CONTRIBUICAO'), ('COFINS',))),
+    ('csll', (('CONTRIBUIÇÃO', 'CONTRIBUICAO'), ('CSLL',))),
+    ('darf', (('CONTRIBUIÇÃO', 'CONTRIBUICAO'),)),
+)
+
+
+def _agrupar_regras(regras) -> tuple:
+    """(condição inicial, ((tipo, demais condições), ...)) das regras seguidas que a repetem"""
+    grupos = []
+    for tipo, (primeira, *demais) in regras:
+        if grupos and grupos[-1][0] == primeira:
+            grupos[-1][1].append((tipo, tuple(demais)))
+        else:
+            grupos.append((primeira, [(tipo, tuple(demais))]))
+    return tuple((primeira, tuple(regras)) for primeira, regras in grupos)
+
+
+_GRUPOS_TIPO_DOCUMENTO = _agrupar_regras(REGRAS_TIPO_DOCUMENTO)
+
+
+def _tipo_documento(texto_upper: str) -> str:
+    """
+    Aplica REGRAS_TIPO_DOCUMENTO ao texto (em maiúsculas)
+
+    Avaliação preguiçosa, como no if-chain: a condição inicial de um grupo
+    é testada uma vez e as demais só se ela passar, cada uma parando no
+    primeiro marcador achado.
+    """
+    for primeira, regras in _GRUPOS_TIPO_DOCUMENTO:
+        for marcador in primeira:
+            if marcador in texto_upper:
+                break
+        else:
+            continue
+        for tipo, demais in regras:
+            for condicao in demais:
+                for marcador in condicao:
+                    if marcador in texto_upper:
+                        break
+                else:
+                    break
+            else:
+                return tipo
+    return 'boleto'
+
+
+def _extrair_texto_pdf(fonte: Union[bytes, str], max_paginas: int = 0,
+                       preferencias: Optional[Dict[str, List[str]]] = None) -> Tuple[str, dict]:
+    """
+    (texto, registro) de um PDF até os campos essenciais do boleto (roda num processo do pool)
+
+    `fonte` é o conteúdo do arquivo ou um caminho em disco; `max_paginas`
+    limita as páginas lidas (0 = sem limite). A escolha do extrator e o
+    registro estão em leitura_pdf.ler_pdf.
+    """
+    return ler_pdf(fonte, _campos_essenciais, max_paginas, preferencias)
+
+
+def _ocr_do_pdf(fonte: Union[bytes, str], max_paginas: int) -> Tuple[str, dict]:
+    """OCR das primeiras páginas de um PDF escaneado (roda num processo do pool)"""
+    return ocr_pdf(fonte, _campos_essenciais, max_paginas)
 
 
 @dataclass
@@ -53,6 +297,7 @@ class Boleto:
     codigo_receita: str = ""
     numero_referencia: str = ""
     cnpj_cpf: str = ""
+    hash_arquivo: str = ""  # sha256 do arquivo (detecta reenvios)
     
     def to_dict(self):
         return asdict(self)
@@ -61,15 +306,42 @@ class Boleto:
 class FaturasModule:
     """Gerenciador de Faturas e Boletos"""
     
-    def __init__(self, data_dir: str = "data"):
+    def __init__(self, data_dir: str = "data", settings: Settings = None):
         self.data_dir = data_dir
         self.boletos_file = os.path.join(data_dir, "boletos.json")
+        settings = settings or Settings()
         
         os.makedirs(data_dir, exist_ok=True)
         self._load_data()
         
+        # Texto já extraído de cada PDF, pelo conteúdo (reenvios não são lidos de novo)
+        self.extracoes = DiskLRUCache(
+            os.path.join(data_dir, 'cache', 'faturas'),
+            max_bytes=settings.pdf_cache_mb * 1024 * 1024
+        )
+        
         # Referência ao módulo de agenda (será injetado)
         self.agenda_module = None
+        
+        # Extração de texto dos PDFs (processos sobem no primeiro PDF)
+        self.pdf_timeout = settings.pdf_timeout
+        self.ocr_timeout = settings.ocr_timeout
+        self.pdf_max_paginas = settings.pdf_max_pages
+        self.pdf_ocr_max_paginas = settings.pdf_ocr_max_pages
+        self.estatisticas_pdf = EstatisticasPdf(os.path.join(data_dir, 'estatisticas'))
+        self.pool = WorkerPool(
+            max_workers=settings.pdf_workers,
+            max_memory_mb=settings.pdf_max_memory_mb
+        )
+        
+        # Envio em lote (vários PDFs ou ZIP/TAR)
+        self.lote_max_arquivos = settings.lote_max_arquivos
+        self.lote_max_bytes = settings.max_file_size_mb * 1024 * 1024
+    
+    def fechar(self):
+        """Encerra os processos de extração de PDF e grava as estatísticas pendentes"""
+        self.pool.shutdown()
+        self.estatisticas_pdf.fechar()
     
     def set_agenda_module(self, agenda):
         """Define o módulo de agenda para criar lembretes"""
@@ -82,6 +354,130 @@ class FaturasModule:
                 self.boletos = json.load(f)
         else:
             self.boletos = []
+        
+        self._por_hash: Dict[tuple, Dict] = {}
+        self._por_codigo: Dict[tuple, Dict] = {}
+        self._por_id: Dict[tuple, Dict] = {}
+        # (user_id, hash) -> leitura em andamento (resolvida com a resposta, ou None)
+        self._em_andamento: Dict[tuple, asyncio.Future] = {}
+        # user_id -> [(vencimento, id)] dos pendentes, sempre em ordem
+        self._pendentes: Dict[str, List[Tuple[str, str]]] = {}
+        for b in self.boletos:
+            self._indexar(b)
+    
+    def _indexar(self, boleto: Dict):
+        """Registra o boleto nos índices (por usuário) de id, arquivo, código e vencimento"""
+        user_id = boleto['user_id']
+        self._por_id[(user_id, boleto['id'])] = boleto
+        if not boleto.get('pago'):
+            insort(self._pendentes.setdefault(user_id, []), self._chave_vencimento(boleto))
+        if boleto.get('hash_arquivo'):
+            self._por_hash.setdefault((user_id, boleto['hash_arquivo']), boleto)
+        chave = self._chave_boleto(boleto.get('linha_digitavel'), boleto.get('codigo_barras'))
+        if chave:
+            self._por_codigo.setdefault((user_id, chave), boleto)
+    
+    @staticmethod
+    def _chave_vencimento(boleto: Dict) -> Tuple[str, str]:
+        """(vencimento ISO, id): a ordem do índice de pendentes"""
+        vencimento = boleto.get('vencimento') or ''
+        if not DATA_ISO_PATTERN.fullmatch(vencimento):
+            vencimento = SEM_VENCIMENTO
+        return vencimento, boleto['id']
+    
+    def _pendentes_entre(self, user_id: str, inicio: str, fim: str) -> List[Dict]:
+        """Pendentes do usuário com vencimento em [inicio, fim) (datas ISO), por busca binária"""
+        indice = self._pendentes.get(user_id, [])
+        de = bisect_left(indice, (inicio,))
+        ate = bisect_left(indice, (fim,))
+        return [self._por_id[(user_id, boleto_id)] for _, boleto_id in indice[de:ate]]
+    
+    def boletos_a_vencer(self, dias: int = 3, hoje: Optional[date] = None) -> Dict[str, List[Dict]]:
+        """
+        Pendentes de todos os usuários que vencem de hoje até daqui a `dias`
+        dias, por usuário (para avisos proativos)
+        
+        Uma busca binária no índice de cada usuário: o custo não cresce com
+        os boletos pagos nem com os de vencimento distante.
+        """
+        hoje = hoje or date.today()
+        inicio, fim = hoje.isoformat(), (hoje + timedelta(days=dias + 1)).isoformat()
+        a_vencer = {}
+        for user_id in self._pendentes:
+            boletos = self._pendentes_entre(user_id, inicio, fim)
+            if boletos:
+                a_vencer[user_id] = boletos
+        return a_vencer
+    
+    def avisos_de_vencimento(self, dias: int = 3, hoje: Optional[date] = None) -> Dict[str, str]:
+        """
+        Texto do aviso de cada usuário com boletos vencendo em até `dias` dias
+        
+        Cada boleto entra em um aviso por dia no máximo (marcado com
+        'avisado_em'): a varredura pode rodar de hora em hora, ou de novo
+        depois de reiniciar, sem repetir o aviso.
+        """
+        hoje = hoje or date.today()
+        marca = hoje.isoformat()
+        avisos = {}
+        for user_id, boletos in self.boletos_a_vencer(dias, hoje).items():
+            novos = [b for b in boletos if b.get('avisado_em') != marca]
+            if not novos:
+                continue
+            linhas = ["⏰ *Boletos a Vencer*\n"]
+            for b in novos:
+                b['avisado_em'] = marca
+                quando = "*hoje*" if b['vencimento'] == marca else self._formatar_data(b['vencimento'])
+                linhas.append(f"📋 `{b['id']}` {b.get('descricao', 'Boleto')}\n"
+                              f"💰 R$ {b.get('valor', 0):.2f} | 📅 {quando}\n")
+            linhas.append("Para marcar pago: /pago [id]")
+            avisos[user_id] = "\n".join(linhas)
+        if avisos:
+            self._save_data()
+        return avisos
+    
+    @staticmethod
+    def _chave_boleto(linha_digitavel: Optional[str], codigo_barras: Optional[str]) -> Optional[str]:
+        """
+        Código de barras (44 dígitos) que identifica o boleto
+        
+        A linha digitável é o mesmo código reordenado e com dígitos
+        verificadores: a mesma cobrança lida como linha (de um PDF) ou como
+        código de barras (de outro) dá a mesma chave.
+        """
+        codigo = NAO_DIGITO_PATTERN.sub('', codigo_barras or '')
+        if len(codigo) == 44:
+            return codigo
+        
+        linha = NAO_DIGITO_PATTERN.sub('', linha_digitavel or '')
+        if len(linha) == 47 and not linha.startswith('8'):
+            # Bancário: campos 1-3 sem DVs, DV geral, fator + valor
+            return linha[0:4] + linha[32:47] + linha[4:9] + linha[10:20] + linha[21:31]
+        if len(linha) == 48 and linha.startswith('8'):
+            # Arrecadação: 4 blocos de 11 dígitos + DV
+            return linha[0:11] + linha[12:23] + linha[24:35] + linha[36:47]
+        return linha or None
+    
+    def _boleto_existente(self, user_id: str, hash_arquivo: str,
+                          dados: Optional[Dict] = None) -> Optional[Dict]:
+        """Boleto do usuário já registrado com o mesmo arquivo ou o mesmo código"""
+        existente = self._por_hash.get((user_id, hash_arquivo))
+        if existente is None and dados:
+            chave = self._chave_boleto(dados.get('linha_digitavel'), dados.get('codigo_barras'))
+            if chave:
+                existente = self._por_codigo.get((user_id, chave))
+        return existente
+    
+    def _responder_existente(self, boleto: Dict) -> str:
+        """Resposta para um boleto reenviado (sem salvar nem agendar de novo)"""
+        campos = {k: v for k, v in boleto.items() if k in Boleto.__dataclass_fields__}
+        boleto_obj = Boleto(**campos)
+        if boleto_obj.tipo == 'boleto':
+            resposta = self._formatar_resposta_boleto(boleto_obj)
+        else:
+            resposta = self._formatar_resposta_imposto(boleto_obj)
+        situacao = "já está pago" if boleto.get('pago') else "já estava registrado"
+        return f"♻️ *Este boleto {situacao}* (ID: `{boleto['id']}`)\n{resposta}"
     
     def _save_data(self):
         """Salva dados no disco"""
@@ -94,11 +490,13 @@ class FaturasModule:
         
         if command in ['fatura', 'boleto']:
             if attachments:
+                if len(attachments) > 1 or eh_compactado(attachments[0]):
+                    return await self.processar_lote(attachments, user_id)
                 return await self.processar_arquivo(attachments[0], user_id)
             return """
 📄 *Módulo de Faturas e Boletos*
 
-Envie um arquivo PDF de boleto e eu vou extrair:
+Envie um arquivo PDF de boleto (ou vários, ou um ZIP) e eu vou extrair:
 • 💰 Valor
 • 📊 Código de barras / Linha digitável  
 • 📅 Data de vencimento
@@ -124,48 +522,92 @@ E posso agendar automaticamente na sua agenda!
     async def handle_natural(self, message: str, analysis: Any,
                               user_id: str, attachments: list = None) -> str:
         """Processa linguagem natural"""
-        if attachments:
-            return await self.processar_arquivo(attachments[0], user_id)
         return await self.handle('fatura', [], user_id, attachments)
     
-    async def processar_arquivo(self, arquivo: str, user_id: str) -> str:
+    async def processar_arquivo(self, arquivo: Union[str, Anexo], user_id: str) -> str:
         """
         Processa um arquivo de boleto (PDF)
         Extrai informações e agenda automaticamente
+
+        Aceita um caminho em disco ou um Anexo em memória
         """
-        if not os.path.exists(arquivo):
+        if not isinstance(arquivo, Anexo) and not os.path.exists(arquivo):
             return "❌ Arquivo não encontrado."
         
-        ext = os.path.splitext(arquivo)[1].lower()
+        ext = os.path.splitext(nome_do_anexo(arquivo))[1].lower()
         
-        if ext == '.pdf':
+        if eh_compactado(arquivo):
+            return await self.processar_lote([arquivo], user_id)
+        elif ext == '.pdf':
             return await self._processar_pdf(arquivo, user_id)
-        elif ext in ['.jpg', '.jpeg', '.png']:
+        elif ext in EXTENSOES_IMAGEM:
             return await self._processar_imagem(arquivo, user_id)
         else:
             return f"❌ Formato não suportado: {ext}\nEnvie um PDF ou imagem."
     
-    async def _processar_pdf(self, arquivo: str, user_id: str) -> str:
-        """Processa PDF de boleto"""
-        texto = ""
+    @staticmethod
+    async def _fonte(arquivo: Union[str, bytes, Anexo]) -> Tuple[Union[bytes, str], str]:
+        """
+        (fonte para o pool, sha256) de um arquivo
         
-        # Tenta com pdfplumber primeiro (melhor para boletos)
-        if PDF_AVAILABLE:
-            try:
-                with pdfplumber.open(arquivo) as pdf:
-                    for page in pdf.pages:
-                        texto += page.extract_text() or ""
-            except Exception as e:
-                print(f"Erro pdfplumber: {e}")
+        O que está em disco (caminho ou anexo que passou de spill_bytes) vai
+        para o pool como caminho, sem os bytes passarem pelo pickle; o hash
+        é calculado em blocos, numa thread.
+        """
+        if isinstance(arquivo, Anexo):
+            arquivo = arquivo.caminho or arquivo.ler()
+        if isinstance(arquivo, bytes):
+            return arquivo, hash_conteudo(arquivo)
+        return arquivo, await asyncio.to_thread(hash_do_arquivo, arquivo)
+    
+    async def _processar_pdf(self, arquivo: Union[str, Anexo], user_id: str) -> str:
+        """Processa PDF de boleto"""
+        fonte, hash_arquivo = await self._fonte(arquivo)
+        return await self._ler_uma_vez(
+            user_id, hash_arquivo,
+            lambda: self._ler_pdf(fonte, hash_arquivo, nome_do_anexo(arquivo), user_id)
+        )
+    
+    async def _ler_uma_vez(self, user_id: str, hash_arquivo: str,
+                           ler: Callable[[], Awaitable[str]]) -> str:
+        """
+        Lê e registra um arquivo do usuário uma vez só, mesmo com reenvios simultâneos
         
-        # Fallback para PyPDF2
-        if not texto and PYPDF2_AVAILABLE:
-            try:
-                reader = PdfReader(arquivo)
-                for page in reader.pages:
-                    texto += page.extract_text() or ""
-            except Exception as e:
-                print(f"Erro PyPDF2: {e}")
+        Arquivo já registrado devolve o registro. O par (usuário, hash) é
+        reservado antes do primeiro await: quem chega com o mesmo arquivo
+        durante a leitura espera por ela e recebe o mesmo resultado (ou o
+        registro, se o boleto foi salvo).
+        """
+        chave = (user_id, hash_arquivo)
+        while chave in self._em_andamento:
+            resultado = await asyncio.shield(self._em_andamento[chave])
+            if resultado is not None and not self._boleto_existente(user_id, hash_arquivo):
+                return resultado
+        
+        existente = self._boleto_existente(user_id, hash_arquivo)
+        if existente:
+            return self._responder_existente(existente)
+        
+        futuro = asyncio.get_running_loop().create_future()
+        self._em_andamento[chave] = futuro
+        resultado = None
+        try:
+            resultado = await ler()
+            return resultado
+        finally:
+            # None (leitura cancelada): quem esperava tenta por conta própria
+            del self._em_andamento[chave]
+            futuro.set_result(resultado)
+    
+    async def _ler_pdf(self, fonte: Union[bytes, str], hash_arquivo: str,
+                       nome_arquivo: str, user_id: str) -> str:
+        try:
+            texto = await self._texto_do_pdf(fonte, hash_arquivo)
+        except asyncio.TimeoutError:
+            return f"❌ O PDF demorou demais para ser lido (mais de {self.pdf_timeout:.0f}s). Tente um arquivo menor."
+        except (MemoryError, BrokenProcessPool):
+            logger.warning(f"PDF de {user_id} passou do limite de memória")
+            return "❌ PDF muito pesado para processar. Tente enviar só as páginas do boleto."
         
         if not texto:
             return """
@@ -179,12 +621,20 @@ Possíveis motivos:
 Tente enviar como imagem (foto do boleto).
 """
         
-        # Extrai informações do boleto
+        return await self._registrar_texto(texto, nome_arquivo, user_id, hash_arquivo)
+    
+    async def _registrar_texto(self, texto: str, nome_arquivo: str, user_id: str,
+                               hash_arquivo: str, origem: str = "PDF lido") -> str:
+        """
+        Extrai, registra e agenda o boleto de um texto já lido (PDF ou foto)
+        
+        `origem` abre o aviso quando o texto não tem dados de boleto.
+        """
         dados = self._extrair_dados_boleto(texto)
         
         if not dados['valor'] and not dados['linha_digitavel']:
             return f"""
-⚠️ *PDF lido, mas não encontrei dados de boleto*
+⚠️ *{origem}, mas não encontrei dados de boleto*
 
 Texto extraído (primeiros 500 caracteres):
 ```
@@ -194,31 +644,14 @@ Texto extraído (primeiros 500 caracteres):
 Se for um boleto, tente enviar uma foto mais nítida.
 """
         
-        # Salva o boleto/imposto
-        from uuid import uuid4
-        boleto = Boleto(
-            id=str(uuid4())[:8],
-            valor=dados['valor'] or 0,
-            codigo_barras=dados.get('codigo_barras') or "",
-            linha_digitavel=dados.get('linha_digitavel') or "",
-            vencimento=dados.get('vencimento') or "",
-            beneficiario=dados.get('beneficiario') or "Não identificado",
-            pagador=dados.get('pagador') or "Não identificado",
-            descricao=dados.get('descricao') or "Boleto",
-            arquivo_origem=os.path.basename(arquivo),
-            user_id=user_id,
-            extraido_em=datetime.now().isoformat(),
-            pago=False,
-            agendado=False,
-            tipo=dados.get('tipo', 'boleto'),
-            periodo_apuracao=dados.get('periodo_apuracao') or "",
-            codigo_receita=dados.get('codigo_receita') or "",
-            numero_referencia=dados.get('numero_referencia') or "",
-            cnpj_cpf=dados.get('cnpj_cpf') or "",
-        )
+        # Mesma cobrança em outro arquivo (ex: encaminhada do e-mail)
+        existente = self._boleto_existente(user_id, hash_arquivo, dados)
+        if existente:
+            return self._responder_existente(existente)
         
-        self.boletos.append(boleto.to_dict())
-        self._save_data()
+        # Salva o boleto/imposto
+        boleto = self._novo_boleto(dados, nome_arquivo, user_id, hash_arquivo)
+        self._registrar([boleto])
         
         # Lista de tipos que são impostos/guias
         tipos_impostos = [
@@ -244,9 +677,7 @@ Se for um boleto, tente enviar uma foto mais nítida.
 Você receberá um lembrete antes do vencimento.
 """
                 # Atualiza status
-                for b in self.boletos:
-                    if b['id'] == boleto.id:
-                        b['agendado'] = True
+                self._por_id[(user_id, boleto.id)]['agendado'] = True
                 self._save_data()
             except Exception as e:
                 resposta += f"\n⚠️ Não consegui agendar: {e}"
@@ -260,6 +691,329 @@ Você receberá um lembrete antes do vencimento.
         
         return resposta
     
+    async def _texto_do_pdf(self, fonte: Union[bytes, str], hash_arquivo: str) -> str:
+        """
+        Texto do PDF: do cache (mesmo arquivo já lido, para qualquer usuário)
+        ou extraído num processo do pool, com OCR se for escaneado
+        
+        Rota, extrator e tempos de cada leitura vão para estatisticas_pdf.
+
+        Raises:
+            asyncio.TimeoutError, MemoryError, BrokenProcessPool: como em WorkerPool.run
+        """
+        chave_cache = f'sha256:{hash_arquivo}'
+        texto = self.extracoes.get(chave_cache)
+        if texto is not None:
+            return texto
+        
+        try:
+            texto, registro = await self.pool.run(
+                _extrair_texto_pdf, fonte, self.pdf_max_paginas,
+                self.estatisticas_pdf.preferencias(), timeout=self.pdf_timeout
+            )
+        except asyncio.TimeoutError:
+            self.estatisticas_pdf.registrar({'erro': 'tempo esgotado', 'ms': self.pdf_timeout * 1000})
+            raise
+        
+        # Escaneado: as páginas são rasterizadas e lidas como fotos
+        if registro['rota'] == 'ocr':
+            inicio = time.perf_counter()
+            try:
+                lido, registro['ocr'] = await self.pool.run(
+                    _ocr_do_pdf, fonte, self.pdf_ocr_max_paginas, timeout=self.ocr_timeout
+                )
+                if lido.strip():
+                    texto = lido
+            except asyncio.TimeoutError:
+                registro['ocr'] = {'backend': 'ocr', 'ms': self.ocr_timeout * 1000, 'erro': 'tempo esgotado'}
+                self.estatisticas_pdf.registrar(registro)
+                raise
+            except RuntimeError as e:
+                logger.warning(f"Erro no OCR do PDF: {e}")
+                registro['ocr'] = {
+                    'backend': 'ocr', 'ms': round((time.perf_counter() - inicio) * 1000, 1), 'erro': str(e)[:200]
+                }
+        
+        self.estatisticas_pdf.registrar(registro)
+        if texto:
+            self.extracoes.set(chave_cache, texto)
+        return texto
+    
+    async def _texto_da_imagem(self, fonte: Union[bytes, str], hash_arquivo: str) -> str:
+        """
+        Texto de uma foto (OCR num processo do pool), com o mesmo cache dos PDFs
+
+        Raises:
+            asyncio.TimeoutError, MemoryError, BrokenProcessPool: como em WorkerPool.run
+        """
+        chave_cache = f'ocr:sha256:{hash_arquivo}'
+        texto = self.extracoes.get(chave_cache)
+        if texto is None:
+            texto = await self.pool.run(ler_boleto, fonte, timeout=self.ocr_timeout)
+            if texto.strip():
+                self.extracoes.set(chave_cache, texto)
+        return texto
+    
+    def _novo_boleto(self, dados: Dict, nome_arquivo: str, user_id: str, hash_arquivo: str) -> Boleto:
+        """Boleto/imposto a partir dos dados extraídos"""
+        from uuid import uuid4
+        return Boleto(
+            id=str(uuid4())[:8],
+            valor=dados['valor'] or 0,
+            codigo_barras=dados.get('codigo_barras') or "",
+            linha_digitavel=dados.get('linha_digitavel') or "",
+            vencimento=dados.get('vencimento') or "",
+            beneficiario=dados.get('beneficiario') or "Não identificado",
+            pagador=dados.get('pagador') or "Não identificado",
+            descricao=dados.get('descricao') or "Boleto",
+            arquivo_origem=os.path.basename(nome_arquivo),
+            user_id=user_id,
+            extraido_em=datetime.now().isoformat(),
+            pago=False,
+            agendado=False,
+            tipo=dados.get('tipo', 'boleto'),
+            periodo_apuracao=dados.get('periodo_apuracao') or "",
+            codigo_receita=dados.get('codigo_receita') or "",
+            numero_referencia=dados.get('numero_referencia') or "",
+            cnpj_cpf=dados.get('cnpj_cpf') or "",
+            hash_arquivo=hash_arquivo,
+        )
+    
+    def _registrar(self, boletos: List[Boleto]):
+        """Guarda e indexa os boletos, com uma gravação só do arquivo"""
+        for boleto in boletos:
+            registro = boleto.to_dict()
+            self.boletos.append(registro)
+            self._indexar(registro)
+        self._save_data()
+    
+    # ==================== LOTE (vários PDFs / ZIP / TAR) ====================
+    
+    async def processar_lote(self, arquivos: list, user_id: str) -> str:
+        """
+        Vários boletos de uma vez: anexos soltos e/ou arquivos ZIP/TAR
+        
+        PDFs e fotos são lidos em paralelo no pool, com no máximo um por worker
+        em andamento (só esses ficam na memória). No fim, um resumo só e uma
+        única gravação de todos os boletos novos.
+        
+        Cada arquivo lido fica reservado (usuário, hash) até a gravação: o
+        mesmo arquivo enviado à parte nesse meio-tempo espera pelo lote.
+        """
+        reservas: Dict[tuple, asyncio.Future] = {}
+        try:
+            return await self._processar_lote(arquivos, user_id, reservas)
+        finally:
+            for chave, futuro in reservas.items():
+                if self._em_andamento.get(chave) is futuro:
+                    del self._em_andamento[chave]
+                futuro.set_result(None)
+    
+    async def _processar_lote(self, arquivos: list, user_id: str,
+                              reservas: Dict[tuple, asyncio.Future]) -> str:
+        vagas = asyncio.Semaphore(self.pool.max_workers)
+        vistos: Dict[str, str] = {}  # hash -> primeiro arquivo do lote com esse conteúdo
+        tarefas = []
+        falhas = []
+        ignorados = []
+        
+        async def ler(nome: str, conteudo: Union[bytes, str]):
+            try:
+                return await self._ler_do_lote(nome, conteudo, user_id, vistos, reservas)
+            finally:
+                vagas.release()
+        
+        try:
+            async for nome, conteudo in self._arquivos_do_lote(arquivos):
+                if isinstance(conteudo, Exception):
+                    falhas.append((nome, self._motivo_da_falha(conteudo)))
+                elif not nome.lower().endswith(self._extensoes_do_lote()):
+                    ignorados.append(nome)
+                else:
+                    await vagas.acquire()
+                    tarefas.append(asyncio.create_task(ler(nome, conteudo)))
+            resultados = await asyncio.gather(*tarefas)
+        finally:
+            for tarefa in tarefas:
+                tarefa.cancel()
+        
+        novos, existentes, repetidos = [], [], []
+        chaves: Dict[str, str] = {}
+        for situacao, nome, detalhe in resultados:
+            if situacao == 'novo':
+                # Mesma cobrança em dois arquivos do lote
+                chave = self._chave_boleto(detalhe.linha_digitavel, detalhe.codigo_barras)
+                if chave in chaves:
+                    repetidos.append((nome, chaves[chave]))
+                    continue
+                if chave:
+                    chaves[chave] = nome
+                novos.append(detalhe)
+            elif situacao == 'existente':
+                existentes.append((nome, detalhe))
+            elif situacao == 'repetido':
+                repetidos.append((nome, detalhe))
+            else:
+                falhas.append((nome, detalhe))
+        
+        # Agenda antes de gravar: a marca de agendado já vai na gravação única
+        for boleto in novos:
+            if boleto.vencimento and self.agenda_module:
+                try:
+                    await self._agendar_boleto(boleto, user_id)
+                    boleto.agendado = True
+                except Exception as e:
+                    logger.warning(f"Não consegui agendar o boleto {boleto.id}: {e}")
+        
+        if novos:
+            self._registrar(novos)
+        
+        return self._formatar_resumo_lote(novos, existentes, repetidos, falhas, ignorados)
+    
+    async def _arquivos_do_lote(self, arquivos: list):
+        """
+        (nome, conteúdo) de cada arquivo do lote, abrindo ZIP/TAR membro a membro
+        
+        A leitura (e descompressão) roda numa thread. O conteúdo é os bytes,
+        um caminho (arquivo já em disco) ou uma exceção (arquivo grande
+        demais ou compactado inválido).
+        """
+        limite = self.lote_max_bytes
+        restantes = self.lote_max_arquivos
+        for arquivo in arquivos:
+            if restantes <= 0:
+                break
+            nome = os.path.basename(nome_do_anexo(arquivo))
+            if not eh_compactado(arquivo):
+                restantes -= 1
+                if isinstance(arquivo, Anexo):
+                    yield nome, arquivo.caminho or arquivo.ler()
+                else:
+                    yield nome, arquivo
+                continue
+            
+            membros = membros_compactados(arquivo, limite, restantes)
+            while True:
+                try:
+                    item = await asyncio.to_thread(next, membros, None)
+                except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+                    yield nome, e
+                    break
+                if item is None:
+                    break
+                restantes -= 1
+                membro, conteudo = item
+                yield f"{nome}/{membro}", conteudo
+    
+    @staticmethod
+    def _extensoes_do_lote() -> tuple:
+        return ('.pdf',) + EXTENSOES_IMAGEM if OCR_AVAILABLE else ('.pdf',)
+    
+    async def _ler_do_lote(self, nome: str, conteudo: Union[bytes, str], user_id: str,
+                           vistos: Dict[str, str], reservas: Dict[tuple, asyncio.Future]):
+        """
+        Um PDF ou foto do lote, como (situação, nome, detalhe):
+        ('novo', nome, Boleto), ('existente', nome, registro),
+        ('repetido', nome, outro arquivo do lote) ou ('falha', nome, motivo)
+        """
+        try:
+            conteudo, hash_arquivo = await self._fonte(conteudo)
+        except OSError as e:
+            logger.warning(f"Erro ao ler {nome} do lote: {e}")
+            return 'falha', nome, "não consegui ler o arquivo"
+        existente = self._boleto_existente(user_id, hash_arquivo)
+        if existente:
+            return 'existente', nome, existente
+        if hash_arquivo in vistos:
+            return 'repetido', nome, vistos[hash_arquivo]
+        vistos[hash_arquivo] = nome
+        
+        # Mesmo arquivo sendo lido por outro envio: espera e usa o registro dele
+        chave = (user_id, hash_arquivo)
+        while chave in self._em_andamento:
+            await asyncio.shield(self._em_andamento[chave])
+        existente = self._boleto_existente(user_id, hash_arquivo)
+        if existente:
+            return 'existente', nome, existente
+        reservas[chave] = self._em_andamento[chave] = asyncio.get_running_loop().create_future()
+        
+        try:
+            if nome.lower().endswith('.pdf'):
+                texto = await self._texto_do_pdf(conteudo, hash_arquivo)
+            else:
+                texto = await self._texto_da_imagem(conteudo, hash_arquivo)
+        except (asyncio.TimeoutError, MemoryError, BrokenProcessPool) as e:
+            return 'falha', nome, self._motivo_da_falha(e)
+        except Exception as e:
+            logger.warning(f"Erro ao ler {nome} do lote: {e}")
+            return 'falha', nome, "não consegui ler o arquivo"
+        if not texto.strip():
+            return 'falha', nome, "sem texto (escaneado, protegido ou corrompido)"
+        
+        dados = self._extrair_dados_boleto(texto)
+        if not dados['valor'] and not dados['linha_digitavel']:
+            return 'falha', nome, "não encontrei dados de boleto"
+        
+        existente = self._boleto_existente(user_id, hash_arquivo, dados)
+        if existente:
+            return 'existente', nome, existente
+        return 'novo', nome, self._novo_boleto(dados, nome, user_id, hash_arquivo)
+    
+    def _motivo_da_falha(self, erro: Exception) -> str:
+        if isinstance(erro, asyncio.TimeoutError):
+            return f"demorou demais para ser lido (mais de {self.pdf_timeout:.0f}s)"
+        if isinstance(erro, (MemoryError, BrokenProcessPool)):
+            return "pesado demais para processar"
+        if isinstance(erro, ArquivoGrandeDemais):
+            return f"maior que o limite de {self.lote_max_bytes // (1024 * 1024)} MB"
+        return "arquivo compactado inválido"
+    
+    def _formatar_resumo_lote(self, novos: List[Boleto], existentes: list,
+                              repetidos: list, falhas: list, ignorados: list) -> str:
+        """Resposta única para o lote"""
+        total_arquivos = len(novos) + len(existentes) + len(repetidos) + len(falhas) + len(ignorados)
+        if not total_arquivos:
+            return "❌ Não encontrei nenhum arquivo no envio."
+        
+        resposta = f"\n📦 *{total_arquivos} arquivo(s) processado(s)*\n"
+        
+        if novos:
+            total = sum(b.valor for b in novos)
+            resposta += f"\n✅ *{len(novos)} novo(s)* - total R$ {total:.2f}\n"
+            for boleto in sorted(novos, key=lambda b: b.vencimento or '9999-99-99'):
+                resposta += (f"• `{boleto.id}` {boleto.descricao} - R$ {boleto.valor:.2f}"
+                             f" - vence {self._formatar_data(boleto.vencimento)}\n")
+            agendados = sum(1 for b in novos if b.agendado)
+            if agendados:
+                resposta += f"📅 {agendados} agendado(s) com lembrete antes do vencimento\n"
+        
+        if existentes:
+            resposta += f"\n🔁 *{len(existentes)} já registrado(s)*\n"
+            for nome, registro in existentes:
+                situacao = "pago" if registro.get('pago') else f"`{registro['id']}`"
+                resposta += f"• {nome} ({situacao})\n"
+        
+        if repetidos:
+            resposta += f"\n♊ *{len(repetidos)} repetido(s) no envio*\n"
+            for nome, outro in repetidos:
+                resposta += f"• {nome} = {outro}\n"
+        
+        if falhas:
+            resposta += f"\n❌ *{len(falhas)} com problema*\n"
+            for nome, motivo in falhas:
+                resposta += f"• {nome}: {motivo}\n"
+        
+        if ignorados:
+            resposta += f"\n⏭️ *{len(ignorados)} ignorado(s)* (formato não suportado)\n"
+        
+        resposta += """
+─────────────────────
+*Comandos:*
+/boletos - Ver todos os boletos
+/pago [id] - Marcar como pago
+"""
+        return resposta
+    
     def _formatar_resposta_boleto(self, boleto: Boleto) -> str:
         """Formata resposta para boleto comum"""
         return f"""
@@ -371,7 +1125,15 @@ Você receberá um lembrete antes do vencimento.
         }
         
         texto_upper = texto.upper()
-        texto_limpo = re.sub(r'\s+', ' ', texto)
+        
+        # === CÓDIGO DE BARRAS / LINHA DIGITÁVEL (só com os DVs conferindo) ===
+        # Valor e vencimento vindos do código dispensam as buscas no texto
+        codigo = buscar_codigo(texto)
+        if codigo:
+            dados['codigo_barras'] = codigo.codigo_barras
+            dados['linha_digitavel'] = codigo.linha_digitavel
+            dados['valor'] = codigo.valor
+            dados['vencimento'] = codigo.vencimento
         
         # === DETECTA TIPO DE DOCUMENTO ===
         dados['tipo'] = self._detectar_tipo_documento(texto_upper)
@@ -390,114 +1152,39 @@ Você receberá um lembrete antes do vencimento.
             dados = self._extrair_dados_imposto(texto, texto_upper, dados)
             return dados
         
-        # === LINHA DIGITÁVEL (47 ou 48 dígitos) ===
-        # Formato: XXXXX.XXXXX XXXXX.XXXXXX XXXXX.XXXXXX X XXXXXXXXXXXXXXXX
-        linha_pattern = r'(\d{5}\.?\d{5}\s*\d{5}\.?\d{6}\s*\d{5}\.?\d{6}\s*\d\s*\d{14})'
-        linha_match = re.search(linha_pattern, texto)
-        if linha_match:
-            linha = re.sub(r'[^\d]', '', linha_match.group(1))
-            dados['linha_digitavel'] = linha
-        
-        # Formato alternativo (só números separados)
-        if not dados['linha_digitavel']:
-            numeros = re.findall(r'\d{5,}', texto)
-            for num in numeros:
-                if len(num) >= 44 and len(num) <= 48:
-                    dados['linha_digitavel'] = num
-                    break
-        
-        # === CÓDIGO DE BARRAS (44 dígitos) ===
-        codigo_pattern = r'\b(\d{44})\b'
-        codigo_match = re.search(codigo_pattern, texto)
-        if codigo_match:
-            dados['codigo_barras'] = codigo_match.group(1)
-        
         # === VALOR ===
-        # Padrões comuns de valor em boletos
-        valor_patterns = [
-            r'VALOR\s*(?:DO\s*)?(?:DOCUMENTO|COBRAN[ÇC]A|BOLETO)?\s*:?\s*R?\$?\s*([\d.,]+)',
-            r'R\$\s*([\d.,]+)',
-            r'TOTAL\s*:?\s*R?\$?\s*([\d.,]+)',
-            r'VALOR\s*:?\s*R?\$?\s*([\d.,]+)',
-            r'(\d{1,3}(?:\.\d{3})*,\d{2})',  # 1.234,56
-        ]
-        
-        for pattern in valor_patterns:
-            match = re.search(pattern, texto_upper)
-            if match:
-                valor_str = match.group(1)
-                # Limpa e converte
-                valor_str = valor_str.replace('.', '').replace(',', '.')
-                try:
-                    valor = float(valor_str)
-                    if valor > 0 and valor < 1000000:  # Valor razoável
-                        dados['valor'] = valor
-                        break
-                except:
-                    pass
+        if dados['valor'] is None:
+            dados['valor'] = _buscar_valor(texto_upper)
         
         # === DATA DE VENCIMENTO ===
-        venc_patterns = [
-            r'VENCIMENTO\s*:?\s*(\d{2}[/.-]\d{2}[/.-]\d{2,4})',
-            r'VENC\.?\s*:?\s*(\d{2}[/.-]\d{2}[/.-]\d{2,4})',
-            r'DATA\s*VENC\w*\s*:?\s*(\d{2}[/.-]\d{2}[/.-]\d{2,4})',
-            r'(\d{2}/\d{2}/\d{4})',  # Qualquer data
-        ]
-        
-        for pattern in venc_patterns:
-            match = re.search(pattern, texto_upper)
-            if match:
-                data_str = match.group(1)
-                dados['vencimento'] = self._parse_data(data_str)
-                if dados['vencimento']:
-                    break
+        if not dados['vencimento']:
+            dados['vencimento'] = _buscar_vencimento(texto_upper)
         
         # === BENEFICIÁRIO (CREDOR - quem recebe) ===
-        benef_patterns = [
-            r'BENEFICI[ÁA]RIO\s*[:/]?\s*([A-ZÀ-Ú][A-ZÀ-Ú\s.,&-]+?)(?:\n|CNPJ|CPF|AGÊNCIA|AGENCIA|$)',
-            r'CEDENTE\s*[:/]?\s*([A-ZÀ-Ú][A-ZÀ-Ú\s.,&-]+?)(?:\n|CNPJ|CPF|$)',
-            r'FAVORECIDO\s*[:/]?\s*([A-ZÀ-Ú][A-ZÀ-Ú\s.,&-]+?)(?:\n|CNPJ|CPF|$)',
-            r'CREDOR\s*[:/]?\s*([A-ZÀ-Ú][A-ZÀ-Ú\s.,&-]+?)(?:\n|CNPJ|CPF|$)',
-            r'RECEBEDOR\s*[:/]?\s*([A-ZÀ-Ú][A-ZÀ-Ú\s.,&-]+?)(?:\n|CNPJ|CPF|$)',
-        ]
-        
-        for pattern in benef_patterns:
-            match = re.search(pattern, texto_upper)
+        for pattern in BENEFICIARIO_PATTERNS:
+            match = pattern.search(texto_upper)
             if match:
                 benef = match.group(1).strip()
                 # Limpa caracteres estranhos no final
-                benef = re.sub(r'[\s,.-]+$', '', benef)
+                benef = FIM_DE_NOME_PATTERN.sub('', benef)
                 if len(benef) > 3 and len(benef) < 100:
                     dados['beneficiario'] = benef.title()
                     break
         
         # === PAGADOR (SACADO - quem paga) ===
-        pagador_patterns = [
-            r'PAGADOR\s*[:/]?\s*([A-ZÀ-Ú][A-ZÀ-Ú\s.,&-]+?)(?:\n|CNPJ|CPF|END|RUA|AV|$)',
-            r'SACADO\s*[:/]?\s*([A-ZÀ-Ú][A-ZÀ-Ú\s.,&-]+?)(?:\n|CNPJ|CPF|END|RUA|AV|$)',
-            r'DEVEDOR\s*[:/]?\s*([A-ZÀ-Ú][A-ZÀ-Ú\s.,&-]+?)(?:\n|CNPJ|CPF|$)',
-            r'CLIENTE\s*[:/]?\s*([A-ZÀ-Ú][A-ZÀ-Ú\s.,&-]+?)(?:\n|CNPJ|CPF|$)',
-            r'NOME\s*[:/]?\s*([A-ZÀ-Ú][A-ZÀ-Ú\s.,&-]+?)(?:\n|CNPJ|CPF|END|$)',
-        ]
-        
-        for pattern in pagador_patterns:
-            match = re.search(pattern, texto_upper)
+        for pattern in PAGADOR_PATTERNS:
+            match = pattern.search(texto_upper)
             if match:
                 pagador = match.group(1).strip()
                 # Limpa caracteres estranhos no final
-                pagador = re.sub(r'[\s,.-]+$', '', pagador)
+                pagador = FIM_DE_NOME_PATTERN.sub('', pagador)
                 if len(pagador) > 3 and len(pagador) < 100:
                     dados['pagador'] = pagador.title()
                     break
         
         # === DESCRIÇÃO ===
-        desc_patterns = [
-            r'(?:DESCRI[ÇC][ÃA]O|REFER[ÊE]NCIA|HIST[ÓO]RICO)\s*:?\s*(.+?)(?:\n|$)',
-            r'MENSALIDADE\s+(.+?)(?:\n|$)',
-        ]
-        
-        for pattern in desc_patterns:
-            match = re.search(pattern, texto_upper)
+        for pattern in DESCRICAO_PATTERNS:
+            match = pattern.search(texto_upper)
             if match:
                 desc = match.group(1).strip()
                 if len(desc) > 2:
@@ -523,95 +1210,7 @@ Você receberá um lembrete antes do vencimento.
     
     def _detectar_tipo_documento(self, texto_upper: str) -> str:
         """Detecta se é boleto comum ou imposto"""
-        
-        # === FGTS DIGITAL ===
-        if 'FGTS' in texto_upper:
-            if 'DIGITAL' in texto_upper or 'GUIA FGTS' in texto_upper:
-                return 'fgts_digital'
-            return 'fgts'
-        
-        # === DARF - Documento de Arrecadação de Receitas Federais ===
-        if 'DARF' in texto_upper:
-            if 'SIMPLES' in texto_upper:
-                return 'das'
-            return 'darf'
-        
-        # Receita Federal (vários tipos)
-        if 'RECEITA FEDERAL' in texto_upper:
-            if 'SIMPLES' in texto_upper:
-                return 'das'
-            if 'IRPF' in texto_upper or 'PESSOA FÍSICA' in texto_upper or 'PESSOA FISICA' in texto_upper:
-                return 'irpf'
-            if 'IRPJ' in texto_upper or 'PESSOA JURÍDICA' in texto_upper or 'PESSOA JURIDICA' in texto_upper:
-                return 'irpj'
-            return 'darf'
-        
-        # === GPS - Guia da Previdência Social (INSS) ===
-        if 'GPS' in texto_upper or 'PREVIDÊNCIA SOCIAL' in texto_upper or 'PREVIDENCIA SOCIAL' in texto_upper or 'INSS' in texto_upper:
-            return 'gps'
-        
-        # === DAS - Documento de Arrecadação do Simples Nacional ===
-        if 'DAS' in texto_upper and ('SIMPLES' in texto_upper or 'MEI' in texto_upper):
-            return 'das'
-        if 'SIMPLES NACIONAL' in texto_upper:
-            return 'das'
-        if 'MEI' in texto_upper and 'MICROEMPREENDEDOR' in texto_upper:
-            return 'das_mei'
-        
-        # === IPTU - Imposto Predial e Territorial Urbano ===
-        if 'IPTU' in texto_upper or 'IMPOSTO PREDIAL' in texto_upper or 'TERRITORIAL URBANO' in texto_upper:
-            return 'iptu'
-        
-        # === IPVA - Imposto sobre Veículos ===
-        if 'IPVA' in texto_upper or 'IMPOSTO SOBRE VEÍCULO' in texto_upper or 'IMPOSTO SOBRE VEICULO' in texto_upper:
-            return 'ipva'
-        
-        # === ICMS ===
-        if 'ICMS' in texto_upper:
-            if 'DIFAL' in texto_upper:
-                return 'icms_difal'
-            if 'ST' in texto_upper or 'SUBSTITUIÇÃO' in texto_upper:
-                return 'icms_st'
-            return 'icms'
-        
-        # === ISS - Imposto sobre Serviços ===
-        if 'ISS' in texto_upper or 'IMPOSTO SOBRE SERVIÇO' in texto_upper:
-            return 'iss'
-        
-        # === ITR - Imposto Territorial Rural ===
-        if 'ITR' in texto_upper or 'TERRITORIAL RURAL' in texto_upper:
-            return 'itr'
-        
-        # === ITBI - Imposto sobre Transmissão de Bens Imóveis ===
-        if 'ITBI' in texto_upper or 'TRANSMISSÃO DE BENS' in texto_upper:
-            return 'itbi'
-        
-        # === ITCMD - Imposto sobre Transmissão Causa Mortis ===
-        if 'ITCMD' in texto_upper or 'CAUSA MORTIS' in texto_upper or 'DOAÇÃO' in texto_upper:
-            return 'itcmd'
-        
-        # === Taxas específicas ===
-        if 'TAXA DE LICENCIAMENTO' in texto_upper or 'LICENCIAMENTO' in texto_upper:
-            return 'licenciamento'
-        
-        if 'MULTA' in texto_upper and ('TRÂNSITO' in texto_upper or 'TRANSITO' in texto_upper or 'DETRAN' in texto_upper):
-            return 'multa_transito'
-        
-        # === Guias estaduais/municipais genéricas ===
-        if 'GUIA DE RECOLHIMENTO' in texto_upper or 'DARE' in texto_upper or 'GARE' in texto_upper:
-            return 'guia'
-        
-        # === Outros impostos federais ===
-        if 'CONTRIBUIÇÃO' in texto_upper or 'CONTRIBUICAO' in texto_upper:
-            if 'PIS' in texto_upper:
-                return 'pis'
-            if 'COFINS' in texto_upper:
-                return 'cofins'
-            if 'CSLL' in texto_upper:
-                return 'csll'
-            return 'darf'
-        
-        return 'boleto'
+        return _tipo_documento(texto_upper)
     
     def _extrair_dados_imposto(self, texto: str, texto_upper: str, dados: Dict) -> Dict:
         """Extrai dados específicos de guias de impostos"""
@@ -619,121 +1218,68 @@ Você receberá um lembrete antes do vencimento.
         tipo = dados['tipo']
         
         # === PERÍODO DE APURAÇÃO ===
-        periodo_patterns = [
-            r'PER[ÍI]ODO\s*(?:DE\s*)?APURA[ÇC][ÃA]O\s*[:/]?\s*(\d{2}[/.-]\d{4})',
-            r'COMPET[ÊE]NCIA\s*[:/]?\s*(\d{2}[/.-]\d{4})',
-            r'M[ÊE]S[/\s]*ANO\s*[:/]?\s*(\d{2}[/.-]\d{4})',
-            r'REF(?:ER[ÊE]NCIA)?\s*[:/]?\s*(\d{2}[/.-]\d{4})',
-        ]
-        
-        for pattern in periodo_patterns:
-            match = re.search(pattern, texto_upper)
+        for pattern in PERIODO_PATTERNS:
+            match = pattern.search(texto_upper)
             if match:
                 dados['periodo_apuracao'] = match.group(1)
                 break
         
         # === CÓDIGO DA RECEITA ===
-        codigo_patterns = [
-            r'C[ÓO]D(?:IGO)?\s*(?:DA\s*)?RECEITA\s*[:/]?\s*(\d{4,6})',
-            r'RECEITA\s*[:/]?\s*(\d{4,6})',
-            r'C[ÓO]DIGO\s*[:/]?\s*(\d{4,6})',
-        ]
-        
-        for pattern in codigo_patterns:
-            match = re.search(pattern, texto_upper)
+        for pattern in CODIGO_RECEITA_PATTERNS:
+            match = pattern.search(texto_upper)
             if match:
                 dados['codigo_receita'] = match.group(1)
                 break
         
         # === NÚMERO DE REFERÊNCIA ===
-        ref_patterns = [
-            r'N[ÚU]MERO\s*(?:DE\s*)?REFER[ÊE]NCIA\s*[:/]?\s*(\d+)',
-            r'REFER[ÊE]NCIA\s*[:/]?\s*(\d{10,20})',
-        ]
-        
-        for pattern in ref_patterns:
-            match = re.search(pattern, texto_upper)
+        for pattern in REFERENCIA_PATTERNS:
+            match = pattern.search(texto_upper)
             if match:
                 dados['numero_referencia'] = match.group(1)
                 break
         
         # === CPF/CNPJ DO CONTRIBUINTE ===
-        cpf_pattern = r'CPF\s*[:/]?\s*(\d{3}\.?\d{3}\.?\d{3}-?\d{2})'
-        cnpj_pattern = r'CNPJ\s*[:/]?\s*(\d{2}\.?\d{3}\.?\d{3}/?\d{4}-?\d{2})'
-        
-        cnpj_match = re.search(cnpj_pattern, texto_upper)
-        cpf_match = re.search(cpf_pattern, texto_upper)
+        cnpj_match = CNPJ_PATTERN.search(texto_upper)
+        cpf_match = CPF_PATTERN.search(texto_upper)
         
         if cnpj_match:
             dados['cnpj_cpf'] = cnpj_match.group(1)
         elif cpf_match:
             dados['cnpj_cpf'] = cpf_match.group(1)
         
-        # === VALOR ===
-        valor_patterns = [
-            r'VALOR\s*(?:TOTAL|PRINCIPAL|DO\s*DOCUMENTO)?\s*[:/]?\s*R?\$?\s*([\d.,]+)',
-            r'TOTAL\s*A\s*RECOLHER\s*[:/]?\s*R?\$?\s*([\d.,]+)',
-            r'R\$\s*([\d.,]+)',
-            r'(\d{1,3}(?:\.\d{3})*,\d{2})',
-        ]
-        
-        for pattern in valor_patterns:
-            match = re.search(pattern, texto_upper)
-            if match:
-                valor_str = match.group(1).replace('.', '').replace(',', '.')
-                try:
-                    valor = float(valor_str)
-                    if valor > 0 and valor < 10000000:
-                        dados['valor'] = valor
+        # === VALOR (se o código de barras não trouxe) ===
+        if dados['valor'] is None:
+            for pattern in VALOR_IMPOSTO_PATTERNS:
+                match = pattern.search(texto_upper)
+                if match:
+                    valor_str = match.group(1).replace('.', '').replace(',', '.')
+                    try:
+                        valor = float(valor_str)
+                        if valor > 0 and valor < 10000000:
+                            dados['valor'] = valor
+                            break
+                    except:
+                        pass
+        
+        # === DATA DE VENCIMENTO (idem) ===
+        if not dados['vencimento']:
+            for pattern in VENCIMENTO_IMPOSTO_PATTERNS:
+                match = pattern.search(texto_upper)
+                if match:
+                    dados['vencimento'] = self._parse_data(match.group(1))
+                    if dados['vencimento']:
                         break
-                except:
-                    pass
-        
-        # === DATA DE VENCIMENTO ===
-        venc_patterns = [
-            r'VENCIMENTO\s*[:/]?\s*(\d{2}[/.-]\d{2}[/.-]\d{2,4})',
-            r'DATA\s*(?:DE\s*)?VENC\w*\s*[:/]?\s*(\d{2}[/.-]\d{2}[/.-]\d{2,4})',
-            r'PAGAR\s*AT[ÉE]\s*[:/]?\s*(\d{2}[/.-]\d{2}[/.-]\d{2,4})',
-        ]
-        
-        for pattern in venc_patterns:
-            match = re.search(pattern, texto_upper)
-            if match:
-                dados['vencimento'] = self._parse_data(match.group(1))
-                if dados['vencimento']:
-                    break
         
         # === NOME DO CONTRIBUINTE (PAGADOR) ===
-        nome_patterns = [
-            r'CONTRIBUINTE\s*[:/]?\s*([A-ZÀ-Ú][A-ZÀ-Ú\s.,&-]+?)(?:\n|CPF|CNPJ|$)',
-            r'NOME\s*[:/]?\s*([A-ZÀ-Ú][A-ZÀ-Ú\s.,&-]+?)(?:\n|CPF|CNPJ|END|$)',
-            r'RAZ[ÃA]O\s*SOCIAL\s*[:/]?\s*([A-ZÀ-Ú][A-ZÀ-Ú\s.,&-]+?)(?:\n|CNPJ|$)',
-        ]
-        
-        for pattern in nome_patterns:
-            match = re.search(pattern, texto_upper)
+        for pattern in CONTRIBUINTE_PATTERNS:
+            match = pattern.search(texto_upper)
             if match:
                 nome = match.group(1).strip()
-                nome = re.sub(r'[\s,.-]+$', '', nome)
+                nome = FIM_DE_NOME_PATTERN.sub('', nome)
                 if len(nome) > 3 and len(nome) < 100:
                     dados['pagador'] = nome.title()
                     break
         
-        # === CÓDIGO DE BARRAS / LINHA DIGITÁVEL ===
-        # Guias de impostos usam formato diferente (44 ou 48 dígitos)
-        linha_patterns = [
-            r'(\d{11,12}[\s.-]?\d{11,12}[\s.-]?\d{11,12}[\s.-]?\d{11,12})',  # Formato convênio
-            r'(\d{44,48})',  # Sequência contínua
-        ]
-        
-        for pattern in linha_patterns:
-            match = re.search(pattern, texto)
-            if match:
-                linha = re.sub(r'[^\d]', '', match.group(1))
-                if len(linha) >= 44:
-                    dados['linha_digitavel'] = linha
-                    break
-        
         # === DESCRIÇÃO BASEADA NO TIPO ===
         descricoes = {
             'darf': 'DARF - Imposto Federal',
@@ -818,10 +1364,11 @@ Você receberá um lembrete antes do vencimento.
         
         return dados
     
-    def _parse_data(self, data_str: str) -> Optional[str]:
+    @staticmethod
+    def _parse_data(data_str: str) -> Optional[str]:
         """Converte string de data para ISO format"""
         # Remove caracteres extras
-        data_str = re.sub(r'[^\d/.-]', '', data_str)
+        data_str = FORA_DE_DATA_PATTERN.sub('', data_str)
         
         formatos = ['%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y', '%d/%m/%y', '%d-%m-%y']
         
@@ -875,9 +1422,9 @@ Você receberá um lembrete antes do vencimento.
     
     def _listar_boletos(self, user_id: str) -> str:
         """Lista boletos pendentes do usuário"""
-        boletos_user = [b for b in self.boletos if b['user_id'] == user_id and not b['pago']]
+        indice = self._pendentes.get(user_id)
         
-        if not boletos_user:
+        if not indice:
             return """
 📄 *Seus Boletos*
 
@@ -886,26 +1433,20 @@ Nenhum boleto pendente! 🎉
 Envie um PDF de boleto para processá-lo.
 """
         
-        # Ordena por vencimento
-        boletos_user.sort(key=lambda x: x.get('vencimento') or '9999-99-99')
+        # O índice já está por vencimento: os vencidos (até hoje) vêm primeiro
+        amanha = (date.today() + timedelta(days=1)).isoformat()
+        vencidos = bisect_left(indice, (amanha,))
         
         linhas = ["📄 *Boletos Pendentes*\n"]
         total = 0
         
-        for b in boletos_user:
+        for i, (_, boleto_id) in enumerate(indice):
+            b = self._por_id[(user_id, boleto_id)]
             venc = self._formatar_data(b.get('vencimento'))
             valor = b.get('valor', 0)
             total += valor
             
-            # Verifica se está vencido
-            vencido = ""
-            if b.get('vencimento'):
-                try:
-                    data_venc = datetime.strptime(b['vencimento'], '%Y-%m-%d')
-                    if data_venc < datetime.now():
-                        vencido = "⚠️ VENCIDO "
-                except:
-                    pass
+            vencido = "⚠️ VENCIDO " if i < vencidos else ""
             
             linhas.append(f"""
 {vencido}📋 *ID:* `{b['id']}`
@@ -927,13 +1468,16 @@ Para marcar pago: /pago [id]
     
     def _marcar_pago(self, user_id: str, boleto_id: str) -> str:
         """Marca boleto como pago"""
-        for boleto in self.boletos:
-            if boleto['id'] == boleto_id and boleto['user_id'] == user_id:
-                boleto['pago'] = True
-                boleto['pago_em'] = datetime.now().isoformat()
-                self._save_data()
-                
-                return f"""
+        boleto = self._por_id.get((user_id, boleto_id))
+        if boleto:
+            if not boleto.get('pago'):
+                indice = self._pendentes[user_id]
+                del indice[bisect_left(indice, self._chave_vencimento(boleto))]
+            boleto['pago'] = True
+            boleto['pago_em'] = datetime.now().isoformat()
+            self._save_data()
+            
+            return f"""
 ✅ *Boleto Marcado como Pago!*
 
 📋 ID: `{boleto_id}`
@@ -944,8 +1488,8 @@ Para marcar pago: /pago [id]
         
         return f"❌ Boleto `{boleto_id}` não encontrado."
     
-    async def _processar_imagem(self, arquivo: str, user_id: str) -> str:
-        """Processa imagem de boleto com OCR"""
+    async def _processar_imagem(self, arquivo: Union[str, Anexo], user_id: str) -> str:
+        """Processa foto de boleto com OCR (num processo do pool)"""
         if not OCR_AVAILABLE:
             return """
 ❌ OCR não disponível.
@@ -958,20 +1502,28 @@ pip install pytesseract pillow
 E instale o Tesseract OCR no sistema.
 """
         
+        fonte, hash_arquivo = await self._fonte(arquivo)
+        return await self._ler_uma_vez(
+            user_id, hash_arquivo,
+            lambda: self._ler_imagem(fonte, hash_arquivo, nome_do_anexo(arquivo), user_id)
+        )
+    
+    async def _ler_imagem(self, fonte: Union[bytes, str], hash_arquivo: str,
+                          nome_arquivo: str, user_id: str) -> str:
         try:
-            img = Image.open(arquivo)
-            texto = pytesseract.image_to_string(img, lang='por')
-            
-            if not texto.strip():
-                return "❌ Não consegui ler a imagem. Tente uma foto mais nítida."
-            
-            # Usa a mesma lógica de extração
-            dados = self._extrair_dados_boleto(texto)
-            
-            # Mesmo fluxo do PDF...
-            # (código similar ao _processar_pdf)
-            
-            return f"🔍 Texto extraído da imagem (em desenvolvimento):\n\n{texto[:500]}"
-            
+            texto = await self._texto_da_imagem(fonte, hash_arquivo)
+        except asyncio.TimeoutError:
+            return f"❌ A foto demorou demais para ser lida (mais de {self.ocr_timeout:.0f}s). Tente uma foto menor."
+        except (MemoryError, BrokenProcessPool):
+            logger.warning(f"Foto de {user_id} passou do limite de memória")
+            return "❌ Foto muito pesada para processar. Tente uma resolução menor."
         except Exception as e:
+            logger.warning(f"Erro no OCR da foto de {user_id}: {e}")
             return f"❌ Erro ao processar imagem: {e}"
+        
+        if not texto.strip():
+            return "❌ Não consegui ler a imagem. Tente uma foto mais nítida."
+        
+        return await self._registrar_texto(
+            texto, nome_arquivo, user_id, hash_arquivo, origem="Foto lida"
+        )
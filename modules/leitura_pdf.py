@@ -0,0 +1,419 @@
+"""
+📄 Leitura de PDFs
+Sonda o PDF e escolhe o extrator mais barato que deve dar conta (roda num processo do pool)
+
+A sonda (páginas, produtor, formato da página e se há camada de texto)
+custa poucos milissegundos. PDF com texto vai para os extratores em ordem
+de custo - pdfium, PyPDF2, pdfplumber -, passando ao seguinte só se o texto
+não trouxer nenhum campo essencial. PDF só de imagem (escaneado) volta com
+a rota 'ocr': as páginas são rasterizadas e lidas como fotos em ocr_pdf.
+
+Cada leitura gera um registro com a rota e os tempos; EstatisticasPdf
+guarda os registros e, com amostras suficientes de um produtor, reordena
+os extratores para ele.
+"""
+import io
+import os
+import re
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from modules.ocr import MAX_LADO, OCR_AVAILABLE, ler_boleto
+
+try:
+    import pypdfium2 as pdfium
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    PDFIUM_AVAILABLE = False
+
+try:
+    import pdfplumber
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+
+try:
+    from PyPDF2 import PdfReader
+    PYPDF2_AVAILABLE = True
+except ImportError:
+    PYPDF2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('pdfium', 'pypdf2', 'pdfplumber')  # Do mais barato ao mais caro
+PAGINAS_SONDADAS = 2     # Páginas em que a sonda conta caracteres
+POUCO_TEXTO = 100        # Caracteres por página abaixo dos quais o PDF é tratado como escaneado
+PAGINAS_OCR = 3          # Páginas rasterizadas no máximo
+
+# Campos essenciais encontrados num texto (o módulo de faturas passa o seu)
+Campos = Callable[[str], set]
+
+
+def _ms(inicio: float) -> float:
+    return round((time.perf_counter() - inicio) * 1000, 1)
+
+
+def _arquivo(fonte: Union[bytes, str]):
+    return io.BytesIO(fonte) if isinstance(fonte, bytes) else fonte
+
+
+def _formato(largura: float, altura: float) -> str:
+    """Tamanho da página em mm (pontos PDF: 1/72 de polegada)"""
+    return f"{round(largura * 25.4 / 72)}x{round(altura * 25.4 / 72)}mm"
+
+
+def familia_do_produtor(produtor: str) -> str:
+    """'Microsoft® Word 2016' e 'Microsoft® Word 2019' caem na mesma família"""
+    palavras = re.sub(r'[^a-zà-ú]+', ' ', produtor.lower()).split()
+    return " ".join(palavras[:3]) or 'desconhecido'
+
+
+# ==================== SONDA ====================
+
+def _sondar_pdfium(fonte: Union[bytes, str], sonda: dict):
+    pdf = pdfium.PdfDocument(fonte)
+    try:
+        sonda['paginas'] = len(pdf)
+        sonda['produtor'] = (pdf.get_metadata_dict().get('Producer') or '').strip()
+        caracteres = 0
+        for i in range(min(len(pdf), PAGINAS_SONDADAS)):
+            pagina = pdf[i]
+            textpage = pagina.get_textpage()
+            if i == 0:
+                sonda['formato'] = _formato(*pagina.get_size())
+            caracteres += textpage.count_chars()
+            textpage.close()
+            pagina.close()
+        sonda['caracteres'] = caracteres
+    finally:
+        pdf.close()
+
+
+def _sondar_pypdf2(fonte: Union[bytes, str], sonda: dict):
+    reader = PdfReader(_arquivo(fonte))
+    sonda['paginas'] = len(reader.pages)
+    sonda['produtor'] = str((reader.metadata or {}).get('/Producer') or '').strip()
+    if reader.pages:
+        caixa = reader.pages[0].mediabox
+        sonda['formato'] = _formato(float(caixa.width), float(caixa.height))
+    # Sem pdfium não há contagem barata: extrai o texto das primeiras páginas
+    sonda['caracteres'] = sum(
+        len((pagina.extract_text() or "").strip()) for pagina in reader.pages[:PAGINAS_SONDADAS]
+    )
+
+
+def sondar(fonte: Union[bytes, str]) -> dict:
+    """
+    Páginas, produtor, formato da 1ª página e caracteres de texto nas
+    primeiras páginas (None se não deu para contar)
+    """
+    inicio = time.perf_counter()
+    sonda = {'paginas': 0, 'produtor': '', 'formato': '', 'caracteres': None}
+    try:
+        if PDFIUM_AVAILABLE:
+            _sondar_pdfium(fonte, sonda)
+        elif PYPDF2_AVAILABLE:
+            _sondar_pypdf2(fonte, sonda)
+    except MemoryError:
+        raise
+    except Exception as e:
+        logger.warning(f"Erro na sonda do PDF: {e}")
+        sonda['erro'] = str(e)[:200]
+    sonda['ms'] = _ms(inicio)
+    return sonda
+
+
+# ==================== EXTRATORES ====================
+
+def _paginas_pdfium(fonte: Union[bytes, str]) -> Iterator[str]:
+    pdf = pdfium.PdfDocument(fonte)
+    try:
+        for i in range(len(pdf)):
+            pagina = pdf[i]
+            textpage = pagina.get_textpage()
+            try:
+                yield textpage.get_text_range().replace('\r\n', '\n')
+            finally:
+                textpage.close()
+                pagina.close()
+    finally:
+        pdf.close()
+
+
+def _paginas_pypdf2(fonte: Union[bytes, str]) -> Iterator[str]:
+    for pagina in PdfReader(_arquivo(fonte)).pages:
+        yield pagina.extract_text() or ""
+
+
+def _paginas_pdfplumber(fonte: Union[bytes, str]) -> Iterator[str]:
+    with pdfplumber.open(_arquivo(fonte)) as pdf:
+        for pagina in pdf.pages:
+            yield pagina.extract_text() or ""
+
+
+# backend -> (disponível, texto página a página)
+EXTRATORES = {
+    'pdfium': (PDFIUM_AVAILABLE, _paginas_pdfium),
+    'pypdf2': (PYPDF2_AVAILABLE, _paginas_pypdf2),
+    'pdfplumber': (PDF_AVAILABLE, _paginas_pdfplumber),
+}
+
+
+def _ler_paginas(paginas: Iterator[str], campos: Campos, max_paginas: int = 0) -> Tuple[str, set, int]:
+    """
+    (texto, campos, páginas lidas), parando assim que os campos essenciais aparecem
+
+    A linha digitável, o valor e o vencimento quase sempre estão na primeira
+    página: extratos e faturas de dezenas de páginas não são lidos inteiros.
+    Cada página é examinada uma vez só; o que já foi achado fica acumulado.
+    """
+    textos = []
+    encontrados = set()
+    for i, texto in enumerate(paginas):
+        if max_paginas and i >= max_paginas:
+            break
+        textos.append(texto)
+        encontrados |= campos(texto)
+        if len(encontrados) == 3:
+            break
+    return "\n".join(textos), encontrados, len(textos)
+
+
+def ordem_dos_extratores(familia: str, preferencias: Optional[Dict[str, List[str]]] = None) -> List[str]:
+    return list((preferencias or {}).get(familia, BACKENDS))
+
+
+def _rota(sonda: dict, texto: str, campos: int, paginas_lidas: int) -> str:
+    """
+    'texto'; 'ocr' ou 'sem_texto' para PDF que parece só imagem; 'ilegivel'
+
+    O texto é comparado com as páginas de onde saiu (`paginas_lidas`), não
+    com o total do PDF: a leitura pode ter parado antes (max_paginas).
+    """
+    if campos > 0:
+        return 'texto'
+    if campos < 0 and sonda['caracteres'] != 0:
+        return 'ilegivel'  # Nenhum extrator abriu o arquivo
+    escaneado = sonda['caracteres'] == 0 or len(texto.strip()) < POUCO_TEXTO * max(1, paginas_lidas)
+    if not escaneado:
+        return 'texto'
+    return 'ocr' if OCR_AVAILABLE and PDFIUM_AVAILABLE else 'sem_texto'
+
+
+def ler_pdf(fonte: Union[bytes, str], campos: Campos, max_paginas: int = 0,
+            preferencias: Optional[Dict[str, List[str]]] = None) -> Tuple[str, dict]:
+    """
+    (texto, registro) de um PDF
+
+    `preferencias` (família do produtor -> ordem dos extratores) vem de
+    EstatisticasPdf. O registro traz a sonda, a rota, o extrator escolhido
+    e uma tentativa por extrator usado, com o tempo e quantos campos o
+    texto trouxe. Na rota 'ocr' o texto volta vazio (ou com o pouco que os
+    extratores acharam): quem chamou decide rodar ocr_pdf.
+    """
+    inicio = time.perf_counter()
+    sonda = sondar(fonte)
+    registro = {'sonda': sonda, 'familia': familia_do_produtor(sonda['produtor']), 'tentativas': []}
+    melhor, melhores_campos, melhores_paginas = "", -1, 0
+
+    # Sem nenhum caractere na sonda, os extratores de texto não têm o que ler
+    if sonda['caracteres'] != 0:
+        for backend in ordem_dos_extratores(registro['familia'], preferencias):
+            disponivel, extrator = EXTRATORES[backend]
+            if not disponivel:
+                continue
+            comeco = time.perf_counter()
+            try:
+                paginas = extrator(fonte)
+                try:
+                    texto, encontrados, lidas = _ler_paginas(paginas, campos, max_paginas)
+                finally:
+                    paginas.close()
+            except MemoryError:
+                raise
+            except Exception as e:
+                logger.warning(f"Erro {backend}: {e}")
+                registro['tentativas'].append({'backend': backend, 'ms': _ms(comeco), 'erro': str(e)[:200]})
+                continue
+            registro['tentativas'].append({
+                'backend': backend, 'ms': _ms(comeco),
+                'campos': len(encontrados), 'caracteres': len(texto), 'paginas': lidas,
+            })
+            if len(encontrados) > melhores_campos:
+                melhor, melhores_campos, melhores_paginas = texto, len(encontrados), lidas
+                registro['backend'] = backend
+            if encontrados:
+                break
+
+    registro['rota'] = _rota(sonda, melhor, melhores_campos, melhores_paginas)
+    registro['ms'] = _ms(inicio)
+    return melhor, registro
+
+
+def ocr_pdf(fonte: Union[bytes, str], campos: Campos, max_paginas: int = PAGINAS_OCR) -> Tuple[str, dict]:
+    """
+    (texto, tentativa) de um PDF escaneado
+
+    Cada página é rasterizada já no tamanho que o OCR usa e lida como uma
+    foto (ocr.ler_boleto); para na página que completa os três campos.
+    """
+    inicio = time.perf_counter()
+    textos = []
+    encontrados = set()
+    pdf = pdfium.PdfDocument(fonte)
+    try:
+        for i in range(min(len(pdf), max_paginas)):
+            pagina = pdf[i]
+            try:
+                escala = MAX_LADO / max(pagina.get_size())
+                imagem = pagina.render(scale=escala, grayscale=True).to_pil()
+            finally:
+                pagina.close()
+            texto = ler_boleto(imagem)
+            textos.append(texto)
+            encontrados |= campos(texto)
+            if len(encontrados) == 3:
+                break
+    finally:
+        pdf.close()
+    texto = "\n".join(textos)
+    return texto, {
+        'backend': 'ocr', 'ms': _ms(inicio), 'paginas': len(textos),
+        'campos': len(encontrados), 'caracteres': len(texto),
+    }
+
+
+# ==================== ESTATÍSTICAS ====================
+
+class EstatisticasPdf:
+    """
+    Rotas e tempos das leituras de PDF (processo principal)
+
+    Cada registro vai para um JSONL (rotacionado ao passar de max_log_bytes)
+    e entra num resumo por família de produtor e extrator: leituras, quantas
+    trouxeram algum campo, erros e tempo total. Com min_amostras leituras,
+    os extratores da família passam a ser tentados na ordem do resumo
+    (mais acertos primeiro, depois o mais rápido).
+
+    registrar() roda no loop de eventos: o resumo em memória muda na hora,
+    mas os arquivos são gravados numa thread própria, que junta os registros
+    acumulados numa escrita só e grava apenas o resumo mais recente.
+    fechar() espera a gravação pendente.
+    """
+
+    def __init__(self, diretorio: str, max_log_bytes: int = 5 * 1024 * 1024, min_amostras: int = 5):
+        self.arquivo_log = os.path.join(diretorio, 'leituras_pdf.jsonl')
+        self.arquivo_resumo = os.path.join(diretorio, 'leituras_pdf_resumo.json')
+        self.max_log_bytes = max_log_bytes
+        self.min_amostras = min_amostras
+        os.makedirs(diretorio, exist_ok=True)
+        self.resumo: Dict[str, Dict[str, Dict[str, float]]] = self._carregar()
+        self._preferencias = self._calcular_preferencias()
+
+        # Gravação fora do loop: linhas do JSONL e último resumo à espera
+        self._gravador = ThreadPoolExecutor(max_workers=1, thread_name_prefix='estatisticas-pdf')
+        self._trava = threading.Lock()
+        self._linhas: List[str] = []
+        self._resumo_pendente: Optional[str] = None
+
+    def _carregar(self) -> dict:
+        if os.path.exists(self.arquivo_resumo):
+            try:
+                with open(self.arquivo_resumo, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Resumo das leituras de PDF ilegível, recomeçando: {e}")
+        return {}
+
+    def _salvar(self, resumo: str):
+        with open(self.arquivo_resumo, 'w', encoding='utf-8') as f:
+            f.write(resumo)
+
+    def _anotar(self, linhas: List[str]):
+        if os.path.exists(self.arquivo_log) and os.path.getsize(self.arquivo_log) > self.max_log_bytes:
+            os.replace(self.arquivo_log, self.arquivo_log + '.1')
+        with open(self.arquivo_log, 'a', encoding='utf-8') as f:
+            f.write("".join(linhas))
+
+    def _gravar(self):
+        """Grava o que se acumulou desde a última vez (na thread de gravação)"""
+        with self._trava:
+            linhas, self._linhas = self._linhas, []
+            resumo, self._resumo_pendente = self._resumo_pendente, None
+        try:
+            self._anotar(linhas)
+            self._salvar(resumo)
+        except OSError as e:
+            logger.warning(f"Não consegui gravar as estatísticas de PDF: {e}")
+
+    def registrar(self, registro: dict):
+        """Guarda o registro de uma leitura (de ler_pdf, com 'ocr' se houve OCR)"""
+        registro = dict(registro, quando=datetime.now().isoformat(timespec='seconds'))
+        tentativas = list(registro.get('tentativas', []))
+        if 'ocr' in registro:
+            tentativas.append(registro['ocr'])
+
+        for tentativa in tentativas:
+            por_backend = self.resumo.setdefault(registro['familia'], {})
+            soma = por_backend.setdefault(
+                tentativa['backend'], {'leituras': 0, 'com_campos': 0, 'erros': 0, 'ms': 0.0}
+            )
+            soma['leituras'] += 1
+            soma['ms'] = round(soma['ms'] + tentativa['ms'], 1)
+            if 'erro' in tentativa:
+                soma['erros'] += 1
+            elif tentativa.get('campos'):
+                soma['com_campos'] += 1
+
+        # Serializados aqui: a thread de gravação não toca no resumo vivo
+        with self._trava:
+            agendar = not self._linhas
+            self._linhas.append(json.dumps(registro, ensure_ascii=False) + "\n")
+            self._resumo_pendente = json.dumps(self.resumo, ensure_ascii=False, indent=2)
+        if agendar:
+            self._gravador.submit(self._gravar)
+        self._preferencias = self._calcular_preferencias()
+
+    def fechar(self):
+        """Espera as gravações pendentes"""
+        self._gravador.shutdown(wait=True)
+
+    def _calcular_preferencias(self) -> Dict[str, List[str]]:
+        preferencias = {}
+        for familia, por_backend in self.resumo.items():
+            medidos = [b for b in BACKENDS
+                       if por_backend.get(b, {}).get('leituras', 0) >= self.min_amostras]
+            if not medidos:
+                continue
+
+            def custo(backend):
+                soma = por_backend[backend]
+                return (-soma['com_campos'] / soma['leituras'], soma['ms'] / soma['leituras'])
+
+            ordem = sorted(medidos, key=custo) + [b for b in BACKENDS if b not in medidos]
+            if ordem != list(BACKENDS):
+                preferencias[familia] = ordem
+        return preferencias
+
+    def preferencias(self) -> Dict[str, List[str]]:
+        """Família do produtor -> ordem dos extratores (só as que fogem do padrão)"""
+        return self._preferencias
+
+    def retrato(self) -> Dict[str, Dict[str, dict]]:
+        """Por família e extrator: leituras, taxa de acerto e tempo médio"""
+        return {
+            familia: {
+                backend: {
+                    'leituras': soma['leituras'],
+                    'acerto': round(soma['com_campos'] / soma['leituras'], 2),
+                    'ms_medio': round(soma['ms'] / soma['leituras'], 1),
+                }
+                for backend, soma in por_backend.items() if soma['leituras']
+            }
+            for familia, por_backend in self.resumo.items()
+        }
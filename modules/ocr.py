@@ -0,0 +1,196 @@
+"""
+🔍 OCR de Boletos
+Pré-processamento de fotos e leitura com Tesseract (roda num processo do pool)
+
+A foto é reduzida (já na decodificação do JPEG), endireitada e binarizada
+contra o fundo local (sombras e iluminação desigual não viram texto) antes
+do OCR. Se o texto da página inteira não trouxer um código de barras
+válido, as linhas com muitos dígitos (a linha digitável) e as do valor são
+recortadas da imagem em resolução maior e lidas de novo, uma por vez.
+"""
+import io
+import re
+from typing import List, Tuple, Union
+
+from modules.codigo_barras import buscar_codigo
+
+try:
+    from PIL import Image, ImageChops, ImageFilter, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+try:
+    import pytesseract
+    OCR_AVAILABLE = PIL_AVAILABLE
+except ImportError:
+    OCR_AVAILABLE = False
+
+MAX_LADO = 2000                # Maior lado (px) da imagem lida pelo Tesseract
+LADO_INCLINACAO = 500          # Miniatura usada para medir a inclinação
+ANGULOS = range(-5, 6)         # Busca grossa da inclinação (graus); depois refina
+MARGEM_RECORTE = 0.6           # Folga (em alturas de linha) em volta do recorte
+
+CONFIG_PAGINA = '--psm 6'
+CONFIG_LINHA_DIGITOS = '--psm 7 -c tessedit_char_whitelist=0123456789.- '
+CONFIG_LINHA = '--psm 7'
+
+
+def _abrir(fonte: Union[bytes, str, 'Image.Image'], max_lado: int = MAX_LADO) -> 'Image.Image':
+    """Imagem em pé (EXIF); JPEGs grandes já são decodificados em escala menor"""
+    if isinstance(fonte, Image.Image):
+        return fonte  # Página de PDF já rasterizada
+    img = Image.open(io.BytesIO(fonte) if isinstance(fonte, bytes) else fonte)
+    escala = max_lado / max(img.size)
+    if escala < 1:
+        img.draft('L', (round(img.width * escala), round(img.height * escala)))
+    return ImageOps.exif_transpose(img)
+
+
+def reduzir(img: 'Image.Image', max_lado: int = MAX_LADO) -> 'Image.Image':
+    """Tons de cinza, com o maior lado em até max_lado"""
+    img = img.convert('L')
+    escala = max_lado / max(img.size)
+    if escala < 1:
+        img = img.resize((round(img.width * escala), round(img.height * escala)), Image.BILINEAR)
+    return img
+
+
+def _limiar_otsu(img: 'Image.Image') -> int:
+    """Limiar que melhor separa as duas classes do histograma (método de Otsu)"""
+    histograma = img.histogram()
+    total = sum(histograma)
+    soma_total = sum(i * n for i, n in enumerate(histograma))
+    soma_fundo = peso_fundo = 0
+    melhor, limiar = -1.0, 127
+    for i, n in enumerate(histograma):
+        peso_fundo += n
+        if not peso_fundo:
+            continue
+        peso_frente = total - peso_fundo
+        if not peso_frente:
+            break
+        soma_fundo += i * n
+        media_fundo = soma_fundo / peso_fundo
+        media_frente = (soma_total - soma_fundo) / peso_frente
+        variancia = peso_fundo * peso_frente * (media_fundo - media_frente) ** 2
+        if variancia > melhor:
+            melhor, limiar = variancia, i
+    return limiar
+
+
+def tracos(img: 'Image.Image', raio: int = 0) -> 'Image.Image':
+    """
+    Traços do texto em branco sobre preto
+
+    Cada pixel é comparado com a média da vizinhança (raio ~ uma linha de
+    texto): o que é mais escuro que o fundo local é traço, não importa se a
+    foto tem sombra ou um lado mais claro. O corte sai de Otsu.
+    """
+    raio = raio or max(8, min(img.size) // 40)
+    diferenca = ImageChops.subtract(img.filter(ImageFilter.BoxBlur(raio)), img)
+    limiar = _limiar_otsu(diferenca)
+    return diferenca.point(lambda p: 255 if p > limiar else 0)
+
+
+def binarizar(img: 'Image.Image', raio: int = 0) -> 'Image.Image':
+    """Texto preto sobre branco, como o Tesseract prefere"""
+    return ImageOps.invert(tracos(img, raio))
+
+
+def _contraste_das_linhas(img_tracos: 'Image.Image', angulo: float) -> float:
+    """Variância do perfil de linhas com a imagem girada (média de cada linha num resize para 1 px)"""
+    girada = img_tracos.rotate(angulo, resample=Image.BILINEAR)
+    perfil = girada.resize((1, girada.height), Image.BOX).tobytes()
+    media = sum(perfil) / len(perfil)
+    return sum((v - media) ** 2 for v in perfil)
+
+
+def medir_inclinacao(img: 'Image.Image') -> float:
+    """
+    Ângulo (graus) que deixa as linhas de texto na horizontal
+
+    Numa miniatura só com os traços, fica o ângulo de perfil de linhas mais
+    contrastado: com o texto alinhado, as linhas concentram os traços e os
+    vãos entre elas ficam vazios. Busca de grau em grau e depois de quarto
+    em quarto em volta do melhor.
+    """
+    miniatura = img.copy()
+    miniatura.thumbnail((LADO_INCLINACAO, LADO_INCLINACAO))
+    miniatura = tracos(miniatura)
+    angulo = max(ANGULOS, key=lambda a: _contraste_das_linhas(miniatura, a))
+    finos = [angulo + d / 4 for d in (-3, -2, -1, 0, 1, 2, 3)]
+    return max(finos, key=lambda a: _contraste_das_linhas(miniatura, a))
+
+
+def preparar(fonte: Union[bytes, str, 'Image.Image'], max_lado: int = MAX_LADO) -> Tuple['Image.Image', 'Image.Image']:
+    """
+    (imagem para OCR, imagem em tons de cinza endireitada)
+
+    A segunda, sem binarizar, é de onde saem os recortes.
+    """
+    cinza = reduzir(_abrir(fonte, max_lado), max_lado)
+    angulo = medir_inclinacao(cinza)
+    if angulo:
+        cinza = cinza.rotate(angulo, resample=Image.BILINEAR, expand=True, fillcolor=255)
+    return binarizar(cinza), cinza
+
+
+def _linhas(dados: dict) -> List[Tuple[str, Tuple[int, int, int, int]]]:
+    """Texto e caixa (x0, y0, x1, y1) de cada linha do image_to_data"""
+    linhas = {}
+    for i, palavra in enumerate(dados['text']):
+        if not palavra.strip():
+            continue
+        chave = (dados['block_num'][i], dados['par_num'][i], dados['line_num'][i])
+        x, y, w, h = dados['left'][i], dados['top'][i], dados['width'][i], dados['height'][i]
+        texto, caixa = linhas.get(chave, ('', (x, y, x + w, y + h)))
+        caixa = (min(caixa[0], x), min(caixa[1], y), max(caixa[2], x + w), max(caixa[3], y + h))
+        linhas[chave] = ((texto + ' ' + palavra).strip(), caixa)
+    return list(linhas.values())
+
+
+def _recortar(img: 'Image.Image', caixa: Tuple[int, int, int, int]) -> 'Image.Image':
+    """Faixa da linha (largura toda), com folga, ampliada para ~48 px de altura"""
+    x0, y0, x1, y1 = caixa
+    folga = int((y1 - y0) * MARGEM_RECORTE)
+    faixa = img.crop((0, max(0, y0 - folga), img.width, min(img.height, y1 + folga)))
+    escala = max(1.0, 48 / max(1, y1 - y0))
+    if escala > 1:
+        faixa = faixa.resize((round(faixa.width * escala), round(faixa.height * escala)), Image.BICUBIC)
+    return binarizar(faixa, raio=max(8, faixa.height // 2))
+
+
+def ler_boleto(fonte: Union[bytes, str, 'Image.Image'], max_lado: int = MAX_LADO) -> str:
+    """
+    Texto de uma foto de boleto ou página de PDF rasterizada (roda num processo do pool)
+
+    Página inteira primeiro; sem código válido, relê em recortes as linhas
+    com 20+ dígitos e as que falam de valor, e junta o que sair ao texto.
+    """
+    try:
+        return _ler_boleto(fonte, max_lado)
+    except (pytesseract.TesseractNotFoundError, pytesseract.TesseractError) as e:
+        # As exceções do pytesseract não se recriam no pickle de volta ao
+        # processo principal (o pool quebraria): vão como RuntimeError
+        raise RuntimeError(f"Tesseract: {e}") from None
+
+
+def _ler_boleto(fonte: Union[bytes, str, 'Image.Image'], max_lado: int) -> str:
+    pronta, cinza = preparar(fonte, max_lado)
+    dados = pytesseract.image_to_data(
+        pronta, lang='por', config=CONFIG_PAGINA, output_type=pytesseract.Output.DICT
+    )
+    linhas = _linhas(dados)
+    texto = "\n".join(t for t, _ in linhas)
+    if buscar_codigo(texto):
+        return texto
+
+    # As caixas são da imagem pronta, que tem o mesmo tamanho da cinza
+    extras = []
+    for linha, caixa in linhas:
+        if len(re.sub(r'\D', '', linha)) >= 20:
+            extras.append(pytesseract.image_to_string(_recortar(cinza, caixa), config=CONFIG_LINHA_DIGITOS))
+        elif 'VALOR' in linha.upper() or 'VENC' in linha.upper():
+            extras.append(pytesseract.image_to_string(_recortar(cinza, caixa), lang='por', config=CONFIG_LINHA))
+    return "\n".join([texto] + [e.strip() for e in extras if e.strip()])
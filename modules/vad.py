@@ -0,0 +1,206 @@
+"""
+🔇 Detecção de Atividade de Voz
+Divide áudio PCM (16 bits, mono) em trechos cortados nos silêncios
+"""
+from array import array
+from typing import List, Optional, Tuple
+
+QUADRO_MS = 30           # Duração de cada quadro de análise
+PASSO_AMOSTRA = 4        # Amostras puladas no cálculo de energia (basta para VAD)
+LIMIAR_MINIMO = 150.0    # RMS abaixo disso é sempre silêncio
+FATOR_RUIDO = 3.0        # Voz = energia acima de FATOR_RUIDO x piso de ruído
+
+
+def energias(pcm: bytes, taxa: int = 16000) -> List[float]:
+    """Energia (RMS aproximado) de cada quadro de QUADRO_MS"""
+    amostras = array('h')
+    amostras.frombytes(pcm[:len(pcm) - len(pcm) % 2])
+    tamanho = taxa * QUADRO_MS // 1000
+
+    resultado = []
+    for inicio in range(0, len(amostras), tamanho):
+        quadro = amostras[inicio:inicio + tamanho:PASSO_AMOSTRA]
+        if quadro:
+            resultado.append((sum(a * a for a in quadro) / len(quadro)) ** 0.5)
+    return resultado
+
+
+def piso_de_ruido(energia: List[float]) -> float:
+    """Estimativa do ruído de fundo: percentil 10 das energias dos quadros"""
+    if not energia:
+        return 0.0
+    ordenadas = sorted(energia)
+    return ordenadas[len(ordenadas) // 10]
+
+
+def limiar_de_voz(energia: List[float], piso: Optional[float] = None) -> float:
+    """
+    Energia a partir da qual um quadro conta como voz
+
+    `piso` é o ruído conhecido (perfil calibrado); sem ele, é estimado do
+    próprio áudio. Limitado a metade da mediana: em ambiente muito ruidoso,
+    ou em áudio quase sem pausas (onde o "piso" estimado já é voz), o
+    limiar não pode subir até engolir as sílabas mais fracas.
+    """
+    if not energia:
+        return LIMIAR_MINIMO
+    ordenadas = sorted(energia)
+    if piso is None:
+        piso = ordenadas[len(ordenadas) // 10]
+    mediana = ordenadas[len(ordenadas) // 2]
+    return max(LIMIAR_MINIMO, min(piso * FATOR_RUIDO, mediana * 0.5))
+
+
+def piso_confiavel(energia: List[float]) -> Optional[float]:
+    """
+    Piso de ruído medido, só se o áudio tiver pausas de verdade
+
+    Em áudio falado sem pausas o percentil 10 ainda é voz: nesse caso
+    retorna None (a medida não serve para calibrar).
+    """
+    if not energia:
+        return None
+    piso = piso_de_ruido(energia)
+    mediana = sorted(energia)[len(energia) // 2]
+    return piso if piso * FATOR_RUIDO < mediana else None
+
+
+def _cortes(voz: List[bool], min_silencio: int, deslocamento: int = 0) -> List[int]:
+    """Meio de cada silêncio de pelo menos min_silencio quadros já encerrado por voz"""
+    cortes = []
+    inicio_silencio = None
+    for i, falando in enumerate(voz):
+        if not falando and inicio_silencio is None:
+            inicio_silencio = i
+        elif falando and inicio_silencio is not None:
+            if i - inicio_silencio >= min_silencio:
+                cortes.append(deslocamento + (inicio_silencio + i) // 2)
+            inicio_silencio = None
+    return cortes
+
+
+def _quadro_mais_baixo(energia: List[float], inicio: int, max_quadros: int) -> int:
+    """Corte sem silêncio: logo depois do quadro mais baixo da segunda metade"""
+    janela = range(inicio + max_quadros // 2, inicio + max_quadros)
+    return min(janela, key=lambda q: energia[q]) + 1
+
+
+def dividir(energia: List[float], tamanho_pcm: int, taxa: int = 16000,
+            max_segundos: float = 20.0, min_segundos: float = 4.0,
+            silencio_segundos: float = 0.3,
+            piso: Optional[float] = None) -> List[Tuple[int, int]]:
+    """
+    Divide o áudio (já medido em energias) em trechos de até max_segundos
+
+    Corta no meio do último silêncio (>= silencio_segundos) que cabe no
+    trecho; sem silêncio, corta no quadro mais baixo da segunda metade.
+    Trechos sem nenhum quadro de voz são descartados. `piso` é o ruído de
+    fundo conhecido (perfil do usuário); sem ele, é estimado do próprio áudio.
+
+    Returns:
+        Lista de (início, fim) em bytes, em ordem
+    """
+    if not energia:
+        return []
+
+    limiar = limiar_de_voz(energia, piso)
+    voz = [e > limiar for e in energia]
+    total = len(energia)
+
+    quadros_por_s = 1000 / QUADRO_MS
+    max_quadros = max(1, int(max_segundos * quadros_por_s))
+    min_quadros = int(min_segundos * quadros_por_s)
+    min_silencio = max(1, int(silencio_segundos * quadros_por_s))
+
+    # Pontos de corte: meio de cada trecho de silêncio longo
+    cortes = _cortes(voz + [True], min_silencio)
+
+    trechos = []
+    inicio = 0
+    while inicio < total:
+        if total - inicio <= max_quadros:
+            fim = total
+        else:
+            candidatos = [c for c in cortes if inicio + min_quadros < c <= inicio + max_quadros]
+            fim = candidatos[-1] if candidatos else _quadro_mais_baixo(energia, inicio, max_quadros)
+        if any(voz[inicio:fim]):
+            trechos.append((inicio, fim))
+        inicio = fim
+
+    bytes_por_quadro = taxa * QUADRO_MS // 1000 * 2
+    return [(a * bytes_por_quadro, min(tamanho_pcm, b * bytes_por_quadro)) for a, b in trechos]
+
+
+class SegmentadorDeVoz:
+    """
+    Versão incremental de dividir(): recebe o PCM em blocos, à medida que
+    é decodificado, e entrega cada trecho assim que ele fecha
+
+    Só o PCM do trecho em aberto fica na memória (até max_segundos). As
+    energias do áudio todo (33 por segundo) ficam guardadas: o limiar de
+    voz usa o que já foi ouvido (ou o piso conhecido) e o piso medido do
+    áudio inteiro sai de piso_medido() no fim.
+    """
+
+    def __init__(self, taxa: int = 16000, max_segundos: float = 20.0,
+                 min_segundos: float = 4.0, silencio_segundos: float = 0.3,
+                 piso: Optional[float] = None):
+        self.taxa = taxa
+        self.piso = piso
+        quadros_por_s = 1000 / QUADRO_MS
+        self.max_quadros = max(1, int(max_segundos * quadros_por_s))
+        self.min_quadros = int(min_segundos * quadros_por_s)
+        self.min_silencio = max(1, int(silencio_segundos * quadros_por_s))
+        self.bytes_por_quadro = taxa * QUADRO_MS // 1000 * 2
+
+        self.energia: List[float] = []  # Do áudio todo
+        self._inicio = 0                # Quadro onde começa o trecho em aberto
+        self._pcm = bytearray()         # PCM do trecho em aberto
+
+    def alimentar(self, bloco: bytes) -> List[bytes]:
+        """Acrescenta PCM; devolve os trechos com voz que fecharam"""
+        self._pcm += bloco
+        medidos = len(self.energia) - self._inicio
+        completos = len(self._pcm) // self.bytes_por_quadro
+        if completos > medidos:
+            novos = self._pcm[medidos * self.bytes_por_quadro:completos * self.bytes_por_quadro]
+            self.energia += energias(bytes(novos), self.taxa)
+        return self._cortar()
+
+    def terminar(self) -> List[bytes]:
+        """Fim do áudio: mede o último quadro (incompleto) e fecha o que sobrou"""
+        resto = len(self._pcm) - (len(self.energia) - self._inicio) * self.bytes_por_quadro
+        if resto >= 2:
+            self.energia += energias(bytes(self._pcm[-resto:]), self.taxa)
+        trechos = self._cortar()
+        if len(self.energia) > self._inicio:
+            trechos += self._fechar(len(self.energia))
+        return trechos
+
+    def piso_medido(self) -> Optional[float]:
+        """Piso de ruído do áudio inteiro (só se tiver pausas de verdade)"""
+        return piso_confiavel(self.energia)
+
+    def _cortar(self) -> List[bytes]:
+        """Fecha trechos enquanto o aberto passar de max_quadros (mesmas regras de dividir)"""
+        trechos = []
+        while len(self.energia) - self._inicio > self.max_quadros:
+            inicio = self._inicio
+            limiar = limiar_de_voz(self.energia, self.piso)
+            voz = [e > limiar for e in self.energia[inicio:]]
+            candidatos = [c for c in _cortes(voz, self.min_silencio, inicio)
+                          if inicio + self.min_quadros < c <= inicio + self.max_quadros]
+            fim = candidatos[-1] if candidatos else _quadro_mais_baixo(self.energia, inicio, self.max_quadros)
+            trechos += self._fechar(fim, limiar)
+        return trechos
+
+    def _fechar(self, fim: int, limiar: Optional[float] = None) -> List[bytes]:
+        """Tira do buffer o trecho até o quadro `fim`; descarta se não tiver voz"""
+        if limiar is None:
+            limiar = limiar_de_voz(self.energia, self.piso)
+        tamanho = (fim - self._inicio) * self.bytes_por_quadro
+        pcm = bytes(self._pcm[:tamanho])
+        del self._pcm[:tamanho]
+        tem_voz = any(e > limiar for e in self.energia[self._inicio:fim])
+        self._inicio = fim
+        return [pcm] if tem_voz else []
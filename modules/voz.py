@@ -1,26 +1,254 @@
 """
 🎤 Módulo de Voz
 Reconhecimento de áudio e transcrição para texto
+
+O áudio é cortado nos silêncios e os trechos são transcritos em paralelo
+num pool de processos com um modelo Vosk offline (carregado uma vez por
+processo). Sem Vosk/modelo, usa o Google Speech Recognition em threads.
 """
 import os
+import json
+import queue
+import asyncio
+import logging
 import tempfile
-from typing import Optional, Any
+import threading
+import subprocess
+from datetime import datetime
+from typing import Optional, Any, Awaitable, Callable, Dict, Iterator, List, Union
 import speech_recognition as sr
-from pydub import AudioSegment
+
+from config.settings import Settings
+from modules.anexos import Anexo
+from modules.cache import DiskLRUCache, hash_conteudo
+from modules.vad import SegmentadorDeVoz
+from modules.workers import WorkerPool
+
+# Transcrição offline
+try:
+    import vosk
+    VOSK_AVAILABLE = True
+except ImportError:
+    VOSK_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+TAXA_AMOSTRAGEM = 16000  # Hz, mono, 16 bits
+BLOCO_PCM = TAXA_AMOSTRAGEM * 2  # 1s de áudio
+
+ERRO_NAO_ENTENDI = 'Não consegui entender o áudio. Tente falar mais claramente.'
+
+
+def _formato_ffmpeg(formato: str) -> Optional[str]:
+    """Demuxer do ffmpeg para o formato (None = detectar pelo conteúdo)"""
+    formato = formato.lower()
+    if formato in ('ogg', 'oga', 'opus'):
+        return 'ogg'
+    if formato in ('mp3', 'mpeg'):
+        return 'mp3'
+    if formato == 'wav':
+        return 'wav'
+    return None
+
+
+def _comando_ffmpeg(formato: str, entrada: str = 'pipe:0') -> List[str]:
+    """ffmpeg: entrada -> PCM s16le, 16kHz, mono na saída padrão"""
+    comando = ['ffmpeg', '-hide_banner', '-loglevel', 'error']
+    demuxer = _formato_ffmpeg(formato)
+    if demuxer and entrada == 'pipe:0':
+        comando += ['-f', demuxer]
+    comando += ['-i', entrada, '-vn', '-ac', '1', '-ar', str(TAXA_AMOSTRAGEM),
+                '-f', 's16le', 'pipe:1']
+    return comando
+
+
+def _pcm_do_ffmpeg(comando: List[str], dados: Optional[bytes]) -> Iterator[bytes]:
+    """Roda um ffmpeg e entrega o PCM em blocos, à medida que sai do pipe"""
+    processo = subprocess.Popen(
+        comando,
+        stdin=subprocess.PIPE if dados is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+
+    # Escreve a entrada numa thread para não travar com o pipe de saída cheio
+    def alimentar():
+        try:
+            processo.stdin.write(dados)
+        except (BrokenPipeError, ValueError):
+            pass
+        finally:
+            processo.stdin.close()
+
+    escritor = None
+    if dados is not None:
+        escritor = threading.Thread(target=alimentar, daemon=True)
+        escritor.start()
+
+    completo = False
+    try:
+        while True:
+            bloco = processo.stdout.read(BLOCO_PCM)
+            if not bloco:
+                break
+            yield bloco
+        completo = True
+    finally:
+        if not completo:
+            processo.kill()
+        processo.stdout.close()
+        if escritor:
+            escritor.join()
+        erro = processo.stderr.read().decode('utf-8', errors='ignore').strip()
+        processo.stderr.close()
+        codigo = processo.wait()
+        if completo and codigo != 0:
+            raise RuntimeError(f'ffmpeg falhou: {erro[:200] or codigo}')
+
+
+def _decodificar(dados: bytes, formato: str) -> Iterator[bytes]:
+    """
+    Decodifica o áudio para PCM 16kHz mono num único ffmpeg, sem arquivos
+
+    MP4/M4A com o índice no fim não pode ser lido de um pipe: nesse caso
+    (e só nele) o áudio passa por um arquivo temporário, apagado em seguida.
+    """
+    try:
+        primeiro = True
+        for bloco in _pcm_do_ffmpeg(_comando_ffmpeg(formato), dados):
+            primeiro = False
+            yield bloco
+    except RuntimeError:
+        if not primeiro or _formato_ffmpeg(formato):
+            raise
+        with tempfile.NamedTemporaryFile(suffix=f'.{formato}') as arquivo:
+            arquivo.write(dados)
+            arquivo.flush()
+            yield from _pcm_do_ffmpeg(_comando_ffmpeg(formato, arquivo.name), None)
+
+
+# ---------- Processo worker (Vosk) ----------
+
+_modelo = None  # Um por processo, carregado em _iniciar_worker
+
+
+def _iniciar_worker(model_path: str):
+    """Carrega o modelo Vosk uma vez em cada processo do pool"""
+    global _modelo
+    vosk.SetLogLevel(-1)
+    _modelo = vosk.Model(model_path)
+
+
+def _reconhecer_vosk(pcm: bytes) -> str:
+    """Transcreve um trecho de PCM dentro do worker"""
+    reconhecedor = vosk.KaldiRecognizer(_modelo, TAXA_AMOSTRAGEM)
+    for inicio in range(0, len(pcm), BLOCO_PCM):
+        reconhecedor.AcceptWaveform(pcm[inicio:inicio + BLOCO_PCM])
+    return json.loads(reconhecedor.FinalResult()).get('text', '').strip()
+
+
+# ---------- Alternativa online (Google) ----------
+
+def _reconhecer_google(pcm: bytes) -> str:
+    """Transcreve um trecho com Google Speech Recognition (bloqueante, rodar numa thread)"""
+    try:
+        return sr.Recognizer().recognize_google(
+            sr.AudioData(pcm, TAXA_AMOSTRAGEM, 2), language='pt-BR'
+        )
+    except sr.UnknownValueError:
+        return ''
+
+
+class PerfisDeRuido:
+    """
+    Ruído de fundo de cada usuário, aprendido dos primeiros áudios
+
+    Os CALIBRACAO primeiros áudios com pausas calibram o perfil; depois
+    dele o limiar de voz é fixo para o usuário e a estimativa por áudio
+    deixa de ser feita.
+    """
+
+    CALIBRACAO = 3
+
+    def __init__(self, arquivo: str):
+        self.arquivo = arquivo
+        self._perfis: Dict[str, dict] = {}
+        if os.path.exists(arquivo):
+            try:
+                with open(arquivo, 'r', encoding='utf-8') as f:
+                    self._perfis = json.load(f)
+            except (OSError, ValueError):
+                logger.warning(f"Perfis de ruído ilegíveis em {arquivo}, recomeçando")
+
+    def piso(self, user_id: str) -> Optional[float]:
+        """Piso calibrado do usuário, ou None se ainda está calibrando"""
+        perfil = self._perfis.get(user_id)
+        if perfil and perfil['amostras'] >= self.CALIBRACAO:
+            return perfil['piso']
+        return None
+
+    def registrar(self, user_id: str, piso_medido: float):
+        """Acumula uma medida (média das medidas de calibração)"""
+        perfil = self._perfis.setdefault(user_id, {'piso': 0.0, 'amostras': 0})
+        amostras = perfil['amostras']
+        perfil['piso'] = (perfil['piso'] * amostras + piso_medido) / (amostras + 1)
+        perfil['amostras'] = amostras + 1
+        perfil['atualizado_em'] = datetime.now().isoformat()
+        self._salvar()
+
+    def _salvar(self):
+        with open(self.arquivo, 'w', encoding='utf-8') as f:
+            json.dump(self._perfis, f, ensure_ascii=False, indent=2)
+
+
+# Recebe (texto já transcrito em ordem, trechos prontos, total de trechos)
+Parcial = Callable[[str, int, int], Awaitable[Any]]
 
 
 class VozModule:
     """Módulo de reconhecimento de voz"""
     
-    def __init__(self, data_dir: str = "data"):
+    MAX_TRECHO = 20.0      # Segundos por trecho (cortado nos silêncios)
+    MAX_ONLINE = 4         # Trechos enviados ao Google ao mesmo tempo
+    TRECHOS_EM_ESPERA = 2  # Trechos prontos aguardando transcritor livre
+    
+    def __init__(self, data_dir: str = "data", settings: Settings = None):
         self.data_dir = data_dir
-        self.recognizer = sr.Recognizer()
-        self.temp_dir = os.path.join(data_dir, "audio_temp")
-        os.makedirs(self.temp_dir, exist_ok=True)
+        settings = settings or Settings()
+        self.model_path = settings.vosk_model_path
+        self.pool = None
+        self._limite_online = asyncio.Semaphore(self.MAX_ONLINE)
+        
+        # Transcrições já feitas (áudios encaminhados são idênticos)
+        self.cache = DiskLRUCache(
+            os.path.join(data_dir, 'cache', 'transcricoes'),
+            max_bytes=settings.voz_cache_mb * 1024 * 1024
+        )
+        
+        # Ruído de fundo calibrado por usuário (limiar do VAD)
+        os.makedirs(data_dir, exist_ok=True)
+        self.perfis = PerfisDeRuido(os.path.join(data_dir, 'voz_perfis.json'))
         
-        # Configurações do recognizer
-        self.recognizer.energy_threshold = 300
-        self.recognizer.dynamic_energy_threshold = True
+        # Pool de transcrição offline (processos sobem no primeiro áudio)
+        if VOSK_AVAILABLE and os.path.isdir(self.model_path):
+            self.pool = WorkerPool(
+                max_workers=settings.voz_workers,
+                initializer=_iniciar_worker,
+                initargs=(self.model_path,)
+            )
+        else:
+            logger.warning(
+                f"Vosk ou modelo ({self.model_path}) indisponível: "
+                "usando Google Speech Recognition (online)"
+            )
+    
+    @property
+    def offline(self) -> bool:
+        return self.pool is not None
+    
+    def fechar(self):
+        """Encerra os processos de transcrição"""
+        if self.pool:
+            self.pool.shutdown()
     
     async def handle(self, command: str, args: list, 
                      user_id: str, attachments: list = None) -> str:
@@ -46,103 +274,171 @@ A transcrição será processada automaticamente.
         """Processa linguagem natural sobre voz"""
         return await self.handle('voz', [], user_id, attachments)
     
-    async def transcrever_audio(self, audio_path: str, formato: str = "ogg") -> dict:
+    def transcricao_em_cache(self, chave: str) -> Optional[dict]:
+        """Transcrição já feita para esta chave (ex: file_unique_id), sem baixar nada"""
+        texto = self.cache.get(chave)
+        if texto is None:
+            return None
+        return {'success': True, 'text': texto, 'cache': True}
+    
+    async def transcrever_audio(self, audio: Union[str, Anexo], formato: str = "ogg",
+                                ao_parcial: Optional[Parcial] = None,
+                                chave: Optional[str] = None,
+                                user_id: Optional[str] = None) -> dict:
         """
-        Transcreve um arquivo de áudio para texto
+        Transcreve um áudio para texto, sem bloquear o loop
+        
+        O áudio é cortado nos silêncios em trechos de até MAX_TRECHO segundos,
+        transcritos em paralelo e juntados na ordem original. Áudios já
+        transcritos (mesmo conteúdo ou mesma chave) vêm do cache.
         
         Args:
-            audio_path: Caminho para o arquivo de áudio
+            audio: Caminho do arquivo ou Anexo em memória
             formato: Formato do áudio (ogg, mp3, wav)
+            ao_parcial: Chamado a cada trecho concluído com o texto pronto até ali
+            chave: Identificador estável do arquivo (ex: file_unique_id do Telegram)
+            user_id: Dono do áudio (usa/calibra o perfil de ruído dele)
             
         Returns:
             dict com 'success', 'text' ou 'error'
         """
-        wav_path = None
-        
         try:
-            # Converte para WAV se necessário (speech_recognition só aceita WAV)
-            if formato.lower() != 'wav':
-                wav_path = await self._converter_para_wav(audio_path, formato)
+            if isinstance(audio, Anexo):
+                dados = audio.ler()
             else:
-                wav_path = audio_path
+                with open(audio, 'rb') as f:
+                    dados = f.read()
             
-            if not wav_path or not os.path.exists(wav_path):
-                return {
-                    'success': False,
-                    'error': 'Erro ao converter áudio'
-                }
+            chave_conteudo = f'sha256:{hash_conteudo(dados)}'
+            em_cache = self.transcricao_em_cache(chave_conteudo)
+            if em_cache:
+                if chave:
+                    self.cache.set(chave, em_cache['text'])
+                return em_cache
             
-            # Transcreve usando Google Speech Recognition (gratuito)
-            with sr.AudioFile(wav_path) as source:
-                # Ajusta para ruído ambiente
-                self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                audio_data = self.recognizer.record(source)
+            piso = self.perfis.piso(user_id) if user_id else None
+            segmentador = SegmentadorDeVoz(TAXA_AMOSTRAGEM, self.MAX_TRECHO, piso=piso)
+            textos = await self._reconhecer_fluxo(dados, formato, segmentador, ao_parcial)
+            medido = segmentador.piso_medido() if user_id and piso is None else None
+            if medido is not None:
+                self.perfis.registrar(user_id, medido)
             
-            # Tenta transcrever em português
-            try:
-                texto = self.recognizer.recognize_google(
-                    audio_data, 
-                    language='pt-BR'
-                )
-                return {
-                    'success': True,
-                    'text': texto
-                }
-            except sr.UnknownValueError:
-                return {
-                    'success': False,
-                    'error': 'Não consegui entender o áudio. Tente falar mais claramente.'
-                }
-            except sr.RequestError as e:
-                return {
-                    'success': False,
-                    'error': f'Erro no serviço de reconhecimento: {str(e)}'
-                }
-                
+        except sr.RequestError as e:
+            return {
+                'success': False,
+                'error': f'Erro no serviço de reconhecimento: {str(e)}'
+            }
         except Exception as e:
             return {
                 'success': False,
                 'error': f'Erro ao processar áudio: {str(e)}'
             }
-        finally:
-            # Limpa arquivo temporário
-            if wav_path and wav_path != audio_path and os.path.exists(wav_path):
+        
+        texto = ' '.join(t for t in textos if t)
+        if not texto:
+            return {'success': False, 'error': ERRO_NAO_ENTENDI}
+        
+        for chave_cache in filter(None, (chave_conteudo, chave)):
+            self.cache.set(chave_cache, texto)
+        return {'success': True, 'text': texto}
+    
+    async def _reconhecer(self, pcm: bytes) -> str:
+        """Transcreve um trecho (worker offline ou Google numa thread)"""
+        if self.offline:
+            return await self.pool.run(_reconhecer_vosk, pcm)
+        async with self._limite_online:
+            return await asyncio.to_thread(_reconhecer_google, pcm)
+    
+    async def _reconhecer_fluxo(self, dados: bytes, formato: str, segmentador: SegmentadorDeVoz,
+                                ao_parcial: Optional[Parcial]) -> List[str]:
+        """
+        Decodifica e segmenta numa thread, transcrevendo cada trecho assim que fecha
+
+        O PCM nunca é juntado: na memória ficam o trecho em aberto no
+        segmentador, até TRECHOS_EM_ESPERA prontos na fila e os que estão
+        sendo transcritos (um por transcritor). Com os transcritores
+        ocupados, a decodificação espera em vez de acumular áudio.
+        """
+        fila: queue.Queue = queue.Queue(maxsize=self.TRECHOS_EM_ESPERA)
+        parar = threading.Event()
+        vagas = asyncio.Semaphore(self.pool.max_workers if self.offline else self.MAX_ONLINE)
+        aviso = asyncio.Lock()
+        textos: List[Optional[str]] = []
+        tarefas: List[asyncio.Task] = []
+        prontos = 0
+
+        def entregar(trecho: Optional[bytes]) -> bool:
+            while not parar.is_set():
                 try:
-                    os.remove(wav_path)
-                except:
+                    fila.put(trecho, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def produzir():
+            blocos = _decodificar(dados, formato)
+            try:
+                for bloco in blocos:
+                    if not all(entregar(t) for t in segmentador.alimentar(bloco)):
+                        return
+                for trecho in segmentador.terminar():
+                    if not entregar(trecho):
+                        return
+            finally:
+                blocos.close()  # Parada antecipada encerra o ffmpeg
+                entregar(None)
+
+        def proximo() -> Optional[bytes]:
+            while not parar.is_set():
+                try:
+                    return fila.get(timeout=0.1)
+                except queue.Empty:
                     pass
-    
-    async def _converter_para_wav(self, audio_path: str, formato: str) -> Optional[str]:
-        """Converte áudio para WAV usando pydub"""
-        try:
-            # Carrega o áudio
-            if formato.lower() == 'ogg':
-                audio = AudioSegment.from_ogg(audio_path)
-            elif formato.lower() == 'mp3':
-                audio = AudioSegment.from_mp3(audio_path)
-            elif formato.lower() == 'oga':
-                audio = AudioSegment.from_ogg(audio_path)
-            elif formato.lower() == 'm4a':
-                audio = AudioSegment.from_file(audio_path, format='m4a')
-            else:
-                audio = AudioSegment.from_file(audio_path)
-            
-            # Converte para mono e 16kHz (melhor para speech recognition)
-            audio = audio.set_channels(1)
-            audio = audio.set_frame_rate(16000)
-            
-            # Salva como WAV
-            wav_path = os.path.join(
-                self.temp_dir, 
-                f"audio_{os.path.basename(audio_path)}.wav"
-            )
-            audio.export(wav_path, format='wav')
-            
-            return wav_path
-            
-        except Exception as e:
-            print(f"Erro ao converter áudio: {e}")
             return None
+
+        async def reconhecer(indice: int, trecho: bytes):
+            nonlocal prontos
+            try:
+                textos[indice] = await self._reconhecer(trecho)
+            except BaseException:
+                parar.set()
+                raise
+            finally:
+                vagas.release()
+            prontos += 1
+            if ao_parcial and len(textos) > 1:
+                async with aviso:
+                    prefixo = []
+                    for texto in textos:
+                        if texto is None:
+                            break
+                        prefixo.append(texto)
+                    await ao_parcial(' '.join(t for t in prefixo if t), prontos, len(textos))
+
+        async def receber():
+            while True:
+                await vagas.acquire()
+                trecho = await asyncio.to_thread(proximo)
+                if trecho is None:
+                    vagas.release()
+                    return
+                textos.append(None)
+                tarefas.append(asyncio.create_task(reconhecer(len(textos) - 1, trecho)))
+
+        produtor = asyncio.ensure_future(asyncio.to_thread(produzir))
+        receptor = asyncio.create_task(receber())
+        try:
+            await asyncio.gather(produtor, receptor)
+            await asyncio.gather(*tarefas)
+        finally:
+            # Cancelamento (ou erro num trecho) para a decodificação e descarta o resto
+            parar.set()
+            receptor.cancel()
+            for tarefa in tarefas:
+                tarefa.cancel()
+
+        return textos
     
     def formatar_resposta_transcricao(self, resultado: dict) -> str:
         """Formata a resposta da transcrição"""
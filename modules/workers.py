@@ -0,0 +1,110 @@
+"""
+⚙️ Pool de Processos
+Executa trabalho pesado de CPU fora do loop de eventos, em processos com estado próprio
+"""
+import os
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, Tuple
+
+# Limite de memória dos workers (só Unix)
+try:
+    import resource
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+def nucleos_disponiveis() -> int:
+    """Núcleos que este processo pode usar"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _iniciar_processo(max_memoria: int, initializer: Optional[Callable], initargs: Tuple):
+    """Roda em cada worker: aplica o limite de memória e o initializer do pool"""
+    if max_memoria and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (max_memoria, max_memoria))
+    if initializer:
+        initializer(*initargs)
+
+
+class WorkerPool:
+    """
+    Pool de processos, criado no primeiro uso
+
+    `initializer(*initargs)` roda uma vez em cada processo - é onde se carrega
+    um modelo ou outro estado caro, que as funções enviadas reaproveitam.
+    Os processos usam 'spawn' (não herdam o loop nem as threads do pai).
+
+    max_memory_mb limita o espaço de endereçamento de cada worker (MemoryError
+    lá dentro em vez de derrubar a máquina). Uma tarefa que passa do timeout
+    não tem como ser interrompida: os processos são reciclados.
+    """
+
+    def __init__(self, max_workers: int = 0,
+                 initializer: Optional[Callable] = None, initargs: Tuple = (),
+                 max_memory_mb: int = 0):
+        self.max_workers = max_workers or nucleos_disponiveis()
+        self.initializer = initializer
+        self.initargs = initargs
+        self.max_memory_mb = max_memory_mb
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_iniciar_processo,
+                initargs=(self.max_memory_mb * 1024 * 1024, self.initializer, self.initargs)
+            )
+        return self._executor
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """
+        Executa fn(*args) num worker sem bloquear o loop
+
+        Raises:
+            asyncio.TimeoutError: passou de `timeout` segundos (pool reciclado)
+            BrokenProcessPool: o worker morreu (ex: falta de memória)
+        """
+        loop = asyncio.get_running_loop()
+        for tentativa in range(2):
+            executor = self.executor
+            try:
+                return await asyncio.wait_for(
+                    loop.run_in_executor(executor, fn, *args), timeout
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f"{getattr(fn, '__name__', fn)} passou de {timeout}s: reciclando o pool")
+                self._reciclar(executor)
+                raise
+            except BrokenProcessPool:
+                # Pool reciclado por causa de outra tarefa: tenta de novo uma vez
+                if executor is not self._executor and tentativa == 0:
+                    continue
+                logger.error("Pool de processos quebrado, será recriado")
+                self._reciclar(executor)
+                raise
+
+    def _reciclar(self, executor: ProcessPoolExecutor):
+        """Mata os processos de um executor (travados ou quebrados) e o descarta"""
+        if self._executor is executor:
+            self._executor = None
+        for processo in list((getattr(executor, '_processes', None) or {}).values()):
+            if processo.is_alive():
+                processo.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self, wait: bool = False):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,42 @@
+"""
+🧪 Testes do Canal da Ponte
+Leitura de frames, inclusive de conexões que caem no meio de um
+"""
+import os
+import sys
+import asyncio
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from interfaces.bridge_channel import HEADER, FrameInvalido, encode_frame, read_frame
+
+
+def _ler(dados: bytes):
+    async def ler():
+        reader = asyncio.StreamReader()
+        reader.feed_data(dados)
+        reader.feed_eof()
+        return [await read_frame(reader), await read_frame(reader)]
+    return asyncio.run(ler())
+
+
+def test_frame_inteiro():
+    assert _ler(encode_frame({'id': 1, 'message': 'olá'})) == [{'id': 1, 'message': 'olá'}, None]
+
+
+@pytest.mark.parametrize('corte', [0, 2, HEADER.size, HEADER.size + 5])
+def test_conexao_que_cai_no_meio_do_frame_e_encerrada(corte):
+    assert _ler(encode_frame({'id': 1, 'message': 'x' * 20})[:corte]) == [None, None]
+
+
+def test_frame_sem_json_nao_derruba_a_conexao():
+    async def ler():
+        reader = asyncio.StreamReader()
+        reader.feed_data(HEADER.pack(3) + b'abc' + encode_frame({'id': 2}))
+        reader.feed_eof()
+        with pytest.raises(FrameInvalido):
+            await read_frame(reader)
+        return await read_frame(reader)
+    assert asyncio.run(ler()) == {'id': 2}
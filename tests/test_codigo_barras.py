@@ -0,0 +1,66 @@
+"""
+🧪 Testes do Código de Barras
+Códigos válidos são lidos nos formatos impressos; linhas de números quaisquer não
+"""
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.codigo_barras import (buscar_codigo, codigo_para_linha, codigo_valido,
+                                   modulo10, modulo11_bancario)
+
+# Boleto bancário: banco 237, real, fator 1500, R$ 123,45
+CORPO = '2379' + '1500' + '0000012345' + '1234567890123456789012345'
+CODIGO = CORPO[:4] + str(modulo11_bancario(CORPO)) + CORPO[4:]
+
+
+def _impressa(linha: str) -> str:
+    return (f"{linha[0:5]}.{linha[5:10]} {linha[10:15]}.{linha[15:21]} "
+            f"{linha[21:26]}.{linha[26:32]} {linha[32]} {linha[33:]}")
+
+
+def test_linha_bancaria_impressa():
+    codigo = buscar_codigo("Linha: " + _impressa(codigo_para_linha(CODIGO)))
+    assert codigo.codigo_barras == CODIGO
+    assert codigo.valor == 123.45
+
+
+def test_codigo_corrido():
+    assert buscar_codigo(f"código {CODIGO} fim").codigo_barras == CODIGO
+
+
+def test_codigo_quebrado_em_blocos_nao_vale():
+    assert buscar_codigo(f"{CODIGO[:20]} {CODIGO[20:]}") is None
+
+
+def test_arrecadacao_em_blocos():
+    corpo = '836' + '00000012345' + '0' * 29
+    codigo = corpo[:3] + str(modulo10(corpo)) + corpo[3:]
+    linha = codigo_para_linha(codigo)
+    impressa = " ".join(f"{linha[i:i + 11]}-{linha[i + 11]}" for i in range(0, 48, 12))
+    assert buscar_codigo(impressa).codigo_barras == codigo
+
+
+def test_moeda_e_fator_do_bancario():
+    for corpo in ('2370' + CORPO[4:], '2379' + '0500' + CORPO[8:]):
+        assert not codigo_valido(corpo[:4] + str(modulo11_bancario(corpo)) + corpo[4:])
+
+
+def test_linhas_de_numeros_nao_viram_codigo():
+    rnd = random.Random(46)
+    tamanhos = [1, 2, 3, 4, 5, 6, 8, 10, 11, 12, 14]
+    falsos = 0
+    for _ in range(5000):
+        linha = " ".join("".join(str(rnd.randint(0, 9)) for _ in range(rnd.choice(tamanhos)))
+                         for _ in range(rnd.randint(6, 16)))
+        falsos += buscar_codigo(linha) is not None
+    assert falsos == 0
+
+
+def test_codigos_ao_acaso_raramente_passam():
+    rnd = random.Random(44)
+    aceitos = sum(codigo_valido("".join(str(rnd.randint(0, 9)) for _ in range(44)))
+                  for _ in range(5000))
+    assert aceitos / 5000 < 0.02
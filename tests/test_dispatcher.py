@@ -0,0 +1,67 @@
+"""
+🧪 Testes do Dispatcher
+Cada mensagem de um lote gasta a sua ficha na admissão
+"""
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from middleware.admission import AdmissionController
+from middleware.dispatcher import MessageDispatcher
+
+
+class OrquestradorEco:
+    """Devolve a própria mensagem, registrando a ordem de execução"""
+
+    def __init__(self):
+        self.executadas = []
+
+    async def process(self, message, user_id):
+        self.executadas.append((user_id, message))
+        return message
+
+
+def _dispatcher(**limites):
+    admissao = AdmissionController(user_rate=0.001, **limites)
+    return MessageDispatcher(OrquestradorEco(), admissao)
+
+
+def test_rajada_alem_do_balde_recusa_o_excedente_em_ordem():
+    dispatcher = _dispatcher(user_burst=3)
+    itens = [{'message': f'm{i}', 'user_id': 'u1'} for i in range(5)]
+    resultados = asyncio.run(dispatcher.process_batch(itens))
+
+    assert [r['response'] for r in resultados[:3]] == ['m0', 'm1', 'm2']
+    assert [r.get('status') for r in resultados[3:]] == [429, 429]
+    assert dispatcher.orchestrator.executadas == [('u1', 'm0'), ('u1', 'm1'), ('u1', 'm2')]
+
+    metricas = dispatcher.admission.snapshot()
+    assert metricas['accepted'] == metricas['completed'] == 3
+    assert metricas['rejected_rate_limit'] == 2
+    assert metricas['queue_depth'] == 0
+
+
+def test_balde_gasto_pelo_lote_vale_para_a_mensagem_seguinte():
+    dispatcher = _dispatcher(user_burst=2)
+    asyncio.run(dispatcher.process_batch([{'message': 'a', 'user_id': 'u1'},
+                                          {'message': 'b', 'user_id': 'u1'}]))
+    resultado = asyncio.run(dispatcher.process_item({'message': 'c', 'user_id': 'u1'}))
+    assert resultado['status'] == 429
+
+
+def test_fila_limita_o_lote():
+    dispatcher = _dispatcher(user_burst=10, max_queue=2)
+    itens = [{'message': f'm{i}', 'user_id': 'u1'} for i in range(4)]
+    resultados = asyncio.run(dispatcher.process_batch(itens))
+    assert [r['success'] for r in resultados] == [True, True, False, False]
+    assert dispatcher.admission.metrics['rejected_queue_full'] == 2
+
+
+def test_outros_usuarios_tem_balde_proprio():
+    dispatcher = _dispatcher(user_burst=1)
+    itens = [{'message': 'a', 'user_id': 'u1'}, {'message': 'b', 'user_id': 'u1'},
+             {'message': 'c', 'user_id': 'u2'}]
+    resultados = asyncio.run(dispatcher.process_batch(itens))
+    assert [r['success'] for r in resultados] == [True, False, True]
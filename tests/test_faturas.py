@@ -0,0 +1,44 @@
+"""
+🧪 Testes do Módulo de Faturas
+Aviso diário dos boletos pendentes que vencem em breve
+"""
+import os
+import sys
+import json
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.faturas import FaturasModule
+
+HOJE = date(2026, 3, 10)
+
+
+def _boleto(boleto_id, user_id, dias, pago=False):
+    return {'id': boleto_id, 'user_id': user_id, 'valor': 10.0, 'pago': pago,
+            'vencimento': (HOJE + timedelta(days=dias)).isoformat()}
+
+
+def test_aviso_de_vencimento_sai_uma_vez_por_dia(tmp_path):
+    boletos = [_boleto('a', '1', 0), _boleto('b', '1', 3), _boleto('c', '1', 4),
+               _boleto('d', '2', -1), _boleto('e', '2', 1, pago=True)]
+    with open(tmp_path / 'boletos.json', 'w', encoding='utf-8') as f:
+        json.dump(boletos, f)
+
+    faturas = FaturasModule(data_dir=str(tmp_path))
+    try:
+        avisos = faturas.avisos_de_vencimento(3, HOJE)
+        assert list(avisos) == ['1']
+        assert '`a`' in avisos['1'] and '`b`' in avisos['1'] and '`c`' not in avisos['1']
+
+        assert faturas.avisos_de_vencimento(3, HOJE) == {}
+        assert '`c`' in faturas.avisos_de_vencimento(3, HOJE + timedelta(days=1))['1']
+    finally:
+        faturas.fechar()
+
+    # A marca fica gravada: reiniciar não repete o aviso do dia
+    faturas = FaturasModule(data_dir=str(tmp_path))
+    try:
+        assert faturas.avisos_de_vencimento(3, HOJE + timedelta(days=1)) == {}
+    finally:
+        faturas.fechar()
@@ -0,0 +1,40 @@
+"""
+🧪 Testes da Leitura de PDF
+Rota decidida pelas páginas lidas e estatísticas gravadas fora do loop
+"""
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.leitura_pdf import POUCO_TEXTO, EstatisticasPdf, _ler_paginas, _rota
+
+
+def test_ler_paginas_conta_as_paginas_lidas():
+    paginas = iter(['linha 1', 'valor', 'vencimento', 'nunca lida'])
+    achados = {'linha 1': {'linha'}, 'valor': {'valor'}, 'vencimento': {'vencimento'}}
+    texto, encontrados, lidas = _ler_paginas(paginas, lambda t: achados.get(t, set()))
+    assert lidas == 3 and len(encontrados) == 3
+    assert 'nunca lida' not in texto
+
+
+def test_rota_compara_o_texto_com_as_paginas_lidas():
+    sonda = {'caracteres': 5000, 'paginas': 40}
+    texto = 'x' * (POUCO_TEXTO * 2)
+    # Duas páginas lidas de um PDF de 40: o texto basta, não é escaneado
+    assert _rota(sonda, texto, 0, 2) == 'texto'
+    assert _rota(sonda, texto, 0, 40) in ('ocr', 'sem_texto')
+
+
+def test_estatisticas_gravam_ao_fechar(tmp_path):
+    estatisticas = EstatisticasPdf(str(tmp_path))
+    for i in range(20):
+        estatisticas.registrar({'familia': 'banco', 'rota': 'texto', 'ms': i,
+                                'tentativas': [{'backend': 'pdfplumber', 'ms': i, 'campos': 3}]})
+    estatisticas.fechar()
+
+    with open(tmp_path / 'leituras_pdf.jsonl', encoding='utf-8') as f:
+        assert [json.loads(linha)['ms'] for linha in f] == list(range(20))
+    with open(tmp_path / 'leituras_pdf_resumo.json', encoding='utf-8') as f:
+        assert json.load(f) == estatisticas.resumo
@@ -0,0 +1,45 @@
+"""
+🧪 Testes do Orquestrador
+Anexos de boleto (PDF, foto ou compactado) vão para o módulo de faturas
+"""
+import os
+import sys
+import asyncio
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from middleware.orchestrator import Orchestrator
+from modules.anexos import Anexo
+
+
+class FaturasFalso:
+    """Registra as chamadas no lugar do FaturasModule"""
+
+    def __init__(self):
+        self.chamadas = []
+
+    async def handle(self, command, args, user_id, attachments=None):
+        self.chamadas.append((command, user_id, [a.nome for a in attachments]))
+        return 'processado'
+
+
+@pytest.fixture
+def orquestrador(tmp_path):
+    orq = Orchestrator(data_dir=str(tmp_path))
+    orq.modules['faturas'] = FaturasFalso()
+    return orq
+
+
+@pytest.mark.parametrize('nome', ['boleto.pdf', 'photo.jpg', 'FOTO.JPEG', 'print.png', 'contas.zip'])
+def test_anexo_de_boleto_vai_para_faturas(orquestrador, nome):
+    anexo = Anexo(nome)
+    resposta = asyncio.run(orquestrador.process('Processar arquivo', 'u1', [anexo]))
+    assert resposta == 'processado'
+    assert orquestrador.modules['faturas'].chamadas == [('fatura', 'u1', [nome])]
+
+
+def test_outro_anexo_nao_vai_para_faturas(orquestrador):
+    asyncio.run(orquestrador.process('Processar arquivo', 'u1', [Anexo('planilha.xlsx')]))
+    assert orquestrador.modules['faturas'].chamadas == []
@@ -0,0 +1,35 @@
+"""
+🧪 Testes da Fila de Envio
+Cortes de mensagens longas sem quebrar a marcação Markdown
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip('telegram')
+
+from interfaces.outbox import _equilibrado
+
+
+@pytest.mark.parametrize('trecho', [
+    'Arquivo nome_do_arquivo.pdf salvo',
+    '_itálico_ e *negrito*',
+    'Use `minha_variavel` no filtro',
+    '```\nx = a_b * c\n```',
+    '__init__.py',
+])
+def test_equilibrado(trecho):
+    assert _equilibrado(trecho)
+
+
+@pytest.mark.parametrize('trecho', [
+    '_itálico sem fim',
+    '*negrito sem fim',
+    'Use `código sem fim',
+    '```\nbloco sem fim',
+])
+def test_desequilibrado(trecho):
+    assert not _equilibrado(trecho)
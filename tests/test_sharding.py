@@ -0,0 +1,79 @@
+"""
+🧪 Testes do Sharding
+Roteamento por grupo e migração dos dados do processo único para os shards
+"""
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip('aiohttp')
+
+from middleware.sharding import ShardRing, ShardRouter, migrar_para_shards
+
+SHARDS = ['w0', 'w1', 'w2']
+
+
+def _gravar(caminho, dados):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(dados, f)
+
+
+def _ler(caminho):
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def legado(tmp_path):
+    origem = tmp_path / 'data'
+    usuarios = [f'u{i}' for i in range(30)]
+    _gravar(origem / 'transacoes.json', [{'id': str(i), 'user_id': u} for i, u in enumerate(usuarios)])
+    _gravar(origem / 'voz_perfis.json', {u: {'piso': 1.0, 'amostras': 3} for u in usuarios})
+    for g in range(6):
+        _gravar(origem / 'grupos' / f'-100{g}.json', {'grupo_id': f'-100{g}', 'transacoes': []})
+    pastas = {w: str(tmp_path / 'data' / 'shards' / str(i)) for i, w in enumerate(SHARDS)}
+    return str(origem), usuarios, pastas
+
+
+def test_grupo_vai_para_o_worker_do_grupo():
+    ring = ShardRing(SHARDS)
+    item = {'user_id': 'u1', 'group_id': '-1001'}
+    assert ring.get(ShardRouter.chave(item)) == ring.get('-1001')
+    assert ShardRouter.chave({'user_id': 'u1'}) == 'u1'
+
+
+def test_migracao_reparte_por_dono(legado):
+    origem, usuarios, pastas = legado
+    ring = ShardRing(SHARDS)
+    copiados = migrar_para_shards(origem, ring, pastas)
+    assert copiados == {'transacoes.json': 30, 'voz_perfis.json': 30, 'grupos': 6}
+
+    for shard, pasta in pastas.items():
+        transacoes = _ler(os.path.join(pasta, 'transacoes.json'))
+        assert all(ring.get(t['user_id']) == shard for t in transacoes)
+        assert all(ring.get(u) == shard for u in _ler(os.path.join(pasta, 'voz_perfis.json')))
+        grupos = os.path.join(pasta, 'grupos')
+        for nome in (os.listdir(grupos) if os.path.isdir(grupos) else []):
+            assert ring.get(nome[:-len('.json')]) == shard
+
+    total = sum(len(_ler(os.path.join(p, 'transacoes.json'))) for p in pastas.values())
+    assert total == len(usuarios)
+    assert os.path.exists(os.path.join(origem, 'transacoes.json'))  # Original fica de backup
+
+
+def test_migracao_roda_uma_vez_e_preserva_o_que_o_worker_gravou(legado):
+    origem, _, pastas = legado
+    ring = ShardRing(SHARDS)
+    dono = ring.get('u0')
+    _gravar(os.path.join(pastas[dono], 'transacoes.json'), [{'id': 'novo', 'user_id': 'u0'}])
+
+    migrar_para_shards(origem, ring, pastas)
+    ids = [t['id'] for t in _ler(os.path.join(pastas[dono], 'transacoes.json'))]
+    assert ids[-1] == 'novo' and '0' in ids
+
+    assert migrar_para_shards(origem, ring, pastas) is None
@@ -0,0 +1,53 @@
+"""
+🧪 Testes da Detecção de Voz
+O segmentador incremental corta nos mesmos pontos que dividir()
+"""
+import os
+import sys
+import math
+import random
+from array import array
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.vad import SegmentadorDeVoz, dividir, energias, piso_confiavel
+
+TAXA = 16000
+
+
+def _audio(padrao, ruido: float, semente: int) -> bytes:
+    """PCM com trechos de 'fala' (senoide modulada) e de silêncio sobre ruído"""
+    rnd = random.Random(semente)
+    pcm = array('h')
+    for segundos, fala in padrao:
+        for i in range(int(segundos * TAXA)):
+            amostra = 2500 * (0.3 + 0.7 * abs(math.sin(i / 1100))) * math.sin(i * 0.25) if fala else 0.0
+            pcm.append(int(amostra + rnd.uniform(-ruido, ruido)))
+    return pcm.tobytes()
+
+
+PADROES = {
+    'pausas': [(0.5, False)] + [(5, True), (0.8, False)] * 6,
+    'densa': [(0.2, False)] + [(9, True), (0.4, False)] * 3,
+    'sem_pausa': [(30, True)],
+}
+
+
+@pytest.mark.parametrize('nome', PADROES)
+@pytest.mark.parametrize('piso', [None, 150.0])
+def test_incremental_igual_ao_lote(nome, piso):
+    pcm = _audio(PADROES[nome], 250, 37)
+    energia = energias(pcm, TAXA)
+    lote = [pcm[a:b] for a, b in dividir(energia, len(pcm), TAXA, 20.0, piso=piso)]
+
+    segmentador = SegmentadorDeVoz(TAXA, 20.0, piso=piso)
+    fluxo = []
+    for inicio in range(0, len(pcm), 7001):  # Blocos fora do alinhamento dos quadros
+        fluxo += segmentador.alimentar(pcm[inicio:inicio + 7001])
+        assert len(segmentador._pcm) <= (20.0 + 1) * TAXA * 2
+    fluxo += segmentador.terminar()
+
+    assert fluxo == lote
+    assert segmentador.piso_medido() == piso_confiavel(energia)
@@ -8,6 +8,7 @@ const { useMultiFileAuthState, DisconnectReason } = require('@whiskeysockets/bai
 const qrcode = require('qrcode-terminal');
 const pino = require('pino');
 const axios = require('axios');
+const net = require('net');
 const fs = require('fs');
 const path = require('path');
 
@@ -17,9 +18,15 @@ const logger = pino({ level: 'silent' });
 // URL do servidor Python (vamos criar)
 const PYTHON_SERVER = 'http://localhost:5001';
 
+// Canal persistente com o Python: porta TCP local ou caminho de socket Unix
+const PYTHON_CHANNEL = process.env.PYTHON_CHANNEL || '5002';
+
 // Pasta para salvar sessão
 const AUTH_FOLDER = './auth_info';
 
+// Socket atual (trocado a cada reconexão) - usado pelos reenvios adiados
+let whatsapp = null;
+
 async function connectToWhatsApp() {
     // Carrega estado de autenticação
     const { state, saveCreds } = await useMultiFileAuthState(AUTH_FOLDER);
@@ -67,6 +74,8 @@ async function connectToWhatsApp() {
     sock.ev.on('messages.upsert', async ({ messages, type }) => {
         if (type !== 'notify') return;
 
+        // Extrai as mensagens de texto válidas
+        const pendentes = [];
         for (const msg of messages) {
             // Ignora mensagens enviadas por mim
             if (msg.key.fromMe) continue;
@@ -93,16 +102,33 @@ async function connectToWhatsApp() {
             if (!text) continue;
 
             console.log(`📩 ${pushName}: ${text}`);
+            pendentes.push({ from, pushName, text });
+        }
 
-            try {
-                // Envia para o servidor Python processar
-                const response = await processMessage(text, from, pushName);
-                
+        if (pendentes.length === 0) return;
+
+        // Quem tem mensagens adiadas (sobrecarga) espera atrás delas, em ordem
+        const novas = pendentes.filter((pendente) => {
+            if (!adiadas.has(pendente.from)) return true;
+            adiar(pendente);
+            return false;
+        });
+        if (novas.length === 0) return;
+
+        const respostas = await responderTodas(novas);
+
+        for (let i = 0; i < novas.length; i++) {
+            const { from } = novas[i];
+            const resultado = respostas[i];
+            if (resultado.status === 'fulfilled') {
                 // Responde no WhatsApp
-                await sock.sendMessage(from, { text: response });
+                await sock.sendMessage(from, { text: resultado.value });
                 console.log(`📤 Resposta enviada!`);
-            } catch (error) {
-                console.error('❌ Erro ao processar:', error.message);
+            } else if (resultado.reason instanceof Overloaded) {
+                // Servidor ainda saturado: a mensagem volta para a fila
+                adiar(novas[i], resultado.reason.retryAfter);
+            } else {
+                console.error('❌ Erro ao processar:', resultado.reason.message);
                 await sock.sendMessage(from, { 
                     text: '❌ Desculpe, ocorreu um erro ao processar sua mensagem.' 
                 });
@@ -110,13 +136,231 @@ async function connectToWhatsApp() {
         }
     });
 
+    whatsapp = sock;
     return sock;
 }
 
+/**
+ * Canal persistente com o servidor Python
+ * Frames: 4 bytes de tamanho (big-endian) + JSON, correlacionados por "id"
+ */
+const channel = {
+    socket: null,
+    connected: false,
+    buffer: Buffer.alloc(0),
+    nextId: 1,
+    pending: new Map()
+};
+
+function connectChannel() {
+    const target = /^\d+$/.test(PYTHON_CHANNEL)
+        ? { host: '127.0.0.1', port: Number(PYTHON_CHANNEL) }
+        : { path: PYTHON_CHANNEL };
+
+    const socket = net.createConnection(target);
+    socket.setNoDelay(true);
+    channel.socket = socket;
+
+    socket.on('connect', () => {
+        channel.connected = true;
+        console.log('🔌 Canal com o servidor Python conectado');
+    });
+
+    socket.on('data', (chunk) => {
+        channel.buffer = Buffer.concat([channel.buffer, chunk]);
+
+        // Extrai todos os frames completos do buffer
+        while (channel.buffer.length >= 4) {
+            const size = channel.buffer.readUInt32BE(0);
+            if (channel.buffer.length < 4 + size) break;
+
+            const body = channel.buffer.subarray(4, 4 + size);
+            channel.buffer = channel.buffer.subarray(4 + size);
+
+            let frame;
+            try {
+                frame = JSON.parse(body.toString('utf8'));
+            } catch (err) {
+                console.error('⚠️ Frame inválido do servidor Python:', err.message);
+                continue;
+            }
+            const pending = frame && channel.pending.get(frame.id);
+            if (pending) {
+                channel.pending.delete(frame.id);
+                clearTimeout(pending.timer);
+                pending.resolve(frame);
+            }
+        }
+    });
+
+    // Erros são seguidos de 'close', onde tratamos a reconexão
+    socket.on('error', () => {});
+
+    socket.on('close', () => {
+        channel.connected = false;
+        channel.socket = null;
+        channel.buffer = Buffer.alloc(0);
+
+        for (const pending of channel.pending.values()) {
+            clearTimeout(pending.timer);
+            pending.reject(new Error('Canal fechado'));
+        }
+        channel.pending.clear();
+
+        setTimeout(connectChannel, 2000);
+    });
+}
+
+function sendOverChannel(text, userId, userName) {
+    return new Promise((resolve, reject) => {
+        const id = channel.nextId++;
+        const body = Buffer.from(JSON.stringify({
+            id,
+            message: text,
+            user_id: userId,
+            user_name: userName
+        }), 'utf8');
+        const header = Buffer.alloc(4);
+        header.writeUInt32BE(body.length, 0);
+
+        const timer = setTimeout(() => {
+            channel.pending.delete(id);
+            reject(new Error('Timeout no canal'));
+        }, 30000);
+
+        channel.pending.set(id, { resolve, reject, timer });
+        channel.socket.write(Buffer.concat([header, body]));
+    });
+}
+
+/**
+ * Servidor Python saturado (429) - indica quanto esperar antes de reenviar
+ */
+class Overloaded extends Error {
+    constructor(message, retryAfter) {
+        super(message);
+        this.retryAfter = retryAfter || 1;
+    }
+}
+
+const MAX_RETRIES = 3;
+const MAX_ADIAMENTO = 60;  // Segundos, no máximo, entre reenvios de mensagens adiadas
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
 /**
  * Processa mensagem enviando para o servidor Python
+ * Se o servidor estiver saturado, espera o retry_after e tenta de novo;
+ * depois de MAX_RETRIES, o Overloaded sobe para quem chamou adiar a mensagem
  */
 async function processMessage(text, userId, userName) {
+    for (let tentativa = 0; ; tentativa++) {
+        try {
+            return await sendToPython(text, userId, userName);
+        } catch (error) {
+            if (!(error instanceof Overloaded)) throw error;
+            if (tentativa >= MAX_RETRIES) throw error;
+            await sleep(error.retryAfter * 1000);
+        }
+    }
+}
+
+/**
+ * Processa as mensagens de um evento, uma resposta (allSettled) por mensagem
+ * Sem canal e com várias mensagens (ex: após reconexão), vai tudo numa
+ * requisição só; as recusadas por sobrecarga são repetidas em paralelo
+ */
+async function responderTodas(pendentes) {
+    if (pendentes.length > 1 && !channel.connected) {
+        try {
+            const results = await processBatch(pendentes);
+            return await Promise.allSettled(pendentes.map(async ({ from, text, pushName }, i) => {
+                const result = results[i] || {};
+                if (result.status === 429) {
+                    await sleep((result.retry_after || 1) * 1000);
+                    return processMessage(text, from, pushName);
+                }
+                if (!result.success) throw new Error(result.response);
+                return result.response || 'Não entendi. Digite /ajuda para ver os comandos.';
+            }));
+        } catch (error) {
+            // Servidor sem suporte a lote ou fora do ar - segue uma a uma
+            console.error('❌ Erro no lote, processando individualmente:', error.message);
+        }
+    }
+
+    // No canal persistente todas seguem em paralelo (o Python preserva a
+    // ordem de cada usuário)
+    return Promise.allSettled(
+        pendentes.map(({ from, text, pushName }) => processMessage(text, from, pushName))
+    );
+}
+
+/**
+ * Mensagens recusadas por sobrecarga, por remetente e em ordem de chegada
+ * Voltam ao servidor mais tarde em vez de o usuário receber um aviso no
+ * lugar da resposta; novas mensagens do remetente entram atrás delas
+ */
+const adiadas = new Map();
+
+function adiar(pendente, retryAfter = 1) {
+    const fila = adiadas.get(pendente.from);
+    if (fila) {
+        fila.push(pendente);
+        return;
+    }
+    adiadas.set(pendente.from, [pendente]);
+    console.log(`⏳ Servidor saturado, mensagem de ${pendente.pushName} adiada`);
+    setTimeout(() => reenviarAdiadas(pendente.from), Math.min(retryAfter, MAX_ADIAMENTO) * 1000);
+}
+
+async function reenviarAdiadas(from) {
+    const fila = adiadas.get(from);
+    while (fila.length > 0) {
+        const { text, pushName } = fila[0];
+        let resposta;
+        try {
+            resposta = await processMessage(text, from, pushName);
+        } catch (error) {
+            if (error instanceof Overloaded) {
+                setTimeout(() => reenviarAdiadas(from), Math.min(error.retryAfter * 2, MAX_ADIAMENTO) * 1000);
+                return;
+            }
+            console.error('❌ Erro ao processar:', error.message);
+            resposta = '❌ Desculpe, ocorreu um erro ao processar sua mensagem.';
+        }
+        fila.shift();
+        try {
+            await whatsapp.sendMessage(from, { text: resposta });
+            console.log(`📤 Resposta adiada enviada!`);
+        } catch (error) {
+            console.error('❌ Erro ao enviar resposta adiada:', error.message);
+        }
+    }
+    adiadas.delete(from);
+}
+
+/**
+ * Envia uma mensagem ao Python
+ * Usa o canal persistente quando conectado; senão, uma requisição HTTP
+ */
+async function sendToPython(text, userId, userName) {
+    if (channel.connected) {
+        let frame = null;
+        try {
+            frame = await sendOverChannel(text, userId, userName);
+        } catch (error) {
+            // Só reenvia por HTTP se a conexão caiu; timeout não é repetido
+            if (error.message !== 'Canal fechado') throw error;
+            console.error('⚠️ Canal fechado, usando HTTP');
+        }
+
+        if (frame) {
+            if (frame.status === 429) throw new Overloaded(frame.response, frame.retry_after);
+            if (!frame.success) throw new Error(frame.response);
+            return frame.response || 'Não entendi. Digite /ajuda para ver os comandos.';
+        }
+    }
+
     try {
         const response = await axios.post(`${PYTHON_SERVER}/process`, {
             message: text,
@@ -128,6 +372,11 @@ async function processMessage(text, userId, userName) {
 
         return response.data.response || 'Não entendi. Digite /ajuda para ver os comandos.';
     } catch (error) {
+        if (error.response?.status === 429) {
+            const data = error.response.data || {};
+            throw new Overloaded(data.response, data.retry_after);
+        }
+
         // Se servidor Python não estiver rodando, processa localmente
         if (error.code === 'ECONNREFUSED') {
             return processLocal(text);
@@ -136,6 +385,24 @@ async function processMessage(text, userId, userName) {
     }
 }
 
+/**
+ * Processa várias mensagens em uma única requisição ao servidor Python
+ * Retorna um resultado { success, response } por mensagem, na mesma ordem
+ */
+async function processBatch(pendentes) {
+    const response = await axios.post(`${PYTHON_SERVER}/process/batch`, {
+        messages: pendentes.map(({ from, pushName, text }) => ({
+            message: text,
+            user_id: from,
+            user_name: pushName
+        }))
+    }, {
+        timeout: 120000
+    });
+
+    return response.data.results || [];
+}
+
 /**
  * Processamento local simples (fallback)
  */
@@ -200,8 +467,10 @@ console.log(`
 ║                                                  ║
 ║  Usando: Baileys (WhatsApp Web)                 ║
 ║  Servidor: ${PYTHON_SERVER}                    ║
+║  Canal: ${PYTHON_CHANNEL}                                     ║
 ╚══════════════════════════════════════════════════╝
 `);
 
 // Inicia conexão
+connectChannel();
 connectToWhatsApp();